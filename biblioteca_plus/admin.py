@@ -0,0 +1,20 @@
+"""Clases base del admin compartidas por las apps."""
+from django.contrib import admin
+
+from biblioteca_plus.normalizacion import normalizar
+
+
+class BusquedaNormalizadaAdmin(admin.ModelAdmin):
+    """
+    ModelAdmin que normaliza el término antes de buscar. En `search_fields` se
+    usan las columnas `*_normalizado` con lookup explícito ('campo__startswith'):
+    como la columna ya está en minúsculas no hace falta `istartswith`, y el
+    prefijo sensible a mayúsculas sí aprovecha el índice.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        clave = normalizar(search_term).replace('"', '')
+        if ' ' in clave:
+            # Entre comillas el admin lo toma como una sola frase y no palabra por palabra
+            clave = f'"{clave}"'
+        return super().get_search_results(request, queryset, clave)
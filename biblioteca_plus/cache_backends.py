@@ -0,0 +1,432 @@
+"""
+Caché de dos niveles: un LRU chico en la memoria del proceso delante de un
+caché compartido entre workers (tabla de la base por defecto, o Redis).
+
+Con `LocMemCache` cada worker de gunicorn tiene su propio caché: si el worker A
+borra `carrito_count_user_7`, el worker B sigue mostrando el número viejo.
+Acá todas las escrituras van al caché compartido y solo se copian en memoria
+las claves que nunca cambian de valor. Cada clave cae en uno de tres grupos
+según su prefijo:
+
+- `SELLOS`: sellos de versión por espacio de nombres (`catalogo_version`,
+  `stock_version`, `tarjeta_version:<id>`, `home_version`). Se leen del
+  compartido la primera vez que se piden en cada request y el resto del
+  request sale de memoria (ver `SincronizarCacheMiddleware`); fuera de un
+  request, siempre del compartido. Una escritura actualiza la copia del request que la hizo.
+- `LOCALES`: claves que llevan el sello en el nombre (`tarjeta:...:<sello>`,
+  `facetas:<versión>:...`). Su valor no cambia nunca: cuando cambia el sello
+  se lee otra clave, así que la copia local vale hasta `TTL_LOCAL` sin
+  preguntarle a nadie.
+- el resto (contadores por usuario, locks, sobres mutables, rate limits de
+  allauth...) se lee y escribe directo en el compartido, sin copia local.
+
+No hay un sello global: una escritura no vacía el LRU de los demás workers, y
+un request que no lee sellos (estáticos, un 400 por Host inválido) no toca el
+compartido.
+
+Configuración:
+
+    CACHES = {
+        "default": {
+            "BACKEND": "biblioteca_plus.cache_backends.CacheDosNiveles",
+            "OPTIONS": {
+                "COMPARTIDO": "compartido",   # alias del caché de segundo nivel
+                "MAX_ENTRADAS": 1000,         # tamaño del LRU local
+                "TTL_LOCAL": 60,              # vida máxima de una copia local
+                "SELLOS": ("catalogo_version", "tarjeta_version:"),
+                "LOCALES": ("tarjeta:", "facetas:"),
+            },
+        },
+        "compartido": {"BACKEND": "biblioteca_plus.cache_backends.CacheTablaPorLotes", ...},
+    }
+
+`CacheTablaPorLotes` es el `DatabaseCache` de Django con `set_many` en un
+solo INSERT ... ON CONFLICT: las tarjetas y sellos que faltan en una página
+se escriben de una vez (ver `productos/fragmentos.py`).
+
+Si el caché compartido falla (tabla sin crear, Redis caído) se sigue
+funcionando solo con el nivel local (sellos incluidos) y se deja un aviso en
+el log.
+"""
+import base64
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.db import DatabaseCache
+from django.db import DatabaseError, connections, router
+from django.utils.timezone import now as tz_now
+
+logger = logging.getLogger(__name__)
+
+_AUSENTE = object()
+_CAIDO = object()  # el compartido no respondió
+
+# Estado local por caché, compartido entre los hilos del proceso (Django crea
+# una instancia del backend por hilo, igual que con LocMemCache)
+_estados = {}
+_estados_lock = threading.Lock()
+
+# Marca del hilo: mientras atiende un request, `sellos` guarda los sellos ya
+# leídos ({nombre del caché: {clave: valor}})
+_hilo = threading.local()
+
+
+class _EstadoLocal:
+    def __init__(self):
+        self.entradas = OrderedDict()  # clave -> (vence, valor serializado)
+        self.lock = threading.RLock()
+        self.ultimo_aviso = 0.0
+
+
+class CacheDosNiveles(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        opciones = params.get('OPTIONS', {})
+        self._alias_compartido = opciones.get('COMPARTIDO', 'compartido')
+        self._max_entradas = int(opciones.get('MAX_ENTRADAS', 1000))
+        self._ttl_local = float(opciones.get('TTL_LOCAL', 60))
+        self._sellos = tuple(opciones.get('SELLOS', ()))
+        self._locales = tuple(opciones.get('LOCALES', ()))
+
+        self._nombre = location or self._alias_compartido
+        with _estados_lock:
+            self._estado = _estados.setdefault(self._nombre, _EstadoLocal())
+
+    @property
+    def _compartido(self):
+        return caches[self._alias_compartido]
+
+    # ──────────────────────────────────────────────
+    # 🛟 Caché compartido con tolerancia a fallos
+    # ──────────────────────────────────────────────
+    def _avisar(self, error):
+        ahora = time.monotonic()
+        if ahora - self._estado.ultimo_aviso > 60:
+            self._estado.ultimo_aviso = ahora
+            logger.warning("Caché compartido '%s' no disponible, uso solo memoria: %s",
+                           self._alias_compartido, error)
+
+    def _remoto(self, metodo, *args, fallback=None, **kwargs):
+        try:
+            return getattr(self._compartido, metodo)(*args, **kwargs)
+        except Exception as error:  # la tienda no se cae porque falle el caché
+            self._avisar(error)
+            return fallback
+
+    # ──────────────────────────────────────────────
+    # 🏷️ Grupos de claves
+    # ──────────────────────────────────────────────
+    def _es_sello(self, key):
+        return bool(self._sellos) and str(key).startswith(self._sellos)
+
+    def _es_local(self, key):
+        return bool(self._locales) and str(key).startswith(self._locales)
+
+    def _con_copia(self, key):
+        return self._es_sello(key) or self._es_local(key)
+
+    def _sellos_del_request(self):
+        """Sellos leídos en este request, o None fuera de un request."""
+        sellos = getattr(_hilo, 'sellos', None)
+        if sellos is None:
+            return None
+        return sellos.setdefault(self._nombre, {})
+
+    def _anotar_sello(self, clave, valor):
+        sellos = self._sellos_del_request()
+        if sellos is not None:
+            sellos[clave] = valor
+
+    def _olvidar_sello(self, clave):
+        sellos = self._sellos_del_request()
+        if sellos is not None:
+            sellos.pop(clave, None)
+
+    # ──────────────────────────────────────────────
+    # 🧠 Nivel local (LRU)
+    # ──────────────────────────────────────────────
+    def _leer_local(self, clave):
+        estado = self._estado
+        with estado.lock:
+            entrada = estado.entradas.get(clave)
+            if entrada is None:
+                return _AUSENTE
+            vence, serializado = entrada
+            if vence <= time.monotonic():
+                del estado.entradas[clave]
+                return _AUSENTE
+            estado.entradas.move_to_end(clave)
+        # Se devuelve una copia: quien lo lea puede modificar el objeto tranquilo
+        return pickle.loads(serializado)
+
+    def _guardar_local(self, clave, valor, timeout=DEFAULT_TIMEOUT):
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        if timeout is not None and timeout <= 0:
+            self._borrar_local(clave)
+            return
+        vida = self._ttl_local if timeout is None else min(timeout, self._ttl_local)
+        serializado = pickle.dumps(valor, self.pickle_protocol)
+        estado = self._estado
+        with estado.lock:
+            estado.entradas[clave] = (time.monotonic() + vida, serializado)
+            estado.entradas.move_to_end(clave)
+            while len(estado.entradas) > self._max_entradas:
+                estado.entradas.popitem(last=False)
+
+    def _borrar_local(self, clave):
+        with self._estado.lock:
+            self._estado.entradas.pop(clave, None)
+
+    def _guardar(self, key, clave, valor, timeout=DEFAULT_TIMEOUT, compartido_ok=True):
+        """
+        Copia local de una clave recién escrita o leída. Los sellos solo se
+        copian en el LRU si el compartido no respondió (último recurso).
+        """
+        if self._es_sello(key):
+            self._anotar_sello(clave, valor)
+            if compartido_ok:
+                self._borrar_local(clave)
+            else:
+                self._guardar_local(clave, valor, timeout)
+        elif self._es_local(key):
+            self._guardar_local(clave, valor, timeout)
+
+    def _olvidar(self, key, clave):
+        if self._es_sello(key):
+            self._olvidar_sello(clave)
+        self._borrar_local(clave)
+
+    def _leer_copia(self, key, clave):
+        if self._es_sello(key):
+            sellos = self._sellos_del_request()
+            if sellos is not None and clave in sellos:
+                return sellos[clave]
+            return _AUSENTE
+        return self._leer_local(clave)
+
+    # ──────────────────────────────────────────────
+    # 📦 API de caché de Django
+    # ──────────────────────────────────────────────
+    def get(self, key, default=None, version=None):
+        if not self._con_copia(key):
+            return self._remoto('get', key, default, version=version, fallback=default)
+
+        clave = self.make_and_validate_key(key, version=version)
+        valor = self._leer_copia(key, clave)
+        if valor is not _AUSENTE:
+            return default if valor is None and self._es_sello(key) else valor
+
+        valor = self._remoto('get', key, _AUSENTE, version=version, fallback=_CAIDO)
+        if valor is _CAIDO:
+            # Sin compartido: lo que haya quedado en memoria
+            valor = self._leer_local(clave)
+            return default if valor is _AUSENTE else valor
+        if valor is _AUSENTE:
+            if self._es_sello(key):
+                # También se recuerda que no estaba: el request no vuelve a preguntar
+                self._anotar_sello(clave, None)
+            return default
+        self._guardar(key, clave, valor)
+        return valor
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        resultado = {}
+        faltantes = []
+        for key in keys:
+            if not self._con_copia(key):
+                faltantes.append(key)
+                continue
+            valor = self._leer_copia(key, self.make_and_validate_key(key, version=version))
+            if valor is _AUSENTE:
+                faltantes.append(key)
+            elif valor is not None or not self._es_sello(key):
+                resultado[key] = valor
+
+        if faltantes:
+            remotos = self._remoto('get_many', faltantes, version=version, fallback=None)
+            if remotos is None:
+                for key in faltantes:
+                    if self._con_copia(key):
+                        valor = self._leer_local(self.make_and_validate_key(key, version=version))
+                        if valor is not _AUSENTE:
+                            resultado[key] = valor
+                return resultado
+            for key in faltantes:
+                if self._con_copia(key):
+                    clave = self.make_and_validate_key(key, version=version)
+                    if key in remotos:
+                        self._guardar(key, clave, remotos[key])
+                    elif self._es_sello(key):
+                        self._anotar_sello(clave, None)
+            resultado.update(remotos)
+        return resultado
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        ok = self._remoto('set', key, value, timeout, version=version, fallback=False) is not False
+        if self._con_copia(key):
+            self._guardar(key, self.make_and_validate_key(key, version=version), value, timeout, ok)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        fallidas = self._remoto('set_many', data, timeout, version=version, fallback=None)
+        ok = fallidas is not None
+        for key, value in data.items():
+            if self._con_copia(key):
+                self._guardar(key, self.make_and_validate_key(key, version=version), value, timeout, ok)
+        return fallidas if ok else []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if not self._con_copia(key):
+            return self._remoto('add', key, value, timeout, version=version, fallback=False)
+
+        clave = self.make_and_validate_key(key, version=version)
+        agregado = self._remoto('add', key, value, timeout, version=version, fallback=_AUSENTE)
+        if agregado is _AUSENTE:
+            # Sin compartido: el add se resuelve contra la memoria local
+            if self._leer_local(clave) is not _AUSENTE:
+                return False
+            self._guardar(key, clave, value, timeout, compartido_ok=False)
+            return True
+        if agregado:
+            self._guardar(key, clave, value, timeout)
+        else:
+            # Ya existía con otro valor: la copia del request (si había) ya no vale
+            self._olvidar(key, clave)
+        return agregado
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        if self._con_copia(key):
+            self._olvidar(key, self.make_and_validate_key(key, version=version))
+        return self._remoto('touch', key, timeout, version=version, fallback=False)
+
+    def delete(self, key, version=None):
+        borrado = self._remoto('delete', key, version=version, fallback=False)
+        if self._con_copia(key):
+            self._olvidar(key, self.make_and_validate_key(key, version=version))
+        return borrado
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self._remoto('delete_many', keys, version=version)
+        for key in keys:
+            if self._con_copia(key):
+                self._olvidar(key, self.make_and_validate_key(key, version=version))
+
+    def incr(self, key, delta=1, version=None):
+        ok = True
+        try:
+            valor = self._compartido.incr(key, delta, version=version)
+        except ValueError:
+            raise
+        except Exception as error:
+            self._avisar(error)
+            if not self._con_copia(key):
+                raise ValueError("Key '%s' not found" % key)
+            actual = self._leer_local(self.make_and_validate_key(key, version=version))
+            if actual is _AUSENTE:
+                raise ValueError("Key '%s' not found" % key)
+            valor = actual + delta
+            ok = False
+        if self._con_copia(key):
+            self._guardar(key, self.make_and_validate_key(key, version=version), valor, None, ok)
+        return valor
+
+    def has_key(self, key, version=None):
+        return self.get(key, _AUSENTE, version=version) is not _AUSENTE
+
+    def clear(self):
+        self._remoto('clear')
+        with self._estado.lock:
+            self._estado.entradas.clear()
+        sellos = self._sellos_del_request()
+        if sellos is not None:
+            sellos.clear()
+
+
+# ──────────────────────────────────────────────
+# 🗄️ Tabla de la base con escritura por lotes
+# ──────────────────────────────────────────────
+class CacheTablaPorLotes(DatabaseCache):
+    """
+    `DatabaseCache` con un `set_many` de un solo INSERT ... ON CONFLICT por
+    lote (el de Django hace un COUNT, un SELECT y un INSERT/UPDATE por clave).
+    En motores sin upsert usa el de Django.
+    """
+    VENDORS_UPSERT = ('postgresql', 'sqlite')
+    FILAS_POR_LOTE = 500
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        db = router.db_for_write(self.cache_model_class)
+        connection = connections[db]
+        if not data or connection.vendor not in self.VENDORS_UPSERT:
+            return super().set_many(data, timeout, version=version)
+
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            vence = datetime.max
+        else:
+            vence = datetime.fromtimestamp(timeout, tz=timezone.utc if settings.USE_TZ else None)
+        vence = connection.ops.adapt_datetimefield_value(vence.replace(microsecond=0))
+        filas = [
+            (
+                self.make_and_validate_key(key, version=version),
+                base64.b64encode(pickle.dumps(value, self.pickle_protocol)).decode('latin1'),
+                vence,
+            )
+            for key, value in data.items()
+        ]
+
+        quote_name = connection.ops.quote_name
+        tabla = quote_name(self._table)
+        clave, valor, expira = (quote_name(c) for c in ('cache_key', 'value', 'expires'))
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT COUNT(*) FROM %s' % tabla)
+                cantidad = cursor.fetchone()[0]
+                if cantidad > self._max_entries:
+                    self._cull(db, cursor, tz_now().replace(microsecond=0), cantidad)
+                for inicio in range(0, len(filas), self.FILAS_POR_LOTE):
+                    lote = filas[inicio:inicio + self.FILAS_POR_LOTE]
+                    cursor.execute(
+                        'INSERT INTO %s (%s, %s, %s) VALUES %s '
+                        'ON CONFLICT (%s) DO UPDATE SET %s = EXCLUDED.%s, %s = EXCLUDED.%s' % (
+                            tabla, clave, valor, expira, ', '.join(['(%s, %s, %s)'] * len(lote)),
+                            clave, valor, valor, expira, expira,
+                        ),
+                        [dato for fila in lote for dato in fila],
+                    )
+        except DatabaseError:
+            # Igual que el `set` de Django: una escritura del caché puede fallar en silencio
+            return list(data)
+        return []
+
+
+# ──────────────────────────────────────────────
+# 🔄 Middleware: los sellos se leen una vez por request
+# ──────────────────────────────────────────────
+class SincronizarCacheMiddleware:
+    """
+    Abre una "foto" de los sellos para el request: cada sello se lee del
+    compartido la primera vez que se pide y el resto del request sale de
+    memoria. No lee nada por su cuenta, así que un request que no usa sellos
+    no toca el compartido.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _hilo.sellos = {}
+        try:
+            return self.get_response(request)
+        finally:
+            _hilo.sellos = None
@@ -0,0 +1,197 @@
+"""
+Caché de los datos de la home con stale-while-revalidate.
+
+La entrada guardada es un "sobre" con los datos, cuándo se armaron y con qué
+sello `home_version`. Las señales de Producto, PortadaProducto y
+CampaniaDescuento cambian el sello (ver `productos/signals.py`), así un cambio
+del staff se ve en la próxima visita y no a los 10 minutos.
+
+El sobre también guarda el próximo `precio_efectivo_vence` del catálogo: al
+llegar esa hora la entrada deja de ser fresca y la reconstrucción empieza por
+`refrescar_precios_vencidos`, así una oferta que terminó no se sigue mostrando.
+
+Cuando la entrada está vencida (por sello, edad o precio) NO se borra:
+- UN solo worker toma el lock (`cache.add`, atómico) y la reconstruye;
+- el resto sigue sirviendo la versión vieja mientras tanto.
+Así un vencimiento nunca dispara N reconstrucciones simultáneas contra Neon.
+
+Opcional (`HOME_REFRESCO_SEGUNDOS` > 0): un hilo por worker revisa la entrada
+cada tantos segundos y la reconstruye antes de que un visitante la encuentre
+vencida o vacía. Se arranca desde `wsgi.py`, no en comandos de manage.py.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+# Contiene ProductoCard (ver productos/lectura.py): si cambian sus campos, cambiar
+# el sufijo para no despickear tarjetas de la versión anterior después del deploy
+CLAVE_DATOS = 'home_cards:2'
+CLAVE_VERSION = 'home_version'
+CLAVE_LOCK = 'home_data_lock'
+
+FRESCURA = 600             # segundos en los que la entrada se considera fresca
+VIDA_MAXIMA = 60 * 60 * 24  # después de esto ni siquiera se sirve vieja
+DURACION_LOCK = 30         # si el worker que reconstruye muere, el lock se libera solo
+
+
+# ──────────────────────────────────────────────
+# 🏷️ Sello de versión
+# ──────────────────────────────────────────────
+def version_home():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        version = int(time.time() * 1000)
+        if not cache.add(CLAVE_VERSION, version, None):
+            version = cache.get(CLAVE_VERSION, version)
+    return version
+
+
+def invalidar_home():
+    """Marca la home como vieja: se sigue sirviendo hasta que alguien la reconstruya."""
+    try:
+        return cache.incr(CLAVE_VERSION)
+    except ValueError:
+        return version_home()
+
+
+# ──────────────────────────────────────────────
+# 🏗️ Construcción
+# ──────────────────────────────────────────────
+def construir_datos_home():
+    """Tarjetas livianas (`ProductoCard`): el sobre cacheado es chico y no hace queries al renderizar."""
+    from productos.lectura import cards_de, con_datos_card
+    from productos.models import Producto
+
+    base = con_datos_card(Producto.objects.all())
+    return {
+        'productos_destacados': cards_de(base.filter(destacado=True)[:4]),
+        'kits_combo': cards_de(base.filter(es_combo=True, en_oferta=True)[:5]),
+        'productos_oferta': cards_de(base.filter(en_oferta=True, es_combo=False)[:8]),
+        'productos_carrusel': cards_de(base.filter(en_carrusel=True)[:5]),
+    }
+
+
+def _reconstruir(version):
+    from productos.precios import proximo_vencimiento, refrescar_precios_vencidos
+
+    # Las tarjetas leen el precio efectivo guardado: primero se pone al día
+    if refrescar_precios_vencidos():
+        version = version_home()  # el refresco movió el sello
+    datos = construir_datos_home()
+    vence = proximo_vencimiento()
+    cache.set(CLAVE_DATOS, {
+        'datos': datos,
+        'armado': time.time(),
+        'version': version,
+        'vence': vence.timestamp() if vence else None,
+    }, VIDA_MAXIMA)
+    return datos
+
+
+def _reconstruir_en_segundo_plano(version):
+    def tarea():
+        try:
+            _reconstruir(version)
+        except Exception:
+            logger.exception("No se pudo reconstruir la home en segundo plano")
+        finally:
+            cache.delete(CLAVE_LOCK)
+            close_old_connections()
+
+    threading.Thread(target=tarea, name='home-refresco', daemon=True).start()
+
+
+def _es_fresca(sobre, version):
+    ahora = time.time()
+    return (
+        sobre['version'] == version
+        and ahora - sobre['armado'] < FRESCURA
+        # Cuando arranca o termina una campaña u oferta hay que recalcular precios
+        and (sobre.get('vence') is None or ahora < sobre['vence'])
+    )
+
+
+# ──────────────────────────────────────────────
+# 📦 Lectura
+# ──────────────────────────────────────────────
+def obtener_datos_home():
+    version = version_home()
+    sobre = cache.get(CLAVE_DATOS)
+
+    if sobre is not None and _es_fresca(sobre, version):
+        return sobre['datos']
+
+    # Vieja o vacía: solo un worker reconstruye (single-flight)
+    if not cache.add(CLAVE_LOCK, 1, DURACION_LOCK):
+        if sobre is not None:
+            return sobre['datos']
+        # Caché vacío y otro worker ya está armando: lo armamos igual para no
+        # dejar la página esperando (solo pasa en frío, sin refresco periódico)
+        return construir_datos_home()
+
+    if sobre is not None and getattr(settings, 'HOME_REFRESCO_SEGUNDOS', 0):
+        # Con refresco en segundo plano el visitante no espera: recibe la vieja
+        _reconstruir_en_segundo_plano(version)
+        return sobre['datos']
+
+    try:
+        return _reconstruir(version)
+    finally:
+        cache.delete(CLAVE_LOCK)
+
+
+# ──────────────────────────────────────────────
+# ⏱️ Refresco periódico (opcional)
+# ──────────────────────────────────────────────
+_refresco_iniciado = False
+_refresco_lock = threading.Lock()
+
+
+def refrescar_si_hace_falta():
+    """Reconstruye la entrada si está vieja o vacía; devuelve True si la rehízo."""
+    version = version_home()
+    sobre = cache.get(CLAVE_DATOS)
+    if sobre is not None and _es_fresca(sobre, version):
+        return False
+    if not cache.add(CLAVE_LOCK, 1, DURACION_LOCK):
+        return False
+    try:
+        _reconstruir(version)
+        return True
+    finally:
+        cache.delete(CLAVE_LOCK)
+
+
+def iniciar_refresco_periodico(intervalo=None):
+    """
+    Arranca (una vez por proceso) el hilo que mantiene la home caliente.
+    Sin `intervalo` usa `settings.HOME_REFRESCO_SEGUNDOS`; con 0 no hace nada.
+    """
+    global _refresco_iniciado
+    intervalo = intervalo if intervalo is not None else getattr(settings, 'HOME_REFRESCO_SEGUNDOS', 0)
+    if not intervalo:
+        return False
+
+    with _refresco_lock:
+        if _refresco_iniciado:
+            return False
+        _refresco_iniciado = True
+
+    def bucle():
+        while True:
+            try:
+                refrescar_si_hace_falta()
+            except Exception:
+                logger.exception("Falló el refresco periódico de la home")
+            finally:
+                close_old_connections()
+            time.sleep(intervalo)
+
+    threading.Thread(target=bucle, name='home-refresco-periodico', daemon=True).start()
+    return True
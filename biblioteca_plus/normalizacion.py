@@ -0,0 +1,19 @@
+"""
+Claves de búsqueda normalizadas.
+
+Los clientes escriben "rascador gatito", "RASCADÓR" o "Rascádor  Gatito" y
+esperan lo mismo. En lugar de comparar con funciones sobre la columna (que
+anulan los índices) guardamos una copia "plana" del texto (minúsculas, sin
+tildes y con espacios colapsados) en una columna indexada `*_normalizado`,
+y normalizamos el término de búsqueda con la misma función.
+"""
+import unicodedata
+
+
+def normalizar(texto):
+    """'  Rascádor   GATITO ' -> 'rascador gatito'."""
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
@@ -0,0 +1,231 @@
+"""
+Paginación por cursor (keyset) para listados grandes.
+
+La paginación de Django usa OFFSET + COUNT(*): para llegar a la página 500 la
+base igual lee y descarta las 499 anteriores, y el COUNT recorre toda la tabla.
+Acá la página siguiente se pide como "las filas que vienen DESPUÉS de la
+última que mostré", según un orden estable que termina en `id`:
+
+    WHERE (fecha_pedido, id) < (:ultima_fecha, :ultimo_id)
+    ORDER BY fecha_pedido DESC, id DESC
+    LIMIT 11
+
+Con un índice sobre esas columnas cada página cuesta lo mismo, sea la primera
+o la diezmilésima. El cursor viaja firmado (`django.core.signing`) para que
+sea opaco y no se pueda manipular.
+
+Uso en una ListView:
+
+    class PanelPedidosView(KeysetPaginationMixin, ListView):
+        paginate_by = 10
+        orden_keyset = ('-fecha_pedido', '-id')
+        conteo_keyset = 'estimado'
+"""
+import json
+
+from django.core import signing
+from django.db import connections
+from django.db.models import Q
+
+SALT = 'biblioteca_plus.paginacion'
+PARAMETRO_CURSOR = 'cursor'
+TOPE_CONTEO = 1000
+
+
+# ──────────────────────────────────────────────
+# 🔢 Conteo estimado
+# ──────────────────────────────────────────────
+def contar(queryset, modo='exacto', tope=TOPE_CONTEO):
+    """
+    Devuelve (total, exacto).
+
+    - 'exacto': COUNT(*) de siempre.
+    - 'estimado': cuenta como mucho `tope` filas (COUNT sobre un LIMIT, costo
+      acotado). Si hay más, en PostgreSQL usa la estimación del planificador
+      (EXPLAIN) y si no, informa "más de `tope`".
+    - None: no cuenta nada.
+    """
+    if modo is None:
+        return None, False
+
+    queryset = queryset.order_by()
+    if modo == 'exacto':
+        return queryset.count(), True
+
+    acotado = queryset[:tope + 1].count()
+    if acotado <= tope:
+        return acotado, True
+
+    if connections[queryset.db].vendor == 'postgresql':
+        try:
+            plan = json.loads(queryset.explain(format='json'))
+            return max(int(plan[0]['Plan']['Plan Rows']), tope), False
+        except (ValueError, KeyError, IndexError):
+            pass
+    return tope, False
+
+
+# ──────────────────────────────────────────────
+# 📄 Paginador
+# ──────────────────────────────────────────────
+class PaginaKeyset:
+    """Página de resultados; imita lo que los templates usan de `Page`."""
+
+    def __init__(self, object_list, paginador, cursor_siguiente, cursor_anterior):
+        self.object_list = object_list
+        self.paginator = paginador
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, indice):
+        return self.object_list[indice]
+
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class PaginadorKeyset:
+    """
+    `orden`: tupla de campos del modelo ('-fecha_pedido', '-id'). El último
+    campo tiene que ser único (normalmente 'id') para que el orden sea total.
+    Los campos del orden no deberían ser NULL.
+    """
+
+    def __init__(self, queryset, orden, por_pagina, conteo='estimado'):
+        self.queryset = queryset
+        self.orden = tuple(orden)
+        self.por_pagina = por_pagina
+        self.modo_conteo = conteo
+        self._total = None
+
+    # --- Conteo (perezoso: solo si el template lo pide) ---
+    def _contar(self):
+        if self._total is None:
+            self._total = contar(self.queryset, self.modo_conteo)
+        return self._total
+
+    @property
+    def count(self):
+        return self._contar()[0]
+
+    @property
+    def count_exacto(self):
+        return self._contar()[1]
+
+    # --- Cursores ---
+    def _valores(self, objeto):
+        valores = []
+        for campo in self.orden:
+            valor = getattr(objeto, campo.lstrip('-'))
+            valores.append(valor.isoformat() if hasattr(valor, 'isoformat') else str(valor))
+        return valores
+
+    def _cursor(self, objeto, direccion):
+        return signing.dumps({'o': self.orden, 'v': self._valores(objeto), 'd': direccion}, salt=SALT)
+
+    def _leer_cursor(self, token):
+        """Devuelve (valores, dirección) o (None, None) si el cursor no sirve."""
+        if not token:
+            return None, None
+        try:
+            datos = signing.loads(token, salt=SALT)
+        except signing.BadSignature:
+            return None, None
+        if tuple(datos.get('o', ())) != self.orden or len(datos.get('v', ())) != len(self.orden):
+            return None, None
+
+        modelo = self.queryset.model
+        valores = []
+        for campo, valor in zip(self.orden, datos['v']):
+            valores.append(modelo._meta.get_field(campo.lstrip('-')).to_python(valor))
+        return valores, datos.get('d')
+
+    def _filtro_despues_de(self, valores, invertir=False):
+        """
+        Construye (a, b, c) > (va, vb, vc) respetando la dirección de cada campo:
+        a > va OR (a = va AND b > vb) OR (a = va AND b = vb AND c > vc)
+        """
+        filtro = Q()
+        iguales = {}
+        for campo, valor in zip(self.orden, valores):
+            nombre = campo.lstrip('-')
+            descendente = campo.startswith('-') != invertir
+            lookup = f"{nombre}__{'lt' if descendente else 'gt'}"
+            filtro |= Q(**iguales, **{lookup: valor})
+            iguales[nombre] = valor
+        return filtro
+
+    def _orden_invertido(self):
+        return [c[1:] if c.startswith('-') else f'-{c}' for c in self.orden]
+
+    def pagina(self, token=None):
+        valores, direccion = self._leer_cursor(token)
+        qs = self.queryset
+
+        if valores is None:
+            filas = list(qs.order_by(*self.orden)[:self.por_pagina + 1])
+            hay_mas = len(filas) > self.por_pagina
+            filas = filas[:self.por_pagina]
+            hay_siguiente, hay_anterior = hay_mas, False
+        elif direccion == 'ant':
+            # Hacia atrás: orden invertido y damos vuelta el resultado
+            filas = list(
+                qs.filter(self._filtro_despues_de(valores, invertir=True))
+                .order_by(*self._orden_invertido())[:self.por_pagina + 1]
+            )
+            hay_mas = len(filas) > self.por_pagina
+            filas = filas[:self.por_pagina][::-1]
+            hay_siguiente, hay_anterior = True, hay_mas
+        else:
+            filas = list(
+                qs.filter(self._filtro_despues_de(valores))
+                .order_by(*self.orden)[:self.por_pagina + 1]
+            )
+            hay_mas = len(filas) > self.por_pagina
+            filas = filas[:self.por_pagina]
+            hay_siguiente, hay_anterior = hay_mas, True
+
+        siguiente = self._cursor(filas[-1], 'sig') if filas and hay_siguiente else None
+        anterior = self._cursor(filas[0], 'ant') if filas and hay_anterior else None
+        return PaginaKeyset(filas, self, siguiente, anterior)
+
+
+# ──────────────────────────────────────────────
+# 🧩 Mixin para ListView
+# ──────────────────────────────────────────────
+class KeysetPaginationMixin:
+    """
+    Reemplaza la paginación por OFFSET de ListView por paginación por cursor.
+    Si `get_orden_keyset()` devuelve None (p. ej. orden por relevancia) se usa
+    la paginación normal de Django.
+
+    En el template: `page_obj.cursor_siguiente`, `page_obj.cursor_anterior`,
+    `paginator.count` y `paginator.count_exacto`. Para armar los links:
+    `{% querystring cursor=page_obj.cursor_siguiente page=None %}`.
+    """
+    orden_keyset = None
+    conteo_keyset = 'estimado'
+
+    def get_orden_keyset(self):
+        return self.orden_keyset
+
+    def paginate_queryset(self, queryset, page_size):
+        orden = self.get_orden_keyset()
+        if not orden:
+            return super().paginate_queryset(queryset, page_size)
+
+        paginador = PaginadorKeyset(queryset, orden, page_size, conteo=self.conteo_keyset)
+        pagina = paginador.pagina(self.request.GET.get(PARAMETRO_CURSOR))
+        return paginador, pagina, pagina.object_list, pagina.has_other_pages()
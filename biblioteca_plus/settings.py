@@ -80,6 +80,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # estáticos en producción
+    "biblioteca_plus.cache_backends.SincronizarCacheMiddleware",  # sellos del caché, uno por request
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -226,15 +227,52 @@ else:
     MEDIA_ROOT = BASE_DIR / "media"
 
 # -----------------------------------------------------------------------------
-# Caché en Memoria (LocMemCache)
+# Caché de dos niveles (ver biblioteca_plus/cache_backends.py)
 # -----------------------------------------------------------------------------
+# Nivel 1: LRU en la memoria de cada worker. Nivel 2: compartido entre workers,
+# la tabla `tiendaplus_cache` (python manage.py createcachetable) o, si hay
+# REDIS_URL, cualquier servidor que hable el protocolo de Redis (requiere el
+# paquete `redis`).
+REDIS_URL = os.getenv("REDIS_URL", "")
+
+if REDIS_URL:
+    CACHE_COMPARTIDO = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+else:
+    CACHE_COMPARTIDO = {
+        # DatabaseCache con set_many en un solo INSERT ... ON CONFLICT
+        "BACKEND": "biblioteca_plus.cache_backends.CacheTablaPorLotes",
+        "LOCATION": "tiendaplus_cache",
+    }
+
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": "biblioteca_plus.cache_backends.CacheDosNiveles",
         "LOCATION": "tiendaplus-cache",
-    }
+        "OPTIONS": {
+            "COMPARTIDO": "compartido",
+            "MAX_ENTRADAS": 1000,
+            "TTL_LOCAL": 60,
+            # Sellos de versión: se leen del compartido una vez por request
+            "SELLOS": ("catalogo_version", "stock_version", "tarjeta_version:", "home_version"),
+            # Llevan el sello en el nombre, nunca cambian: copia local hasta TTL_LOCAL.
+            # Todo lo demás (por usuario, locks, la home) va directo al compartido.
+            "LOCALES": ("tarjeta:", "facetas:"),
+        },
+    },
+    "compartido": CACHE_COMPARTIDO,
 }
 
+# Home con stale-while-revalidate (ver biblioteca_plus/inicio.py). Con un valor
+# > 0 cada worker la reconstruye en segundo plano cada tantos segundos.
+HOME_REFRESCO_SEGUNDOS = int(os.getenv("HOME_REFRESCO_SEGUNDOS", "0"))
+
+# Portadas subidas en segundo plano (ver productos/subidas.py): hilos por
+# worker para subir a Cloudinary en paralelo. Con 0 se suben dentro del request.
+PORTADAS_SUBIDA_HILOS = int(os.getenv("PORTADAS_SUBIDA_HILOS", "3"))
+
 # -----------------------------------------------------------------------------
 # Proveedores de Autenticación Social (Allauth)
 # -----------------------------------------------------------------------------
@@ -3,8 +3,9 @@ from django.contrib.auth import logout
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db.models import Count
-from django.core.cache import cache
-from productos.models import Producto
+from productos.fragmentos import NOMBRE_LOTE, LoteTarjetas, precargar_versiones
+from productos.lectura import descontar_reservas
+from .inicio import obtener_datos_home
 from categorias.models import Categoria
 from django.contrib.auth.forms import UserCreationForm
 from django.http import JsonResponse, HttpResponse
@@ -23,57 +24,30 @@ def health_check(request):
 def home(request):
     """
     Vista de la página de inicio (Landing Page).
-    
-    Optimización: Los productos se cachean en memoria por 10 minutos (600s).
-    La home es la página más visitada y sus datos no cambian con frecuencia.
-    Cuando un admin modifica un producto, el caché expira solo y se recarga.
-    
-    El caché NO se comparte entre usuarios autenticados y anónimos para
-    evitar mostrar datos incorrectos en la barra de admin.
+
+    Optimización: los productos salen de un caché con stale-while-revalidate
+    (ver `biblioteca_plus/inicio.py`). Se invalida por señales cuando el staff
+    edita productos, portadas o campañas, y al vencer un solo worker la
+    reconstruye mientras el resto sigue sirviendo la versión anterior.
+
+    Los datos son los mismos para staff y visitantes: lo que cambia (la barra
+    de admin) se decide en el template con `request.user`, fuera del caché.
     """
-    # Clave de caché diferente para staff (ven la barra de admin) vs visitantes
-    is_staff = request.user.is_authenticated and request.user.is_staff
-    cache_key = "home_data_staff" if is_staff else "home_data_public"
-
-    home_data = cache.get(cache_key)
-
-    if home_data is None:
-        # Cache MISS: consultamos Neon y guardamos el resultado
-        productos_destacados = list(
-            Producto.objects.filter(destacado=True)
-            .select_related('categoria')
-            .prefetch_related('portadas')[:4]
-        )
-
-        kits_combo = list(
-            Producto.objects.filter(es_combo=True, en_oferta=True)
-            .select_related('categoria')
-            .prefetch_related('portadas')[:5]
-        )
-
-        productos_oferta = list(
-            Producto.objects.filter(en_oferta=True, es_combo=False)
-            .select_related('categoria')
-            .prefetch_related('portadas')[:8]
-        )
-
-        productos_carrusel = list(
-            Producto.objects.filter(en_carrusel=True)
-            .select_related('categoria')
-            .prefetch_related('portadas')[:5]
-        )
-
-        home_data = {
-            'productos_destacados': productos_destacados,
-            'kits_combo': kits_combo,
-            'productos_oferta': productos_oferta,
-            'productos_carrusel': productos_carrusel,
-        }
-
-        # Guardar en caché por 10 minutos
-        cache.set(cache_key, home_data, 600)
-
-    return render(request, 'home.html', home_data)
+    home_data = dict(obtener_datos_home())
+
+    # Los sellos de las tarjetas y lo reservado por carritos se leen siempre frescos
+    # (no viajan en el caché de la home), los de las dos grillas juntos
+    destacados = home_data['productos_destacados']
+    con_version = precargar_versiones(
+        descontar_reservas(list(destacados) + list(home_data['productos_oferta']))
+    )
+    home_data['productos_destacados'] = con_version[:len(destacados)]
+    home_data['productos_oferta'] = con_version[len(destacados):]
+    lote = home_data[NOMBRE_LOTE] = LoteTarjetas(con_version)
+
+    respuesta = render(request, 'home.html', home_data)
+    lote.escribir()
+    return respuesta
 
 
 def cerrar_sesion(request):
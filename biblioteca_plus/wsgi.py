@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'biblioteca_plus.settings')
 
 application = get_wsgi_application()
+
+# Home siempre caliente (opcional, HOME_REFRESCO_SEGUNDOS > 0): un hilo por worker
+from biblioteca_plus.inicio import iniciar_refresco_periodico  # noqa: E402
+
+iniciar_refresco_periodico()
@@ -11,6 +11,12 @@ python manage.py collectstatic --no-input
 echo "Aplicando migraciones a PostgreSQL..."
 python manage.py migrate
 
+echo "Creando tabla del caché compartido..."
+python manage.py createcachetable
+
+echo "Recalculando precios efectivos..."
+python manage.py recalcular_precios_efectivos --todos
+
 
 # Bloque para crear el superusuario automáticamente sin consola
 if [[ -n "${DJANGO_SUPERUSER_USERNAME}" ]] && [[ -n "${DJANGO_SUPERUSER_PASSWORD}" ]] && [[ -n "${DJANGO_SUPERUSER_EMAIL}" ]]; then
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from biblioteca_plus.admin import BusquedaNormalizadaAdmin
 from .models import Categoria
 
 # Filtro por año de creación
@@ -32,9 +33,9 @@ class MesCreacionFiltro(admin.SimpleListFilter):
 
 
 @admin.register(Categoria)
-class CategoriaAdmin(admin.ModelAdmin):
+class CategoriaAdmin(BusquedaNormalizadaAdmin):
     list_display = ('id', 'nombre', 'fecha_creacion', 'cantidad_productos')
-    search_fields = ('nombre',)
+    search_fields = ('nombre_normalizado__startswith',)
     list_filter = (FechaCreacionFiltro, MesCreacionFiltro)
     ordering = ('nombre',)
     date_hierarchy = 'fecha_creacion'
@@ -1,8 +1,10 @@
 from django.db import models
+from biblioteca_plus.normalizacion import normalizar
 
 
 class Categoria(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
+    nombre_normalizado = models.CharField(max_length=100, blank=True, editable=False, db_index=True)
     descripcion = models.TextField(blank=True, null=True)  # campo opcional para detalles
     imagen = models.ImageField(upload_to='categorias/', blank=True, null=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
@@ -14,3 +16,10 @@ class Categoria(models.Model):
 
     def __str__(self):
         return self.nombre
+
+    def save(self, *args, **kwargs):
+        self.nombre_normalizado = normalizar(self.nombre)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nombre' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'nombre_normalizado'}
+        super().save(*args, **kwargs)
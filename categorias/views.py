@@ -1,6 +1,9 @@
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView,DetailView
 from django.urls import reverse_lazy
 from .models import Categoria
+from productos.fragmentos import NOMBRE_LOTE, LoteTarjetas, LoteTarjetasMixin, precargar_versiones
+from productos.lectura import cards_de, descontar_reservas
+from productos.precios import refrescar_precios_vencidos
 from django.utils.decorators import method_decorator
 from .forms import CategoriaForm
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
@@ -34,13 +37,16 @@ class CategoriaDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         # Solo staff puede eliminar categorías
         return self.request.user.is_staff
 
-class CategoriaDetailView(DetailView):
+class CategoriaDetailView(LoteTarjetasMixin, DetailView):
     model = Categoria
     template_name = 'categorias/categoria_detail.html'
     context_object_name = 'categoria'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Agregamos los productos asociados a la categoría
-        context['productos'] = self.object.productos.all()
+        # Las tarjetas muestran el precio efectivo guardado: se pone al día antes
+        refrescar_precios_vencidos()
+        # Tarjetas livianas de la categoría en una sola query (con el sello de su caché de fragmentos)
+        context['productos'] = precargar_versiones(descontar_reservas(cards_de(self.object.productos.all())))
+        context[NOMBRE_LOTE] = LoteTarjetas(context['productos'])
         return context
\ No newline at end of file
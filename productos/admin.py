@@ -1,14 +1,20 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from biblioteca_plus.admin import BusquedaNormalizadaAdmin
+from django.shortcuts import redirect, render
+from django.urls import path
 from django.utils.html import format_html
 from django.utils import timezone
-from .models import Producto, CampaniaDescuento, CodigoDescuento
+from .forms import ReglasPreciosForm
+from . import busqueda
+from .models import ArchivoMedia, Producto, CampaniaDescuento, CodigoDescuento
+from .reglas_precios import aplicar_cambios, calcular_cambios, validos
 
 
 # ──────────────────────────────────────────────
 # 📦 Admin: Producto (sin cambios en funcionalidad)
 # ──────────────────────────────────────────────
 @admin.register(Producto)
-class ProductoAdmin(admin.ModelAdmin):
+class ProductoAdmin(BusquedaNormalizadaAdmin):
     list_display = (
         'id',
         'nombre',
@@ -22,14 +28,24 @@ class ProductoAdmin(admin.ModelAdmin):
         'portada_preview',
     )
     list_filter = ('categoria', 'en_oferta', 'es_combo', 'destacado', 'creado')
-    search_fields = ('nombre', 'descripcion', 'categoria__nombre')
+    search_fields = ('nombre_normalizado__startswith', 'categoria__nombre_normalizado__startswith')
     ordering = ('nombre',)
     date_hierarchy = 'creado'
     list_editable = ('en_oferta', 'es_combo', 'precio_oferta')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Además del prefijo sobre nombre y categoría, la descripción: se busca
+        # en el índice de texto completo, que ya la tiene sin tildes
+        queryset_base = queryset
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term.strip():
+            en_descripcion = busqueda.buscar(Producto.objects.all(), search_term).values('pk')
+            queryset |= queryset_base.filter(pk__in=en_descripcion)
+        return queryset, may_have_duplicates
+
     fieldsets = (
         ('Información del Producto', {
-            'fields': ('nombre', 'descripcion', 'categoria', 'precio', 'stock', 'destacado', 'portada', 'video_tiktok_url'),
+            'fields': ('nombre', 'sku', 'descripcion', 'categoria', 'precio', 'stock', 'destacado', 'portada', 'video_tiktok_url'),
         }),
         ('🏷️ Ofertas y Kits (Manual)', {
             'fields': ('en_oferta', 'precio_oferta', 'fecha_fin_oferta', 'etiqueta_oferta', 'es_combo', 'productos_incluidos'),
@@ -41,10 +57,51 @@ class ProductoAdmin(admin.ModelAdmin):
         }),
     )
 
+    change_list_template = 'admin/productos/producto/change_list.html'
+
     def hay_stock(self, obj):
         return "✅ Sí" if obj.stock > 0 else "❌ No"
     hay_stock.short_description = "Disponible"
 
+    # ──────────────────────────────────────────────
+    # 💲 Actualización masiva de precios (ver reglas_precios.py)
+    # ──────────────────────────────────────────────
+    def get_urls(self):
+        propias = [
+            path(
+                'actualizar-precios/',
+                self.admin_site.admin_view(self.actualizar_precios),
+                name='productos_producto_actualizar_precios',
+            ),
+        ]
+        return propias + super().get_urls()
+
+    def actualizar_precios(self, request):
+        if not self.has_change_permission(request):
+            return redirect('admin:productos_producto_changelist')
+
+        form = ReglasPreciosForm(request.POST or None, request.FILES or None)
+        cambios = sin_coincidencias = aplicables = None
+        if request.method == 'POST' and form.is_valid():
+            cambios, sin_coincidencias = calcular_cambios(form.cleaned_data['reglas_parseadas'])
+            aplicables = validos(cambios)
+            if 'aplicar' in request.POST:
+                productos = aplicar_cambios(aplicables)
+                self.message_user(request, f"✅ {len(aplicables)} cambios aplicados en {productos} productos.", messages.SUCCESS)
+                return redirect('admin:productos_producto_changelist')
+            # Vista previa: las reglas quedan en el form para el botón "Aplicar"
+            form = ReglasPreciosForm(initial={'reglas': form.cleaned_data['reglas']})
+
+        return render(request, 'admin/productos/producto/actualizar_precios.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Actualizar precios en masa',
+            'form': form,
+            'cambios': cambios,
+            'aplicables': aplicables,
+            'sin_coincidencias': sin_coincidencias,
+        })
+
 
 # ──────────────────────────────────────────────
 # 🔥 Admin: Campaña de Descuento Automática
@@ -174,3 +231,22 @@ class CodigoDescuentoAdmin(admin.ModelAdmin):
         else:
             return format_html('<span style="color:orange;">⏳ Próximo</span>')
     estado_validez.short_description = "Validez"
+
+
+# ──────────────────────────────────────────────
+# 🗂️ Admin: Índice de archivos subidos (solo lectura)
+# ──────────────────────────────────────────────
+@admin.register(ArchivoMedia)
+class ArchivoMediaAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'sha256_corto', 'tamanio', 'creado')
+    search_fields = ('nombre', 'sha256')
+    ordering = ('-creado',)
+    # Lo escribe el storage deduplicado; editarlo a mano rompería el reuso
+    readonly_fields = ('storage', 'sha256', 'nombre', 'url', 'tamanio', 'creado')
+
+    def sha256_corto(self, obj):
+        return obj.sha256[:12]
+    sha256_corto.short_description = "Hash"
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,162 @@
+"""
+Storage deduplicado por contenido para las fotos de producto.
+
+`load_products.py` y `update_banners.py` volvían a subir los mismos archivos
+en cada corrida, y el staff suele cargar la misma foto en varios kits. Este
+storage envuelve al real (Cloudinary o disco) y antes de subir calcula el
+SHA-256 del contenido: si ese contenido ya se subió, devuelve el nombre del
+objeto existente y no toca el storage.
+
+El índice hash → objeto vive en la tabla `ArchivoMedia` (una fila por
+storage real y hash). Lo que se subió antes de este storage no está en el
+índice: la primera vez que se vuelva a subir se indexa y desde ahí se reusa.
+
+Como un mismo objeto puede quedar referenciado por varios registros,
+`delete()` solo lo borra del storage real cuando ya ninguna foto
+(`PortadaProducto.imagen` ni `Producto.portada`) apunta a él; si se llama
+desde un registro que todavía lo tiene guardado, no hace nada. Antes de
+reusar un objeto indexado se verifica que siga existiendo en el storage real.
+"""
+import hashlib
+import logging
+
+from django.core.files import File
+from django.core.files.storage import Storage
+from django.db import IntegrityError, transaction
+from django.utils.deconstruct import deconstructible
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+
+def hash_contenido(content):
+    """(sha256 hex, tamaño en bytes) leyendo por bloques; deja el archivo al principio."""
+    sha = hashlib.sha256()
+    tamanio = 0
+    for bloque in content.chunks():
+        sha.update(bloque)
+        tamanio += len(bloque)
+    content.seek(0)
+    return sha.hexdigest(), tamanio
+
+
+def referenciado(nombre):
+    """True si alguna foto de producto sigue apuntando a ese objeto."""
+    from .models import PortadaProducto, Producto
+
+    return (
+        PortadaProducto.objects.filter(imagen=nombre).exists()
+        or Producto.objects.filter(portada=nombre).exists()
+    )
+
+
+def identificar_storage(storage):
+    """Clave estable del storage real: mismo contenido en otro destino es otro objeto."""
+    clase = type(storage)
+    destino = getattr(storage, 'location', '') or ''
+    if not destino and clase.__module__.startswith('cloudinary_storage'):
+        import cloudinary
+        destino = cloudinary.config().cloud_name or ''
+    return f'{clase.__module__}.{clase.__qualname__}:{destino}'
+
+
+@deconstructible
+class StorageDeduplicado(Storage):
+    def __init__(self, interno):
+        self.interno = interno
+
+    @cached_property
+    def clave(self):
+        return identificar_storage(self.interno)
+
+    # ──────────────────────────────────────────────
+    # 💾 Guardado con deduplicación
+    # ──────────────────────────────────────────────
+    def save(self, name, content, max_length=None):
+        from .models import ArchivoMedia
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        sha256, tamanio = hash_contenido(content)
+        existente = (
+            ArchivoMedia.objects.filter(storage=self.clave, sha256=sha256)
+            .values_list('nombre', flat=True).first()
+        )
+        if existente:
+            if self.interno.exists(existente):
+                logger.info("Contenido repetido (%s): se reusa %s", sha256[:12], existente)
+                return existente
+            # Lo borraron del storage real por fuera: se sube de nuevo
+            logger.warning("El objeto indexado %s ya no existe: se vuelve a subir", existente)
+            ArchivoMedia.objects.filter(storage=self.clave, sha256=sha256).delete()
+
+        nombre = self.interno.save(name, content, max_length=max_length)
+        try:
+            with transaction.atomic():
+                ArchivoMedia.objects.create(
+                    storage=self.clave, sha256=sha256, nombre=nombre,
+                    url=self.interno.url(nombre), tamanio=tamanio,
+                )
+        except IntegrityError:
+            # Otro proceso subió el mismo contenido a la vez: los dos objetos sirven
+            pass
+        return nombre
+
+    def delete(self, name):
+        from .models import ArchivoMedia
+
+        # El objeto puede estar compartido con otros registros: solo se borra sin referencias
+        if not name or referenciado(name):
+            return
+        ArchivoMedia.objects.filter(storage=self.clave, nombre=name).delete()
+        self.interno.delete(name)
+
+    # ──────────────────────────────────────────────
+    # ↪️ El resto va directo al storage real
+    # ──────────────────────────────────────────────
+    def _open(self, name, mode='rb'):
+        return self.interno.open(name, mode)
+
+    def exists(self, name):
+        return self.interno.exists(name)
+
+    def url(self, name):
+        return self.interno.url(name)
+
+    def size(self, name):
+        return self.interno.size(name)
+
+    def path(self, name):
+        return self.interno.path(name)
+
+    def listdir(self, path):
+        return self.interno.listdir(path)
+
+    def get_valid_name(self, name):
+        return self.interno.get_valid_name(name)
+
+    def get_alternative_name(self, file_root, file_ext):
+        return self.interno.get_alternative_name(file_root, file_ext)
+
+    def get_available_name(self, name, max_length=None):
+        return self.interno.get_available_name(name, max_length=max_length)
+
+    def generate_filename(self, filename):
+        return self.interno.generate_filename(filename)
+
+    def get_accessed_time(self, name):
+        return self.interno.get_accessed_time(name)
+
+    def get_created_time(self, name):
+        return self.interno.get_created_time(name)
+
+    def get_modified_time(self, name):
+        return self.interno.get_modified_time(name)
+
+
+def storage_real(storage):
+    """El storage que realmente guarda los archivos (sin el envoltorio)."""
+    return getattr(storage, 'interno', storage)
@@ -0,0 +1,94 @@
+"""
+Índice de prefijos en memoria para el autocompletado del buscador.
+
+Se guardan listas ORDENADAS de claves normalizadas y se busca con `bisect`,
+sin tocar la base: O(log n) para ubicar el prefijo + los `limite` resultados.
+Cada nombre se indexa también desde cada una de sus palabras, así "gat"
+sugiere "Rascador Gatito" y no solo lo que empieza con "gat".
+
+El índice vive en el proceso (cada worker de gunicorn tiene el suyo) y se
+reconstruye de forma perezosa cuando cambia el sello `version_catalogo()`,
+o como máximo cada `EDAD_MAXIMA` segundos. El sello se consulta a lo sumo
+cada `IndiceEnProceso.revisar_cada` segundos: una tecla no lee ni la base ni
+el caché compartido.
+"""
+import bisect
+
+from django.urls import reverse
+
+from biblioteca_plus.normalizacion import normalizar
+from .catalogo import IndiceEnProceso
+
+EDAD_MAXIMA = 300  # segundos
+FIN_PREFIJO = '\U0010ffff'  # mayor que cualquier carácter: cierra el rango del prefijo
+
+
+class IndicePrefijos:
+    """Índice inmutable: se construye entero y se reemplaza de una vez."""
+
+    def __init__(self, entradas):
+        # entradas: iterable de dicts con al menos 'texto'
+        self.items = list(entradas)
+        completos, internos = [], []
+        for posicion, item in enumerate(self.items):
+            palabras = normalizar(item['texto']).split()
+            if not palabras:
+                continue
+            completos.append((' '.join(palabras), posicion))
+            for i in range(1, len(palabras)):
+                internos.append((' '.join(palabras[i:]), posicion))
+        completos.sort()
+        internos.sort()
+        # Dos niveles: primero lo que EMPIEZA con el término, después el resto
+        self._niveles = [
+            ([c for c, _ in completos], [p for _, p in completos]),
+            ([c for c, _ in internos], [p for _, p in internos]),
+        ]
+
+    def buscar(self, termino, limite=8):
+        prefijo = normalizar(termino)
+        if not prefijo:
+            return []
+
+        vistos = set()
+        resultado = []
+        for claves, posiciones in self._niveles:
+            inicio = bisect.bisect_left(claves, prefijo)
+            fin = bisect.bisect_left(claves, prefijo + FIN_PREFIJO, lo=inicio)
+            for i in range(inicio, fin):
+                posicion = posiciones[i]
+                if posicion in vistos:
+                    continue
+                vistos.add(posicion)
+                resultado.append(self.items[posicion])
+                if len(resultado) >= limite:
+                    return resultado
+        return resultado
+
+
+# ──────────────────────────────────────────────
+# 🧠 Índice del proceso (perezoso, por versión de catálogo)
+# ──────────────────────────────────────────────
+def _construir():
+    from categorias.models import Categoria
+    from .models import Producto
+
+    url_producto = reverse('productos:producto_detail', args=[0]).replace('/0/', '/{}/')
+    url_catalogo = reverse('productos:producto_list')
+
+    entradas = [
+        {'texto': nombre, 'tipo': 'producto', 'url': url_producto.format(pk)}
+        for pk, nombre in Producto.objects.order_by().values_list('pk', 'nombre').iterator()
+    ]
+    entradas += [
+        {'texto': nombre, 'tipo': 'categoria', 'url': f'{url_catalogo}?categoria={pk}'}
+        for pk, nombre in Categoria.objects.order_by().values_list('pk', 'nombre')
+    ]
+    return IndicePrefijos(entradas)
+
+
+_indice = IndiceEnProceso(_construir, edad_maxima=EDAD_MAXIMA)
+
+
+def sugerir(termino, limite=8):
+    return _indice.obtener().buscar(termino, limite=limite)
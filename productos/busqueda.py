@@ -0,0 +1,205 @@
+"""
+Motor de búsqueda de texto completo del catálogo.
+
+Cada producto tiene un "documento" con pesos por campo:
+    nombre (A) > categoría y productos incluidos (B) > descripción (C)
+
+El índice vive en una tabla aparte, según el motor de base de datos:
+- PostgreSQL: tabla `productos_busqueda` con una columna tsvector y un índice GIN.
+- SQLite (desarrollo local): tabla virtual FTS5 `productos_busqueda_fts`, rankeada con bm25.
+
+La tabla se crea en la migración 0011 (con el SQL escrito ahí, no importado
+de acá), se mantiene al día con las señales de
+Producto/Categoria y se puede reconstruir con `python manage.py reconstruir_busqueda`.
+Con otros motores se cae a un prefijo sobre las claves `*_normalizado`.
+"""
+import re
+
+from biblioteca_plus.normalizacion import normalizar
+from django.db import connection as conexion_default
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+TABLA_PG = 'productos_busqueda'
+TABLA_FTS = 'productos_busqueda_fts'
+
+# Pesos de bm25 por columna (nombre, categoria, incluidos, descripcion)
+PESOS_FTS = (10.0, 4.0, 4.0, 1.0)
+
+
+def _terminos(termino):
+    return re.findall(r'\w+', normalizar(termino))
+
+
+def _motor(conexion=None):
+    return (conexion or conexion_default).vendor
+
+
+def documento_de(producto):
+    """Campos del documento buscable de un producto, ya normalizados."""
+    categoria = producto.categoria.nombre if producto.categoria_id and producto.categoria else ''
+    return (
+        normalizar(producto.nombre),
+        normalizar(categoria),
+        normalizar(producto.productos_incluidos),
+        normalizar(producto.descripcion),
+    )
+
+
+# ──────────────────────────────────────────────
+# 🏗️ Creación / borrado de la tabla del índice (la migración 0011 tiene su propia copia del SQL)
+# ──────────────────────────────────────────────
+def crear_indice(conexion):
+    motor = _motor(conexion)
+    with conexion.cursor() as cursor:
+        if motor == 'postgresql':
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {TABLA_PG} ("
+                " producto_id bigint PRIMARY KEY REFERENCES productos_producto(id) ON DELETE CASCADE,"
+                " documento tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {TABLA_PG}_gin ON {TABLA_PG} USING GIN (documento)"
+            )
+        elif motor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5("
+                " nombre, categoria, incluidos, descripcion,"
+                " tokenize = 'unicode61 remove_diacritics 2')"
+            )
+
+
+def eliminar_indice(conexion):
+    motor = _motor(conexion)
+    with conexion.cursor() as cursor:
+        if motor == 'postgresql':
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLA_PG}")
+        elif motor == 'sqlite':
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLA_FTS}")
+
+
+# ──────────────────────────────────────────────
+# 🔄 Sincronización del índice
+# ──────────────────────────────────────────────
+def indexar(productos, conexion=None):
+    """Inserta o reemplaza en el índice los documentos de los productos dados."""
+    conexion = conexion or conexion_default
+    motor = _motor(conexion)
+    filas = [(p.pk, *documento_de(p)) for p in productos]
+    if not filas:
+        return
+
+    with conexion.cursor() as cursor:
+        if motor == 'postgresql':
+            cursor.executemany(
+                f"INSERT INTO {TABLA_PG} (producto_id, documento) VALUES (%s,"
+                " setweight(to_tsvector('spanish', %s), 'A') ||"
+                " setweight(to_tsvector('spanish', %s), 'B') ||"
+                " setweight(to_tsvector('spanish', %s), 'B') ||"
+                " setweight(to_tsvector('spanish', %s), 'C'))"
+                " ON CONFLICT (producto_id) DO UPDATE SET documento = EXCLUDED.documento",
+                filas,
+            )
+        elif motor == 'sqlite':
+            # FTS5 no tiene UPSERT: borramos y volvemos a insertar por rowid
+            cursor.executemany(f"DELETE FROM {TABLA_FTS} WHERE rowid = %s", [(f[0],) for f in filas])
+            cursor.executemany(
+                f"INSERT INTO {TABLA_FTS} (rowid, nombre, categoria, incluidos, descripcion)"
+                " VALUES (%s, %s, %s, %s, %s)",
+                filas,
+            )
+
+
+def quitar(producto_ids, conexion=None):
+    conexion = conexion or conexion_default
+    motor = _motor(conexion)
+    ids = [(pk,) for pk in producto_ids]
+    if not ids:
+        return
+    with conexion.cursor() as cursor:
+        if motor == 'postgresql':
+            cursor.executemany(f"DELETE FROM {TABLA_PG} WHERE producto_id = %s", ids)
+        elif motor == 'sqlite':
+            cursor.executemany(f"DELETE FROM {TABLA_FTS} WHERE rowid = %s", ids)
+
+
+def reconstruir(Producto=None, conexion=None, batch_size=1000):
+    """Vacía el índice y lo vuelve a llenar con todo el catálogo, por lotes."""
+    if Producto is None:
+        from .models import Producto
+    conexion = conexion or conexion_default
+    motor = _motor(conexion)
+
+    with conexion.cursor() as cursor:
+        if motor == 'postgresql':
+            cursor.execute(f"TRUNCATE {TABLA_PG}")
+        elif motor == 'sqlite':
+            cursor.execute(f"DELETE FROM {TABLA_FTS}")
+        else:
+            return 0
+
+    qs = (
+        Producto.objects.select_related('categoria')
+        .only('pk', 'nombre', 'descripcion', 'productos_incluidos', 'categoria__nombre')
+        .order_by('pk')
+    )
+    total = 0
+    ultimo_pk = 0
+    while True:
+        lote = list(qs.filter(pk__gt=ultimo_pk)[:batch_size])
+        if not lote:
+            break
+        ultimo_pk = lote[-1].pk
+        indexar(lote, conexion=conexion)
+        total += len(lote)
+    return total
+
+
+# ──────────────────────────────────────────────
+# 🔎 Consulta
+# ──────────────────────────────────────────────
+def buscar(queryset, termino):
+    """
+    Filtra el queryset de productos por `termino` y lo anota con `relevancia`
+    (mayor = más relevante). Cada palabra se busca como prefijo, así
+    "rasc gat" encuentra "Rascador para gatos".
+    """
+    terminos = _terminos(termino)
+    if not terminos:
+        return queryset
+
+    motor = _motor()
+    tabla_producto = queryset.model._meta.db_table
+
+    if motor == 'postgresql':
+        consulta = ' & '.join(f'{t}:*' for t in terminos)
+        relevancia = RawSQL(
+            f"SELECT ts_rank_cd(b.documento, to_tsquery('spanish', %s)) FROM {TABLA_PG} b"
+            f" WHERE b.producto_id = {tabla_producto}.id",
+            (consulta,),
+        )
+        coincidencias = RawSQL(
+            f"SELECT producto_id FROM {TABLA_PG} WHERE documento @@ to_tsquery('spanish', %s)",
+            (consulta,),
+        )
+    elif motor == 'sqlite':
+        consulta = ' '.join(f'"{t}"*' for t in terminos)
+        pesos = ', '.join(str(p) for p in PESOS_FTS)
+        # bm25 devuelve valores negativos (más chico = mejor): lo invertimos
+        relevancia = RawSQL(
+            f"SELECT -bm25({TABLA_FTS}, {pesos}) FROM {TABLA_FTS}"
+            f" WHERE {TABLA_FTS} MATCH %s AND rowid = {tabla_producto}.id",
+            (consulta,),
+        )
+        coincidencias = RawSQL(
+            f"SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s",
+            (consulta,),
+        )
+    else:
+        # Sin índice de texto completo: prefijo sobre las claves normalizadas
+        clave = ' '.join(terminos)
+        return queryset.filter(
+            Q(nombre_normalizado__startswith=clave) | Q(categoria__nombre_normalizado__startswith=clave)
+        )
+
+    return queryset.filter(id__in=coincidencias).annotate(relevancia=relevancia)
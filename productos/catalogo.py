@@ -0,0 +1,119 @@
+"""
+Sellos de versión del catálogo.
+
+- `catalogo_version` cambia cada vez que se crea, edita o borra un producto,
+  una categoría o una campaña (ver `productos/signals.py`). Los índices en
+  memoria y los fragmentos cacheados guardan la versión con la que se
+  construyeron y se regeneran solos cuando el sello cambia.
+- `stock_version` cambia con cada movimiento de stock de una venta, una
+  entrega o una reposición (ver `ventas/stock.py`). Solo lo miran los que
+  dependen del stock, como las facetas ("Con stock (12)"): una venta
+  relámpago no obliga a rearmar los índices de búsqueda y autocompletado.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+
+CLAVE_VERSION = 'catalogo_version'
+CLAVE_STOCK = 'stock_version'
+
+# Cuántas veces invalidó el catálogo ESTE proceso: los índices en memoria lo
+# ven sin leer el caché (ver `IndiceEnProceso`)
+_generacion_local = 0
+
+
+def _version(clave):
+    version = cache.get(clave)
+    if version is None:
+        # Arranque en frío (o caché vaciado): cualquier valor nuevo invalida lo anterior
+        version = int(time.time() * 1000)
+        if not cache.add(clave, version, None):
+            version = cache.get(clave, version)
+    return version
+
+
+def _invalidar(clave):
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        # La clave no existía: la creamos
+        return _version(clave)
+
+
+def version_catalogo():
+    return _version(CLAVE_VERSION)
+
+
+def invalidar_catalogo():
+    global _generacion_local
+    _generacion_local += 1
+    return _invalidar(CLAVE_VERSION)
+
+
+def version_stock():
+    return _version(CLAVE_STOCK)
+
+
+def invalidar_stock():
+    return _invalidar(CLAVE_STOCK)
+
+
+class IndiceEnProceso:
+    """
+    Estructura en memoria del proceso que depende del catálogo.
+
+    `construir` es una función sin argumentos que arma el índice desde la base.
+    Se llama de forma perezosa la primera vez, cuando cambia `version_catalogo()`
+    o cuando pasaron más de `edad_maxima` segundos (cada worker tiene su propia
+    copia y el sello puede haber cambiado en otro proceso).
+
+    El sello vive en el caché compartido (en producción, una tabla de la base):
+    leerlo en cada `obtener` costaría una query por tecla del autocompletado.
+    Se lee a lo sumo cada `revisar_cada` segundos; entre lecturas el índice
+    sale de memoria sin I/O. Lo que invalida este mismo proceso
+    (`invalidar_catalogo`) se ve al instante; lo de otros workers, con ese
+    retraso.
+    """
+
+    def __init__(self, construir, edad_maxima=300, revisar_cada=5):
+        self.construir = construir
+        self.edad_maxima = edad_maxima
+        self.revisar_cada = revisar_cada
+        self._indice = None
+        self._version = None
+        self._construido_en = 0.0
+        self._revisado_en = 0.0
+        self._generacion = None
+        self._lock = threading.Lock()
+
+    def _vigente(self, version):
+        return (
+            self._indice is not None
+            and self._version == version
+            and time.monotonic() - self._construido_en < self.edad_maxima
+        )
+
+    def _revisado_hace_poco(self):
+        ahora = time.monotonic()
+        return (
+            self._indice is not None
+            and self._generacion == _generacion_local
+            and ahora - self._revisado_en < self.revisar_cada
+            and ahora - self._construido_en < self.edad_maxima
+        )
+
+    def obtener(self):
+        if self._revisado_hace_poco():
+            return self._indice
+        generacion = _generacion_local
+        version = version_catalogo()
+        with self._lock:
+            # Otro hilo pudo haberlo reconstruido mientras esperábamos el lock
+            if not self._vigente(version):
+                self._indice = self.construir()
+                self._version = version
+                self._construido_en = time.monotonic()
+            self._revisado_en = time.monotonic()
+            self._generacion = generacion
+        return self._indice
@@ -0,0 +1,210 @@
+"""
+Derivados responsive de las fotos de producto.
+
+Las fotos se subían y se servían en su tamaño original; la tarjeta de la home
+las recortaba con CSS (`height: 260px; object-fit: cover`). Acá se resuelven
+versiones a anchos fijos y el template tag `{% imagen_responsive %}` (ver
+`templatetags/imagenes.py`) arma el `srcset`/`sizes` para que el navegador
+baje la más chica que le alcance.
+
+Dos caminos según el storage del campo:
+
+- Cloudinary (`MediaCloudinaryStorage`): no se guarda nada, se piden
+  transformaciones en la URL (`c_limit,f_auto,q_auto,w_400`). El CDN elige
+  AVIF/WebP según el navegador y cachea el resultado.
+- Disco (`FileSystemStorage`): al guardar la foto se generan con Pillow los
+  archivos `derivados/<nombre>_<ancho>w.avif|webp` y se ofrecen con
+  `<picture>`. El uso "email" se genera en JPEG: los clientes de correo no
+  soportan WebP/AVIF de forma pareja.
+
+Nunca se agranda una foto: los anchos mayores al original se omiten.
+"""
+import io
+import logging
+import os
+from dataclasses import dataclass
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .almacenamiento import storage_real
+
+logger = logging.getLogger(__name__)
+
+CARPETA = 'derivados'
+
+# Ancho fijo (px) de cada uso
+ANCHOS = {
+    'card': 400,
+    'email': 600,
+    'galeria': 800,
+    'zoom': 1600,
+}
+
+# Atributo `sizes` de cada uso: cuánto ocupa la imagen en pantalla
+TAMANIOS = {
+    'card': '(max-width: 576px) 100vw, (max-width: 992px) 50vw, 300px',
+    'galeria': '(max-width: 992px) 100vw, 58vw',
+    'zoom': '100vw',
+    'miniatura': '80px',
+    'email': '600px',
+}
+
+# (extensión, tipo MIME, opciones de Pillow); el orden es el de preferencia en <picture>
+FORMATOS = (
+    ('avif', 'image/avif', {'quality': 55}),
+    ('webp', 'image/webp', {'quality': 80, 'method': 4}),
+)
+FORMATO_EMAIL = ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True})
+
+ANCHOS_SRCSET = sorted(ancho for uso, ancho in ANCHOS.items() if uso != 'email')
+
+
+@dataclass(frozen=True, slots=True)
+class ImagenResponsive:
+    """Lo que necesita el template para una foto: se puede guardar en caché."""
+    src: str                # URL de respaldo (navegadores sin srcset)
+    srcset: str = ''        # candidatos cuando el formato lo decide el CDN
+    fuentes: tuple = ()     # ((tipo MIME, srcset), ...) para <picture>
+
+
+# ──────────────────────────────────────────────
+# 🧭 Nombres y storage
+# ──────────────────────────────────────────────
+def es_cloudinary(storage):
+    storage = storage_real(storage)
+    try:
+        from cloudinary_storage.storage import MediaCloudinaryStorage
+    except ImportError:
+        return False
+    return isinstance(storage, MediaCloudinaryStorage)
+
+
+def nombre_derivado(nombre, ancho, extension):
+    base, _ = os.path.splitext(nombre)
+    return f'{CARPETA}/{base}_{ancho}w.{extension}'
+
+
+def _url_cloudinary(storage, nombre, ancho=None, formato='auto'):
+    transformacion = f'c_limit,f_{formato},q_auto'
+    if ancho:
+        transformacion += f',w_{ancho}'
+    return storage.url(nombre).replace('/upload/', f'/upload/{transformacion}/', 1)
+
+
+# ──────────────────────────────────────────────
+# 🏭 Generación (solo storage en disco)
+# ──────────────────────────────────────────────
+def _guardar(storage, nombre, imagen, formato, opciones):
+    buffer = io.BytesIO()
+    imagen.save(buffer, format=formato, **opciones)
+    if storage.exists(nombre):
+        storage.delete(nombre)
+    storage.save(nombre, ContentFile(buffer.getvalue()))
+
+
+def _achicada(original, ancho):
+    if original.width <= ancho:
+        return original
+    alto = round(original.height * ancho / original.width)
+    return original.resize((ancho, alto), Image.Resampling.LANCZOS)
+
+
+def generar_derivados(archivo, forzar=False):
+    """
+    Genera los derivados de un ImageField ya guardado. Con Cloudinary no hace
+    nada (los derivados son URLs). Si ya existen no los rehace, salvo `forzar`.
+    Devuelve la cantidad de archivos escritos.
+    """
+    if not archivo or es_cloudinary(archivo.storage):
+        return 0
+
+    # Los derivados tienen nombre fijo: van directo al storage real, sin deduplicar
+    storage, nombre = storage_real(archivo.storage), archivo.name
+    # El más chico siempre se genera: sirve de marca de "ya procesada"
+    if not forzar and storage.exists(nombre_derivado(nombre, ANCHOS_SRCSET[0], FORMATOS[-1][0])):
+        return 0
+
+    with storage.open(nombre, 'rb') as f:
+        original = ImageOps.exif_transpose(Image.open(f))
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+
+    escritos = 0
+    for ancho in ANCHOS_SRCSET:
+        if ancho > original.width and ancho != ANCHOS_SRCSET[0]:
+            continue
+        achicada = _achicada(original, ancho)
+        for extension, _, opciones in FORMATOS:
+            _guardar(storage, nombre_derivado(nombre, ancho, extension), achicada, extension.upper(), opciones)
+            escritos += 1
+
+    extension, formato, opciones = FORMATO_EMAIL
+    _guardar(
+        storage, nombre_derivado(nombre, ANCHOS['email'], extension),
+        _achicada(original, ANCHOS['email']).convert('RGB'), formato, opciones,
+    )
+    return escritos + 1
+
+
+def generar_derivados_seguro(archivo):
+    """Para señales: una foto rara no puede impedir guardar el producto."""
+    try:
+        return generar_derivados(archivo)
+    except Exception:
+        logger.exception("No se pudieron generar los derivados de %s", getattr(archivo, 'name', archivo))
+        return 0
+
+
+def borrar_derivados(storage, nombre):
+    if not nombre or es_cloudinary(storage):
+        return
+    storage = storage_real(storage)
+    nombres = [nombre_derivado(nombre, a, ext) for a in ANCHOS_SRCSET for ext, _, _ in FORMATOS]
+    nombres.append(nombre_derivado(nombre, ANCHOS['email'], FORMATO_EMAIL[0]))
+    for derivado in nombres:
+        try:
+            if storage.exists(derivado):
+                storage.delete(derivado)
+        except Exception:
+            logger.exception("No se pudo borrar el derivado %s", derivado)
+
+
+# ──────────────────────────────────────────────
+# 🖼️ Lectura: URLs para el template
+# ──────────────────────────────────────────────
+def imagen_responsive(storage, nombre):
+    """`ImagenResponsive` de un archivo, o None si no hay nombre."""
+    if not nombre:
+        return None
+
+    storage = storage_real(storage)
+    if es_cloudinary(storage):
+        srcset = ', '.join(f'{_url_cloudinary(storage, nombre, a)} {a}w' for a in ANCHOS_SRCSET)
+        return ImagenResponsive(src=_url_cloudinary(storage, nombre), srcset=srcset)
+
+    fuentes = []
+    for extension, tipo, _ in FORMATOS:
+        candidatos = []
+        for ancho in ANCHOS_SRCSET:
+            derivado = nombre_derivado(nombre, ancho, extension)
+            if storage.exists(derivado):
+                candidatos.append(f'{storage.url(derivado)} {ancho}w')
+        if candidatos:
+            fuentes.append((tipo, ', '.join(candidatos)))
+    return ImagenResponsive(src=storage.url(nombre), fuentes=tuple(fuentes))
+
+
+def url_variante(storage, nombre, uso):
+    """Una sola URL al ancho del uso (p. ej. correos, donde no hay srcset)."""
+    if not nombre:
+        return None
+    ancho = ANCHOS[uso]
+    storage = storage_real(storage)
+    if es_cloudinary(storage):
+        return _url_cloudinary(storage, nombre, ancho, 'jpg' if uso == 'email' else 'auto')
+
+    extension = FORMATO_EMAIL[0] if uso == 'email' else FORMATOS[-1][0]
+    derivado = nombre_derivado(nombre, ancho, extension)
+    return storage.url(derivado) if storage.exists(derivado) else storage.url(nombre)
@@ -0,0 +1,202 @@
+"""
+Facetas del catálogo: los contadores del lateral ("Accesorios (23)").
+
+Todo sale de UNA sola query agrupada por categoría con `Count(filter=...)`
+condicionales, en vez de un COUNT por opción del filtro:
+
+    SELECT categoria_id,
+           COUNT(*) FILTER (WHERE <precio> AND <stock> ...)  AS total,
+           COUNT(*) FILTER (WHERE precio_efectivo < 5000 ...) AS precio_0,
+           ...
+    FROM productos_producto WHERE <búsqueda> GROUP BY categoria_id
+
+Cada contador aplica todos los filtros activos MENOS el de su propia
+dimensión, así al elegir una categoría las demás siguen mostrando cuántos
+productos tendrían. Los contadores que no son de categoría se suman en Python
+solo sobre la fila de la categoría elegida.
+
+El resultado se cachea por la firma normalizada de los filtros y las versiones
+del catálogo y del stock (ver `productos/catalogo.py`): cualquier alta,
+edición, cambio de precio o venta genera claves nuevas y lo anterior expira
+solo.
+"""
+import hashlib
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+
+from biblioteca_plus.normalizacion import normalizar
+from . import busqueda
+from .catalogo import version_catalogo, version_stock
+
+TIEMPO_CACHE = 600  # segundos
+
+# Rangos de precio efectivo: [desde, hasta) ; None = sin límite
+RANGOS_PRECIO = (
+    (None, Decimal('5000')),
+    (Decimal('5000'), Decimal('10000')),
+    (Decimal('10000'), Decimal('20000')),
+    (Decimal('20000'), None),
+)
+CENTAVO = Decimal('0.01')
+
+
+# ──────────────────────────────────────────────
+# 🧾 Filtros normalizados
+# ──────────────────────────────────────────────
+def _decimal(valor):
+    try:
+        numero = Decimal(str(valor).strip())
+    except (InvalidOperation, ValueError):
+        return None
+    return numero if numero.is_finite() else None
+
+
+def _entero(valor):
+    try:
+        return int(str(valor).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def leer_filtros(params):
+    """
+    Normaliza los filtros del catálogo desde un QueryDict (request.GET).
+    Los valores inválidos se descartan, igual que si no vinieran.
+    """
+    return {
+        'search': ' '.join(normalizar(params.get('search', '')).split()),
+        'categoria': _entero(params.get('categoria')),
+        'min_precio': _decimal(params.get('min_precio')) if params.get('min_precio') else None,
+        'max_precio': _decimal(params.get('max_precio')) if params.get('max_precio') else None,
+        'stock_min': _entero(params.get('stock_min')),
+        'oferta': params.get('oferta') == '1',
+        'combo': params.get('combo') == '1',
+    }
+
+
+def firma(filtros):
+    """Clave estable para el caché: mismo filtro escrito distinto = misma firma."""
+    partes = []
+    for clave in sorted(filtros):
+        valor = filtros[clave]
+        if isinstance(valor, Decimal):
+            valor = valor.normalize()
+        partes.append(f'{clave}={valor}')
+    return hashlib.md5('&'.join(partes).encode()).hexdigest()
+
+
+def q_en_oferta():
+    """En oferta = el precio que ve el cliente es menor al de lista (oferta o campaña)."""
+    return Q(precio_efectivo__lt=F('precio'))
+
+
+def _q_precio(filtros):
+    q = Q()
+    if filtros['min_precio'] is not None:
+        q &= Q(precio_efectivo__gte=filtros['min_precio'])
+    if filtros['max_precio'] is not None:
+        q &= Q(precio_efectivo__lte=filtros['max_precio'])
+    return q
+
+
+def _q_rango(desde, hasta):
+    q = Q()
+    if desde is not None:
+        q &= Q(precio_efectivo__gte=desde)
+    if hasta is not None:
+        q &= Q(precio_efectivo__lt=hasta)
+    return q
+
+
+def _q_stock(filtros):
+    return Q(stock__gte=filtros['stock_min']) if filtros['stock_min'] is not None else Q()
+
+
+def _q_marcas(filtros, sin=None):
+    """Filtros de oferta/combo; `sin` excluye una de las dos dimensiones."""
+    q = Q()
+    if filtros['oferta'] and sin != 'oferta':
+        q &= q_en_oferta()
+    if filtros['combo'] and sin != 'combo':
+        q &= Q(es_combo=True)
+    return q
+
+
+# ──────────────────────────────────────────────
+# 📊 Cálculo
+# ──────────────────────────────────────────────
+def _calcular(queryset, filtros):
+    precio, stock = _q_precio(filtros), _q_stock(filtros)
+    marcas = _q_marcas(filtros)
+
+    contadores = {
+        'total': Count('id', filter=precio & stock & marcas),
+        'con_stock': Count('id', filter=precio & marcas & Q(stock__gt=0)),
+        'sin_stock': Count('id', filter=precio & marcas & Q(stock=0)),
+        'oferta': Count('id', filter=precio & stock & _q_marcas(filtros, sin='oferta') & q_en_oferta()),
+        'combo': Count('id', filter=precio & stock & _q_marcas(filtros, sin='combo') & Q(es_combo=True)),
+    }
+    for i, (desde, hasta) in enumerate(RANGOS_PRECIO):
+        contadores[f'precio_{i}'] = Count('id', filter=stock & marcas & _q_rango(desde, hasta))
+
+    filas = list(
+        queryset.order_by()
+        .values('categoria_id')
+        .annotate(**contadores)
+    )
+
+    # Dimensiones que no son de categoría: solo la categoría elegida (o todas)
+    elegida = filtros['categoria']
+    suma = dict.fromkeys(contadores, 0)
+    for fila in filas:
+        if elegida is None or fila['categoria_id'] == elegida:
+            for clave in contadores:
+                suma[clave] += fila[clave]
+
+    # Solo los contadores por id: los nombres ya los trae el listado para el <select>
+    por_categoria = {f['categoria_id']: f['total'] for f in filas}
+
+    rangos = []
+    for i, (desde, hasta) in enumerate(RANGOS_PRECIO):
+        rangos.append({
+            'desde': desde,
+            'hasta': hasta,
+            # El filtro del listado es inclusivo (<=): el link corta un centavo antes
+            'min_precio': str(desde) if desde is not None else '',
+            'max_precio': str(hasta - CENTAVO) if hasta is not None else '',
+            'cantidad': suma[f'precio_{i}'],
+        })
+
+    return {
+        'total': suma['total'],
+        'categorias': por_categoria,
+        'precios': rangos,
+        'con_stock': suma['con_stock'],
+        'sin_stock': suma['sin_stock'],
+        'oferta': suma['oferta'],
+        'combo': suma['combo'],
+    }
+
+
+def calcular_facetas(filtros, queryset=None):
+    """
+    Contadores de facetas para el estado de filtros dado (ver `leer_filtros`).
+    `queryset` es la base sin filtros (por defecto todo el catálogo); la
+    búsqueda de texto se aplica acá.
+    """
+    clave = f"facetas:{version_catalogo()}:{version_stock()}:{firma(filtros)}"
+    resultado = cache.get(clave)
+    if resultado is not None:
+        return resultado
+
+    if queryset is None:
+        from .models import Producto
+        queryset = Producto.objects.all()
+    if filtros['search']:
+        queryset = busqueda.buscar(queryset, filtros['search'])
+
+    resultado = _calcular(queryset, filtros)
+    cache.set(clave, resultado, TIEMPO_CACHE)
+    return resultado
@@ -108,3 +108,33 @@ class PortadasMultiplesForm(forms.Form):
                 raise forms.ValidationError(f"Formato no permitido en {f.name}. Usa JPG, JPEG, PNG o WEBP.")
 
         return files
+
+
+# ✅ Reglas de precios para la actualización masiva (admin de productos)
+class ReglasPreciosForm(forms.Form):
+    archivo = forms.FileField(
+        label="Archivo de reglas", required=False,
+        help_text="CSV o JSON con las columnas sku/id/nombre, campo, cambio y redondeo.",
+    )
+    # Después de la vista previa las reglas viajan en el form para poder aplicarlas
+    reglas = forms.CharField(widget=forms.HiddenInput, required=False)
+
+    def clean(self):
+        from .reglas_precios import ReglaInvalida, leer_reglas
+
+        datos = super().clean()
+        archivo = datos.get('archivo')
+        if archivo:
+            if archivo.size > 1024 * 1024:
+                raise forms.ValidationError("El archivo de reglas no puede superar 1 MB.")
+            try:
+                datos['reglas'] = archivo.read().decode('utf-8-sig')
+            except UnicodeDecodeError:
+                raise forms.ValidationError("El archivo tiene que estar en UTF-8.")
+        if not datos.get('reglas'):
+            raise forms.ValidationError("Subí un archivo de reglas.")
+        try:
+            datos['reglas_parseadas'] = leer_reglas(datos['reglas'])
+        except ReglaInvalida as e:
+            raise forms.ValidationError(str(e))
+        return datos
@@ -0,0 +1,154 @@
+"""
+Versión por producto para el caché de fragmentos de las tarjetas.
+
+Cada producto tiene en el caché un sello `tarjeta_version:<id>` que cambia
+cuando cambia algo que se ve en su tarjeta: el producto, sus portadas, su
+categoría o su precio efectivo (campañas y ofertas, ver `precios.py`).
+La tarjeta renderizada se guarda con la clave
+
+    tarjeta:<variante>:<id>:<versión>:<tramo de stock>:<plantilla>
+
+así que invalidar es solo cambiar el sello: lo anterior deja de leerse y
+expira solo. El tramo de stock es el stock libre tal como lo muestran las
+tarjetas ("¡Últimos 3!", hasta `TOPE_STOCK_VISIBLE`): cuando otro carrito
+reserva o libera unidades (ver `lectura.descontar_reservas`) la tarjeta cambia
+de clave sin tocar el sello. La clave no depende del usuario; lo que sí depende (token CSRF,
+controles de staff) queda FUERA del bloque cacheado en los templates.
+
+Uso en un template:
+
+    {% load tarjetas %}
+    {% tarjeta_cacheada producto "catalogo" %} ...HTML de la tarjeta... {% endtarjeta_cacheada %}
+
+Las vistas pueden llamar a `precargar_versiones(productos)` para traer los
+sellos de toda la página en una sola lectura del caché, y poner en el contexto
+un `LoteTarjetas` (con `LoteTarjetasMixin`) para que las tarjetas también se
+lean juntas, una lectura por variante, y las que faltaban se escriban en una
+sola escritura al terminar de renderizar.
+"""
+import time
+
+from django.core.cache import cache
+
+PREFIJO_VERSION = 'tarjeta_version'
+TIEMPO_TARJETA = 60 * 60 * 24  # un día; el sello invalida antes si hace falta
+NOMBRE_LOTE = 'lote_tarjetas'  # variable de contexto que lee `{% tarjeta_cacheada %}`
+TOPE_STOCK_VISIBLE = 10  # desde acá las tarjetas no muestran la cantidad
+
+
+def _clave_version(pk):
+    return f'{PREFIJO_VERSION}:{pk}'
+
+
+def _nuevo_sello():
+    return time.time_ns()
+
+
+def versiones(producto_ids):
+    """{id: sello} para los productos dados, creando los que falten."""
+    claves = {_clave_version(pk): pk for pk in producto_ids}
+    encontrados = cache.get_many(claves)
+    resultado = {claves[clave]: sello for clave, sello in encontrados.items()}
+
+    faltantes = {clave: _nuevo_sello() for clave in claves if clave not in encontrados}
+    if faltantes:
+        # Sin vencimiento: el sello solo cambia cuando cambia el producto
+        cache.set_many(faltantes, None)
+        resultado.update({claves[clave]: sello for clave, sello in faltantes.items()})
+    return resultado
+
+
+def _sello_precargado(producto):
+    if hasattr(producto, '__dict__'):
+        return producto.__dict__.get('_version_tarjeta')
+    # Modelos de lectura inmutables (ver `productos/lectura.py`)
+    return getattr(producto, 'version_tarjeta', None)
+
+
+def version_producto(producto):
+    """Sello del producto; usa el precargado por `precargar_versiones` si existe."""
+    sello = _sello_precargado(producto)
+    if sello is None:
+        sello = versiones([producto.pk])[producto.pk]
+        if hasattr(producto, '__dict__'):
+            producto._version_tarjeta = sello
+    return sello
+
+
+def precargar_versiones(productos):
+    """
+    Precarga el sello de cada producto (una sola lectura del caché) y devuelve
+    la lista. Las `ProductoCard` son inmutables: se devuelven copias con el
+    sello, así que hay que usar el valor devuelto.
+    """
+    productos = [p for p in productos if p is not None]
+    sellos = versiones([p.pk for p in productos])
+    resultado = []
+    for producto in productos:
+        if hasattr(producto, 'con_version'):
+            producto = producto.con_version(sellos[producto.pk])
+        else:
+            producto._version_tarjeta = sellos[producto.pk]
+        resultado.append(producto)
+    return resultado
+
+
+def invalidar_tarjetas(producto_ids):
+    """Cambia el sello de los productos: sus tarjetas cacheadas dejan de usarse."""
+    sello = _nuevo_sello()
+    nuevos = {_clave_version(pk): sello for pk in producto_ids}
+    if nuevos:
+        cache.set_many(nuevos, None)
+
+
+# ──────────────────────────────────────────────
+# 📦 Tarjetas de una página, en lote
+# ──────────────────────────────────────────────
+def clave_tarjeta(variante, producto, huella):
+    tramo = min(max(producto.stock, 0), TOPE_STOCK_VISIBLE)
+    return f'tarjeta:{variante}:{producto.pk}:{version_producto(producto)}:{tramo}:{huella}'
+
+
+class LoteTarjetas:
+    """
+    Las tarjetas que va a mostrar una página. La primera tarjeta de cada
+    variante trae del caché las de todos los productos con un `get_many`;
+    las que no estaban se juntan y `escribir` las guarda con un `set_many`.
+    """
+
+    def __init__(self, productos):
+        self.productos = {p.pk: p for p in productos if p is not None}
+        self._leidas = {}   # (variante, huella) -> {clave: html}
+        self._nuevas = {}
+
+    def _leer(self, variante, huella):
+        leidas = self._leidas.get((variante, huella))
+        if leidas is None:
+            claves = [clave_tarjeta(variante, p, huella) for p in self.productos.values()]
+            leidas = self._leidas[(variante, huella)] = cache.get_many(claves)
+        return leidas
+
+    def obtener(self, clave, variante, producto, huella):
+        """El HTML cacheado, o None. Productos ajenos al lote se leen sueltos."""
+        if producto.pk not in self.productos:
+            return cache.get(clave)
+        return self._leer(variante, huella).get(clave)
+
+    def guardar(self, clave, html):
+        self._nuevas[clave] = html
+
+    def escribir(self):
+        if self._nuevas:
+            cache.set_many(self._nuevas, TIEMPO_TARJETA)
+            self._nuevas = {}
+
+
+class LoteTarjetasMixin:
+    """Escribe las tarjetas que faltaban del `LoteTarjetas` del contexto al terminar de renderizar."""
+
+    def render_to_response(self, context, **response_kwargs):
+        respuesta = super().render_to_response(context, **response_kwargs)
+        lote = context.get(NOMBRE_LOTE)
+        if lote is not None:
+            respuesta.add_post_render_callback(lambda _respuesta: lote.escribir())
+        return respuesta
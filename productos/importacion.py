@@ -0,0 +1,346 @@
+"""
+Importación masiva del catálogo desde un feed de proveedor (CSV o JSONL).
+
+Reemplaza a `load_products.py`, que tenía la lista de productos escrita en el
+código y los guardaba de a uno (`update_or_create` + `portada.save` = varias
+idas y vueltas a Neon por producto). Acá:
+
+- el archivo se lee en streaming y se procesa por lotes de `batch_size`
+  filas: la memoria no depende del tamaño del feed;
+- cada lote es una transacción con un único `bulk_create(update_conflicts=True)`
+  por el `sku` (upsert), más el recálculo de precio efectivo y del índice de
+  búsqueda de esos productos, que `bulk_create` no dispara por señales;
+- un producto cargado a mano sin SKU se "adopta" si coincide el nombre, así
+  la primera importación no lo duplica;
+- una celda vacía no se importa: en un producto que ya existe no borra la
+  categoría ni deja el stock en 0 (el feed del proveedor suele venir
+  incompleto); en uno nuevo queda el valor por defecto del modelo;
+- las imágenes se suben en un pool de hilos mientras se procesan los lotes
+  siguientes, y las portadas se asignan con `bulk_update`. El storage
+  deduplica por contenido: reimportar el mismo feed no vuelve a subir fotos.
+"""
+import csv
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from decimal import Decimal
+from itertools import islice
+from urllib.parse import urlparse
+from urllib.request import urlopen
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from biblioteca_plus.inicio import invalidar_home
+from biblioteca_plus.normalizacion import normalizar
+from categorias.models import Categoria
+
+from . import busqueda
+from .catalogo import invalidar_catalogo
+from .derivados import generar_derivados_seguro
+from .fragmentos import invalidar_tarjetas
+from .models import Producto
+from .precios import recalcular_precios_efectivos
+
+# Columnas del feed que van directo al modelo (además de sku, categoria e imagen)
+CAMPOS = (
+    'nombre', 'descripcion', 'precio', 'stock', 'destacado',
+    'precio_oferta', 'en_oferta', 'en_carrusel', 'fecha_fin_oferta',
+    'es_combo', 'etiqueta_oferta', 'productos_incluidos',
+    'peso_gramos', 'largo_cm', 'ancho_cm', 'alto_cm', 'video_tiktok_url',
+)
+OBLIGATORIOS_ALTA = ('nombre', 'precio')
+# Los feeds traen de todo en las columnas booleanas
+VERDADEROS = {'1', 'true', 't', 'si', 'sí', 's', 'yes', 'y', 'x'}
+FALSOS = {'0', 'false', 'f', 'no', 'n'}
+MAXIMO_ERRORES_DETALLADOS = 50
+
+
+class FilaInvalida(ValueError):
+    pass
+
+
+# ──────────────────────────────────────────────
+# 📄 Lectura en streaming
+# ──────────────────────────────────────────────
+def leer_filas(ruta, formato=None):
+    """
+    Genera (número de línea, fila) sin cargar el archivo entero. En CSV la fila
+    es un dict; en JSONL es la línea cruda (se parsea al convertirla, así una
+    línea rota es un error de esa fila y no corta la importación).
+    """
+    formato = formato or ('jsonl' if ruta.lower().endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(ruta, encoding='utf-8-sig', newline='') as f:
+        if formato == 'csv':
+            lector = csv.DictReader(f)
+            for fila in lector:
+                yield lector.line_num, fila
+        else:
+            for numero, linea in enumerate(f, 1):
+                if linea.strip():
+                    yield numero, linea
+
+
+def _lotes(iterable, tamanio):
+    iterador = iter(iterable)
+    while lote := list(islice(iterador, tamanio)):
+        yield lote
+
+
+def _convertir(fila):
+    """
+    (sku, valores del modelo, nombre de categoría o None, imagen o None).
+    Las celdas vacías no entran en los valores (ni la categoría vacía).
+    """
+    if isinstance(fila, str):
+        try:
+            fila = json.loads(fila)
+        except ValueError as e:
+            raise FilaInvalida(f"JSON inválido: {e}")
+        if not isinstance(fila, dict):
+            raise FilaInvalida("Cada línea tiene que ser un objeto JSON")
+
+    sku = str(fila.get('sku') or '').strip()
+    if not sku:
+        raise FilaInvalida("Falta el sku")
+
+    valores = {}
+    for nombre in CAMPOS:
+        if nombre not in fila:
+            continue
+        campo = Producto._meta.get_field(nombre)
+        valor = fila[nombre]
+        if isinstance(valor, str):
+            valor = valor.strip()
+        if valor in ('', None):
+            continue
+        if campo.get_internal_type() == 'BooleanField' and isinstance(valor, str):
+            if valor.lower() in VERDADEROS:
+                valor = True
+            elif valor.lower() in FALSOS:
+                valor = False
+        try:
+            valor = campo.clean(valor, None)
+        except ValidationError as e:
+            raise FilaInvalida(f"{nombre}: {' '.join(e.messages)}")
+        if nombre == 'fecha_fin_oferta' and valor and timezone.is_naive(valor):
+            valor = timezone.make_aware(valor)
+        valores[nombre] = valor
+
+    categoria = str(fila.get('categoria') or '').strip() or None
+    imagen = str(fila.get('imagen') or '').strip() or None
+    return sku, valores, categoria, imagen
+
+
+@dataclass
+class Resultado:
+    filas: int = 0
+    creados: int = 0
+    actualizados: int = 0
+    adoptados: int = 0
+    imagenes: int = 0
+    errores: int = 0
+    detalle_errores: list = field(default_factory=list)
+
+    def error(self, donde, mensaje):
+        self.errores += 1
+        if len(self.detalle_errores) < MAXIMO_ERRORES_DETALLADOS:
+            self.detalle_errores.append(f"{donde}: {mensaje}")
+
+
+# ──────────────────────────────────────────────
+# 📦 Importador
+# ──────────────────────────────────────────────
+class Importador:
+    def __init__(self, batch_size=500, hilos=4, carpeta_imagenes='', con_imagenes=True, avisar=None):
+        self.batch_size = batch_size
+        self.hilos = hilos
+        self.carpeta_imagenes = carpeta_imagenes
+        self.con_imagenes = con_imagenes
+        self.avisar = avisar or (lambda texto: None)
+        self.resultado = Resultado()
+        self._categorias = {}
+        self._subidas = set()
+        self._portadas = []
+
+    def importar(self, filas):
+        inicio = time.monotonic()
+        pool = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='import-imagenes') if self.con_imagenes else None
+        try:
+            for lote in _lotes(filas, self.batch_size):
+                ids_por_sku, imagenes = self._importar_lote(lote)
+                if pool:
+                    self._encolar_imagenes(pool, ids_por_sku, imagenes)
+                transcurrido = time.monotonic() - inicio
+                self.avisar(
+                    f"… {self.resultado.filas} filas ({self.resultado.filas / transcurrido:.0f}/s), "
+                    f"{len(self._subidas)} imágenes en cola"
+                )
+            if pool:
+                self._recoger_imagenes(todas=True)
+        finally:
+            if pool:
+                pool.shutdown(wait=True)
+            invalidar_catalogo()
+            invalidar_home()
+        return self.resultado
+
+    # ── Lote ──
+    def _importar_lote(self, lote):
+        r = self.resultado
+        r.filas += len(lote)
+
+        convertidas = {}  # sku → (línea, valores, categoría, imagen); si se repite gana la última
+        for linea, fila in lote:
+            try:
+                sku, valores, categoria, imagen = _convertir(fila)
+            except FilaInvalida as e:
+                r.error(f"línea {linea}", e)
+                continue
+            convertidas[sku] = (linea, valores, categoria, imagen)
+        if not convertidas:
+            return {}, {}
+
+        existentes = set(Producto.objects.filter(sku__in=list(convertidas)).values_list('sku', flat=True))
+        existentes |= self._adoptar(convertidas, existentes)
+
+        for sku in [s for s in convertidas if s not in existentes]:
+            linea, valores = convertidas[sku][:2]
+            faltan = [c for c in OBLIGATORIOS_ALTA if valores.get(c) in (None, '')]
+            if faltan:
+                r.error(f"línea {linea}", f"producto nuevo sin {', '.join(faltan)}")
+                del convertidas[sku]
+
+        categorias = self._resolver_categorias({c for _, _, c, _ in convertidas.values() if c})
+
+        # Filas con distintas columnas (JSONL) no pueden compartir el UPDATE: se agrupan
+        ahora = timezone.now()
+        grupos = {}
+        for sku, (_, valores, categoria, _) in convertidas.items():
+            producto = Producto(sku=sku, **valores)
+            if sku not in existentes:
+                # Un producto nuevo no está en ninguna campaña: su precio efectivo se sabe sin consultar
+                producto.actualizar_precio_efectivo(ahora=ahora)
+            else:
+                # Columnas NOT NULL: la fila propuesta se valida antes del
+                # ON CONFLICT. No se actualizan: el precio efectivo lo pone
+                # recalcular_precios_efectivos después del lote, y el precio
+                # queda el que estaba si la fila no lo trae
+                producto.precio_efectivo = Decimal('0')
+                if producto.precio is None:
+                    producto.precio = Decimal('0')
+            columnas = set(valores)
+            if 'nombre' in valores:
+                producto.nombre_normalizado = normalizar(producto.nombre)
+                columnas.add('nombre_normalizado')
+            if categoria is not None:
+                producto.categoria_id = categorias.get(categoria)
+                columnas.add('categoria')
+            grupos.setdefault(frozenset(columnas), []).append(producto)
+
+        with transaction.atomic():
+            for columnas, productos in grupos.items():
+                Producto.objects.bulk_create(
+                    productos,
+                    update_conflicts=True,
+                    unique_fields=['sku'],
+                    update_fields=sorted(columnas | {'actualizado'}),
+                )
+            ids_por_sku = dict(Producto.objects.filter(sku__in=list(convertidas)).values_list('sku', 'pk'))
+            actualizados = [ids_por_sku[sku] for sku in existentes & ids_por_sku.keys()]
+            # bulk_create no dispara save() ni señales: precio efectivo, índice y tarjetas a mano
+            recalcular_precios_efectivos(actualizados, ahora=ahora)
+            busqueda.indexar(
+                Producto.objects.filter(pk__in=list(ids_por_sku.values()))
+                .select_related('categoria')
+                .only('pk', 'nombre', 'descripcion', 'productos_incluidos', 'categoria__nombre')
+            )
+        # Los nuevos todavía no tienen tarjeta en caché
+        invalidar_tarjetas(actualizados)
+
+        nuevos = len(convertidas.keys() - existentes)
+        r.creados += nuevos
+        r.actualizados += len(convertidas) - nuevos
+        imagenes = {sku: datos[3] for sku, datos in convertidas.items() if datos[3]}
+        return ids_por_sku, imagenes
+
+    def _adoptar(self, convertidas, existentes):
+        """Asigna el SKU a productos cargados a mano con el mismo nombre y sin SKU."""
+        por_nombre = {}
+        for sku, (_, valores, _, _) in convertidas.items():
+            if sku not in existentes and valores.get('nombre'):
+                por_nombre.setdefault(normalizar(valores['nombre']), sku)
+        if not por_nombre:
+            return set()
+
+        adoptados = []
+        for producto in Producto.objects.filter(sku__isnull=True, nombre_normalizado__in=list(por_nombre)).only('pk', 'nombre_normalizado'):
+            sku = por_nombre.pop(producto.nombre_normalizado, None)
+            if sku:
+                producto.sku = sku
+                adoptados.append(producto)
+        if adoptados:
+            Producto.objects.bulk_update(adoptados, ['sku'])
+            self.resultado.adoptados += len(adoptados)
+        return {p.sku for p in adoptados}
+
+    def _resolver_categorias(self, nombres):
+        faltan = nombres - self._categorias.keys()
+        if faltan:
+            self._categorias.update(Categoria.objects.filter(nombre__in=faltan).values_list('nombre', 'pk'))
+            for nombre in faltan - self._categorias.keys():
+                # Pocas y una sola vez por importación: save() normal (normaliza el nombre)
+                self._categorias[nombre] = Categoria.objects.get_or_create(nombre=nombre)[0].pk
+        return self._categorias
+
+    # ── Imágenes ──
+    def _encolar_imagenes(self, pool, ids_por_sku, imagenes):
+        for sku, origen in imagenes.items():
+            if sku in ids_por_sku:
+                self._subidas.add(pool.submit(self._subir_imagen, ids_por_sku[sku], origen))
+        # Contrapresión: no acumular más de dos lotes de subidas pendientes
+        while len(self._subidas) > 2 * self.batch_size:
+            self._recoger_imagenes(bloquear=True)
+        self._recoger_imagenes()
+
+    def _recoger_imagenes(self, bloquear=False, todas=False):
+        if todas:
+            listas, self._subidas = self._subidas, set()
+            wait(listas)
+        else:
+            listas, self._subidas = wait(self._subidas, timeout=None if bloquear else 0, return_when=FIRST_COMPLETED)
+        for futuro in listas:
+            pk, nombre, error = futuro.result()
+            if error:
+                self.resultado.error(f"imagen del producto {pk}", error)
+            else:
+                self._portadas.append(Producto(pk=pk, portada=nombre))
+        if self._portadas and (todas or len(self._portadas) >= self.batch_size):
+            Producto.objects.bulk_update(self._portadas, ['portada'], batch_size=self.batch_size)
+            invalidar_tarjetas(p.pk for p in self._portadas)
+            self.resultado.imagenes += len(self._portadas)
+            self._portadas = []
+
+    def _leer_imagen(self, origen):
+        if urlparse(origen).scheme in ('http', 'https'):
+            with urlopen(origen, timeout=30) as respuesta:
+                return respuesta.read()
+        with open(os.path.join(self.carpeta_imagenes, origen), 'rb') as f:
+            return f.read()
+
+    def _subir_imagen(self, pk, origen):
+        """Corre en el pool: devuelve (pk, nombre en el storage, error o None)."""
+        try:
+            campo = Producto._meta.get_field('portada')
+            nombre = campo.generate_filename(None, os.path.basename(urlparse(origen).path) or f'{pk}.jpg')
+            guardado = campo.storage.save(nombre, ContentFile(self._leer_imagen(origen)), max_length=campo.max_length)
+            generar_derivados_seguro(campo.attr_class(None, campo, guardado))
+            return pk, guardado, None
+        except Exception as e:
+            return pk, None, f"{origen}: {e}"
+        finally:
+            close_old_connections()
@@ -0,0 +1,223 @@
+"""
+Laboratorio de fotos de marketing: filtros y textos sobre fotos de producto.
+
+Reemplaza a `laboratorio_fotos.py` (una foto fija y fuentes de Windows
+escritas a mano). Lo usa el comando `procesar_fotos`, que reparte las fotos
+en un `ProcessPoolExecutor`: por eso acá solo hay Pillow y Python puro, nada
+de Django, y la `Receta` es un dataclass que viaja pickleado a cada proceso.
+
+El manifiesto (`.manifiesto.json` en la carpeta de salida) guarda por foto el
+hash del contenido, tamaño y fecha de modificación, y la firma de la receta
+con la que se procesó: si nada de eso cambió, la foto se saltea.
+"""
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, replace
+
+from PIL import Image, ImageDraw, ImageEnhance, ImageFont, ImageOps
+
+EXTENSIONES = ('.jpg', '.jpeg', '.png', '.webp')
+NOMBRE_MANIFIESTO = '.manifiesto.json'
+FONDO = (250, 248, 246)  # blanco hueso que se funde con la tienda
+
+# Se prueban en orden; si ninguna existe se usa la fuente de Pillow
+FUENTES_TITULO = (
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf',
+    '/Library/Fonts/Arial Bold.ttf',
+    r'C:\Windows\Fonts\impact.ttf',
+    r'C:\Windows\Fonts\arialbd.ttf',
+)
+FUENTES_TEXTO = (
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+    '/Library/Fonts/Arial.ttf',
+    r'C:\Windows\Fonts\arial.ttf',
+)
+
+
+# ──────────────────────────────────────────────
+# 🎨 Filtros
+# ──────────────────────────────────────────────
+def _calidez(img):
+    capa = Image.new('RGBA', img.size, (255, 170, 0, 15))
+    return Image.alpha_composite(img.convert('RGBA'), capa).convert('RGB')
+
+
+def _contraste(img):
+    return ImageEnhance.Contrast(img).enhance(1.15)
+
+
+def _color(img):
+    return ImageEnhance.Color(img).enhance(1.20)
+
+
+def _nitidez(img):
+    return ImageEnhance.Sharpness(img).enhance(1.3)
+
+
+def _brillo(img):
+    return ImageEnhance.Brightness(img).enhance(1.08)
+
+
+FILTROS = {
+    'calidez': _calidez,
+    'contraste': _contraste,
+    'color': _color,
+    'nitidez': _nitidez,
+    'brillo': _brillo,
+}
+FILTROS_POR_DEFECTO = ('calidez', 'contraste', 'color')
+
+
+@dataclass(frozen=True)
+class Receta:
+    filtros: tuple = FILTROS_POR_DEFECTO
+    cuadrado: bool = True
+    titulo: str = ''
+    subtitulo: str = ''
+    fuente: str = ''
+    ancho_maximo: int = 0   # 0 = sin achicar
+    calidad: int = 92
+
+    def con_textos(self, textos):
+        """Copia con título/subtítulo propios de una foto (ver --textos)."""
+        if not textos:
+            return self
+        return replace(
+            self,
+            titulo=textos.get('titulo', self.titulo),
+            subtitulo=textos.get('subtitulo', self.subtitulo),
+        )
+
+    def firma(self):
+        datos = json.dumps(asdict(self), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(datos.encode()).hexdigest()[:16]
+
+
+# ──────────────────────────────────────────────
+# 🔤 Textos
+# ──────────────────────────────────────────────
+def cargar_fuente(propia, candidatas, tamanio):
+    """La fuente propia si existe; si no, la primera candidata instalada o la de Pillow."""
+    for ruta in ((propia,) if propia else ()) + candidatas:
+        try:
+            return ImageFont.truetype(ruta, tamanio)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=tamanio)
+
+
+def _ancho_texto(draw, texto, fuente):
+    izquierda, _, derecha, _ = draw.textbbox((0, 0), texto, font=fuente)
+    return derecha - izquierda
+
+
+def _escribir_textos(img, receta):
+    lado = max(img.size)
+    draw = ImageDraw.Draw(img, 'RGBA')
+    tamanio = int(lado * 0.08)
+
+    if receta.titulo:
+        fuente = cargar_fuente(receta.fuente, FUENTES_TITULO, tamanio)
+        x = (img.width - _ancho_texto(draw, receta.titulo, fuente)) // 2
+        y = int(img.height * 0.04)
+        # Sombra sutil y texto gris oscuro, como en las fotos de referencia
+        draw.text((x + 4, y + 4), receta.titulo, font=fuente, fill=(200, 200, 200, 180))
+        draw.text((x, y), receta.titulo, font=fuente, fill=(70, 70, 70, 255))
+
+    if receta.subtitulo:
+        fuente = cargar_fuente('', FUENTES_TEXTO, int(tamanio * 0.4))
+        x = (img.width - _ancho_texto(draw, receta.subtitulo, fuente)) // 2
+        y = img.height - int(img.height * 0.08)
+        draw.text((x, y), receta.subtitulo, font=fuente, fill=(100, 100, 100, 255))
+    return img
+
+
+# ──────────────────────────────────────────────
+# 🏭 Proceso de una foto (corre en el pool)
+# ──────────────────────────────────────────────
+def procesar(origen, destino, receta):
+    """Aplica la receta y guarda JPEG. Devuelve (origen, destino, error o None)."""
+    try:
+        with Image.open(origen) as abierta:
+            img = ImageOps.exif_transpose(abierta).convert('RGB')
+
+        for nombre in receta.filtros:
+            img = FILTROS[nombre](img)
+
+        if receta.ancho_maximo and img.width > receta.ancho_maximo:
+            alto = round(img.height * receta.ancho_maximo / img.width)
+            img = img.resize((receta.ancho_maximo, alto), Image.Resampling.LANCZOS)
+
+        if receta.cuadrado:
+            lado = max(img.size)
+            cuadrado = Image.new('RGB', (lado, lado), FONDO)
+            cuadrado.paste(img, ((lado - img.width) // 2, (lado - img.height) // 2))
+            img = cuadrado
+
+        img = _escribir_textos(img, receta)
+
+        os.makedirs(os.path.dirname(destino) or '.', exist_ok=True)
+        temporal = destino + '.tmp'
+        img.save(temporal, format='JPEG', quality=receta.calidad, optimize=True)
+        os.replace(temporal, destino)  # nunca queda un JPEG a medio escribir
+        return origen, destino, None
+    except Exception as e:
+        return origen, destino, f'{type(e).__name__}: {e}'
+
+
+# ──────────────────────────────────────────────
+# 📒 Manifiesto (saltear lo que no cambió)
+# ──────────────────────────────────────────────
+def hash_archivo(ruta):
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def cargar_manifiesto(carpeta):
+    try:
+        with open(os.path.join(carpeta, NOMBRE_MANIFIESTO), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def guardar_manifiesto(carpeta, manifiesto):
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, NOMBRE_MANIFIESTO)
+    with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(ruta + '.tmp', ruta)
+
+
+def sin_cambios(entrada, ruta, destino, firma):
+    """
+    True si la foto ya se procesó igual. Primero compara tamaño y fecha (no
+    lee el archivo); si difieren, compara el hash del contenido. Actualiza la
+    entrada cuando solo cambió la fecha (p. ej. una copia de la carpeta).
+    """
+    if not entrada or entrada.get('receta') != firma or not os.path.exists(destino):
+        return False
+    estado = os.stat(ruta)
+    if entrada.get('tamanio') == estado.st_size and entrada.get('mtime') == estado.st_mtime_ns:
+        return True
+    if entrada.get('hash') != hash_archivo(ruta):
+        return False
+    entrada.update(tamanio=estado.st_size, mtime=estado.st_mtime_ns)
+    return True
+
+
+def entrada_manifiesto(ruta, destino_relativo, firma):
+    estado = os.stat(ruta)
+    return {
+        'hash': hash_archivo(ruta),
+        'tamanio': estado.st_size,
+        'mtime': estado.st_mtime_ns,
+        'receta': firma,
+        'salida': destino_relativo,
+    }
@@ -0,0 +1,132 @@
+"""
+Modelos de lectura livianos para mostrar productos.
+
+`ProductoCard` es todo lo que necesita una tarjeta de producto (home,
+catálogo, categoría, relacionados), ya resuelto: precio final, descuento,
+etiqueta, URL de la imagen principal y su `srcset` (ver `derivados.py`).
+Es un dataclass inmutable con `__slots__`: ocupa una fracción de una
+instancia de `Producto` en el caché y leer sus atributos nunca va a la base.
+
+Se arman en lote desde UNA query: `con_datos_card(qs)` agrega a la consulta de
+productos la imagen principal (subquery sobre `PortadaProducto`) y el nombre de
+la categoría, y `cards_de(productos)` convierte las filas en tarjetas.
+
+    cards = cards_de(con_datos_card(Producto.objects.filter(destacado=True))[:4])
+
+`stock` y `hay_stock` salen del producto tal cual. Las reservas de los carritos
+(ver `ventas/reservas.py`) cambian a cada rato y no viajan en las tarjetas
+cacheadas: la vista las descuenta al mostrar con `descontar_reservas`, un solo
+aggregate por página.
+"""
+from dataclasses import dataclass, replace
+from decimal import Decimal
+
+from django.db.models import OuterRef, Subquery
+
+from .derivados import ImagenResponsive, imagen_responsive
+from .models import PortadaProducto, Producto
+
+CAMPOS_CARD = (
+    'id', 'nombre', 'precio', 'precio_efectivo', 'stock', 'destacado',
+    'etiqueta_oferta', 'portada', 'categoria__nombre',
+)
+
+
+@dataclass(frozen=True, slots=True)
+class ProductoCard:
+    id: int
+    nombre: str
+    precio: Decimal          # precio de lista
+    precio_final: Decimal    # lo que paga el cliente (oferta o campaña aplicada)
+    descuento: int           # % redondeado, 0 si no hay oferta
+    etiqueta: str            # texto del badge de oferta ('' si no tiene)
+    imagen_url: str | None
+    stock: int               # unidades libres (ver `descontar_reservas`)
+    hay_stock: bool
+    categoria: str
+    destacado: bool
+    imagen: ImagenResponsive | None = None  # srcset para `{% imagen_responsive %}`
+    version_tarjeta: int | None = None  # sello del caché de fragmentos
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def en_oferta(self):
+        return self.precio_final < self.precio
+
+    def con_version(self, sello):
+        return replace(self, version_tarjeta=sello)
+
+
+def con_datos_card(queryset):
+    """Agrega a la query de productos lo que hace falta para armar las tarjetas."""
+    imagen = (
+        PortadaProducto.objects.filter(producto=OuterRef('pk'))
+        .order_by('orden', 'id')
+        .values('imagen')[:1]
+    )
+    return (
+        queryset.select_related('categoria')
+        .only(*CAMPOS_CARD)
+        .annotate(imagen_portada=Subquery(imagen))
+    )
+
+
+def card_de(producto):
+    """Tarjeta a partir de un Producto traído con `con_datos_card`."""
+    nombre = getattr(producto, 'imagen_portada', None)
+    if nombre:
+        storage = PortadaProducto._meta.get_field('imagen').storage
+    elif producto.portada:
+        storage, nombre = producto.portada.storage, producto.portada.name
+    else:
+        storage = None
+    imagen_url = storage.url(nombre) if nombre else None
+
+    precio = producto.precio
+    final = producto.precio_efectivo
+    descuento = int(round((1 - final / precio) * 100)) if precio and final < precio else 0
+
+    return ProductoCard(
+        id=producto.pk,
+        nombre=producto.nombre,
+        precio=precio,
+        precio_final=final,
+        descuento=descuento,
+        etiqueta=(producto.etiqueta_oferta or '') if final < precio else '',
+        imagen_url=imagen_url,
+        stock=producto.stock,
+        hay_stock=producto.stock > 0,
+        categoria=producto.categoria.nombre if producto.categoria_id else '',
+        destacado=producto.destacado,
+        imagen=imagen_responsive(storage, nombre),
+    )
+
+
+def cards_de(productos):
+    """Lista de `ProductoCard`; si recibe un QuerySet lo completa con `con_datos_card`."""
+    if hasattr(productos, 'query') and 'imagen_portada' not in productos.query.annotations:
+        productos = con_datos_card(productos)
+    return [card_de(p) for p in productos]
+
+
+def descontar_reservas(cards):
+    """
+    Copias de las tarjetas con `stock` y `hay_stock` bajados a lo que queda
+    libre: el stock menos lo que apartaron los carritos vigentes, en un solo
+    aggregate. Así un kit con todas sus unidades en carritos ajenos se muestra
+    "Sin stock" en vez de fallar recién al agregarlo.
+    """
+    from ventas.reservas import reservado
+
+    cards = list(cards)
+    apartadas = reservado(card.id for card in cards) if cards else {}
+    resultado = []
+    for card in cards:
+        if apartadas.get(card.id):
+            libre = max(card.stock - apartadas[card.id], 0)
+            card = replace(card, stock=libre, hay_stock=libre > 0)
+        resultado.append(card)
+    return resultado
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from productos.reglas_precios import ReglaInvalida, aplicar_cambios, calcular_cambios, leer_reglas, validos
+
+
+class Command(BaseCommand):
+    help = (
+        'Actualiza precios en masa desde un archivo de reglas (CSV o JSON: sku/id/nombre, campo, cambio, '
+        'redondeo). Muestra la diferencia producto por producto y la aplica en una sola transacción. '
+        'Ver productos/reglas_precios.py para el formato.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('reglas', help='Archivo de reglas (.csv o .json).')
+        parser.add_argument('--dry-run', action='store_true', help='Solo mostrar los cambios, sin guardar.')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['reglas'], encoding='utf-8-sig') as f:
+                reglas = leer_reglas(f.read(), 'json' if options['reglas'].lower().endswith('.json') else None)
+        except OSError as e:
+            raise CommandError(f"No se pudo leer {options['reglas']}: {e}")
+        except ReglaInvalida as e:
+            raise CommandError(str(e))
+
+        cambios, sin_coincidencias = calcular_cambios(reglas)
+
+        for cambio in cambios:
+            variacion = f" ({cambio.porcentaje:+.1f}%)" if cambio.porcentaje is not None else ""
+            antes = f"${cambio.antes:,.2f}" if cambio.antes is not None else "—"
+            linea = (
+                f"  {cambio.producto.nombre[:45]:45} {cambio.campo:13} "
+                f"{antes:>12} → ${cambio.despues:,.2f}{variacion}"
+            )
+            if cambio.error:
+                self.stderr.write(f"{linea}  ❌ {cambio.error}")
+            else:
+                self.stdout.write(linea)
+        for regla in sin_coincidencias:
+            self.stderr.write(f"⚠️ Sin coincidencias: {regla}")
+
+        aplicables = validos(cambios)
+        if len(aplicables) < len(cambios):
+            self.stderr.write(f"❌ {len(cambios) - len(aplicables)} cambios con errores: no se aplican.")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"🔎 Dry run: {len(aplicables)} cambios, no se guardó nada."))
+            return
+
+        productos = aplicar_cambios(aplicables)
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(aplicables)} cambios aplicados en {productos} productos."))
@@ -0,0 +1,81 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from productos.sugerencias import IndiceSugerencias
+
+SUSTANTIVOS = [
+    'rascador', 'cepillo', 'comedero', 'bebedero', 'arenero', 'juguete', 'cucha', 'collar',
+    'pretal', 'correa', 'transportadora', 'fuente', 'cama', 'manta', 'pelota', 'raton',
+    'guante', 'peine', 'cortauñas', 'snack', 'alimento', 'arena', 'sacapelusas', 'rodillo',
+]
+ADJETIVOS = [
+    'gatito', 'premium', 'grande', 'mediano', 'chico', 'acolchado', 'interactivo', 'deslanador',
+    'plegable', 'automatico', 'silencioso', 'reforzado', 'ecologico', 'antideslizante',
+]
+
+
+def nombre_sintetico(rng):
+    marca = ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 9)))
+    return f"{rng.choice(SUSTANTIVOS)} {rng.choice(ADJETIVOS)} {marca} {rng.randint(1, 999)}"
+
+
+def con_errores(palabra, rng, errores):
+    letras = list(palabra)
+    for _ in range(errores):
+        i = rng.randrange(len(letras))
+        operacion = rng.choice(('cambiar', 'borrar', 'insertar', 'transponer'))
+        if operacion == 'cambiar':
+            letras[i] = rng.choice(string.ascii_lowercase)
+        elif operacion == 'borrar' and len(letras) > 3:
+            del letras[i]
+        elif operacion == 'insertar':
+            letras.insert(i, rng.choice(string.ascii_lowercase))
+        elif i + 1 < len(letras):
+            letras[i], letras[i + 1] = letras[i + 1], letras[i]
+    return ''.join(letras)
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia del "¿Quisiste decir?" (índice de trigramas) sobre un catálogo sintético, sin tocar la base.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cantidad', type=int, default=50000, help='Cantidad de nombres sintéticos.')
+        parser.add_argument('--consultas', type=int, default=500)
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['semilla'])
+        nombres = [(i, nombre_sintetico(rng)) for i in range(options['cantidad'])]
+
+        inicio = time.perf_counter()
+        indice = IndiceSugerencias(nombres)
+        construccion = time.perf_counter() - inicio
+        self.stdout.write(
+            f"Índice: {len(nombres)} nombres, {len(indice.vocabulario)} palabras en el vocabulario, "
+            f"construido en {construccion:.2f}s"
+        )
+
+        # Consultas con 1 o 2 errores sobre palabras reales del catálogo
+        consultas = []
+        for _ in range(options['consultas']):
+            _, nombre = rng.choice(nombres)
+            palabra = rng.choice(nombre.split()[:2])
+            consultas.append(con_errores(palabra, rng, rng.randint(1, 2)))
+
+        tiempos = []
+        aciertos = 0
+        for consulta in consultas:
+            t = time.perf_counter()
+            resultado = indice.sugerir(consulta)
+            tiempos.append((time.perf_counter() - t) * 1000)
+            aciertos += resultado is not None
+
+        tiempos.sort()
+        p50 = tiempos[len(tiempos) // 2]
+        p95 = tiempos[int(len(tiempos) * 0.95)]
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(consultas)} consultas: p50 {p50:.2f} ms · p95 {p95:.2f} ms · máx {tiempos[-1]:.2f} ms · "
+            f"con sugerencia {aciertos}/{len(consultas)}"
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from productos.derivados import es_cloudinary, generar_derivados
+from productos.models import PortadaProducto, Producto
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera los derivados responsive (AVIF/WebP por ancho, JPEG para correo) de las fotos '
+        'que ya estaban subidas. Con Cloudinary no hace falta: los derivados son transformaciones en la URL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forzar', action='store_true', help='Rehacer también los que ya existen.')
+
+    def handle(self, *args, **options):
+        archivos = [p.imagen for p in PortadaProducto.objects.only('imagen').iterator()]
+        archivos += [p.portada for p in Producto.objects.exclude(portada='').exclude(portada=None).only('portada').iterator()]
+
+        if archivos and all(es_cloudinary(a.storage) for a in archivos):
+            self.stdout.write("☁️ Las fotos están en Cloudinary: no hay archivos que generar.")
+            return
+
+        escritos = errores = 0
+        for archivo in archivos:
+            try:
+                escritos += generar_derivados(archivo, forzar=options['forzar'])
+            except Exception as e:
+                errores += 1
+                self.stderr.write(f"⚠️ {archivo.name}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {escritos} derivados generados para {len(archivos)} fotos ({errores} con error)."
+        ))
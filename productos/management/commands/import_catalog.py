@@ -0,0 +1,49 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from productos.importacion import CAMPOS, Importador, leer_filas
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa o actualiza productos desde un feed CSV o JSONL de cualquier tamaño, por lotes y con '
+        'upsert por SKU. Columnas: sku (obligatoria), ' + ', '.join(CAMPOS) + ', categoria (nombre) '
+        'e imagen (ruta relativa al feed o URL).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Feed del proveedor (.csv, .jsonl o .ndjson).')
+        parser.add_argument('--formato', choices=['csv', 'jsonl'], help='Forzar el formato (por defecto, según la extensión).')
+        parser.add_argument('--batch-size', type=int, default=500, help='Filas por lote (una transacción por lote).')
+        parser.add_argument('--hilos', type=int, default=4, help='Subidas de imágenes en paralelo.')
+        parser.add_argument('--imagenes', help='Carpeta de las imágenes con ruta relativa (por defecto, la del feed).')
+        parser.add_argument('--sin-imagenes', action='store_true', help='Ignorar la columna imagen.')
+
+    def handle(self, *args, **options):
+        archivo = options['archivo']
+        if not os.path.isfile(archivo):
+            raise CommandError(f"No existe el archivo {archivo}")
+
+        importador = Importador(
+            batch_size=options['batch_size'],
+            hilos=max(1, options['hilos']),
+            carpeta_imagenes=options['imagenes'] or os.path.dirname(os.path.abspath(archivo)),
+            con_imagenes=not options['sin_imagenes'],
+            avisar=self.stdout.write,
+        )
+        inicio = time.monotonic()
+        r = importador.importar(leer_filas(archivo, options['formato']))
+        transcurrido = time.monotonic() - inicio
+
+        for detalle in r.detalle_errores:
+            self.stderr.write(f"⚠️ {detalle}")
+        if r.errores > len(r.detalle_errores):
+            self.stderr.write(f"⚠️ … y {r.errores - len(r.detalle_errores)} errores más.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {r.filas} filas en {transcurrido:.1f}s ({r.filas / max(transcurrido, 0.001):.0f} filas/s): "
+            f"{r.creados} creados, {r.actualizados} actualizados ({r.adoptados} por nombre), "
+            f"{r.imagenes} imágenes, {r.errores} errores."
+        ))
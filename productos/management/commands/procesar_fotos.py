@@ -0,0 +1,176 @@
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from productos import laboratorio
+from productos.models import PortadaProducto, Producto
+from productos.subidas import lugares_libres, siguiente_orden
+
+# "12_frente.jpg" o "12-frente.jpg" → producto 12
+PATRON_PRODUCTO = re.compile(r'^(\d+)[_-]')
+
+
+class Command(BaseCommand):
+    help = (
+        'Procesa carpetas enteras de fotos de marketing (filtros, formato 1:1, título y subtítulo) '
+        'en paralelo. Guarda un manifiesto con el hash de cada foto y saltea las que no cambiaron. '
+        'Con --adjuntar sube el resultado como portada del producto.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('origen', help='Carpeta con las fotos originales (se recorre entera).')
+        parser.add_argument('destino', help='Carpeta donde se guardan las fotos procesadas y el manifiesto.')
+        parser.add_argument(
+            '--filtros', default=','.join(laboratorio.FILTROS_POR_DEFECTO),
+            help=f"Filtros en orden, separados por coma ({', '.join(laboratorio.FILTROS)}). Vacío = ninguno.",
+        )
+        parser.add_argument('--sin-cuadrado', action='store_true', help='No llevar la foto a formato 1:1.')
+        parser.add_argument('--titulo', default='', help='Título para todas las fotos.')
+        parser.add_argument('--subtitulo', default='', help='Subtítulo para todas las fotos.')
+        parser.add_argument(
+            '--textos',
+            help='JSON {"archivo.jpg": {"titulo": ..., "subtitulo": ..., "producto": id}} con valores por foto.',
+        )
+        parser.add_argument('--fuente', default='', help='Ruta a una fuente .ttf para el título.')
+        parser.add_argument('--ancho-maximo', type=int, default=0, help='Achicar las fotos más anchas que esto (px).')
+        parser.add_argument('--calidad', type=int, default=92)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Procesos en paralelo (1 = sin pool).')
+        parser.add_argument('--forzar', action='store_true', help='Reprocesar todo aunque no haya cambios.')
+        parser.add_argument(
+            '--adjuntar', action='store_true',
+            help='Subir cada foto procesada como PortadaProducto (producto por --textos o prefijo "<id>_").',
+        )
+
+    # ──────────────────────────────────────────────
+    # 🧾 Opciones
+    # ──────────────────────────────────────────────
+    def _receta(self, options):
+        filtros = tuple(f.strip() for f in options['filtros'].split(',') if f.strip())
+        desconocidos = [f for f in filtros if f not in laboratorio.FILTROS]
+        if desconocidos:
+            raise CommandError(f"Filtros desconocidos: {', '.join(desconocidos)}")
+        return laboratorio.Receta(
+            filtros=filtros,
+            cuadrado=not options['sin_cuadrado'],
+            titulo=options['titulo'],
+            subtitulo=options['subtitulo'],
+            fuente=options['fuente'],
+            ancho_maximo=options['ancho_maximo'],
+            calidad=options['calidad'],
+        )
+
+    def _textos(self, ruta):
+        if not ruta:
+            return {}
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"No se pudo leer {ruta}: {e}")
+
+    def _fotos(self, origen):
+        for carpeta, _, archivos in os.walk(origen):
+            for nombre in sorted(archivos):
+                if nombre.lower().endswith(laboratorio.EXTENSIONES):
+                    ruta = os.path.join(carpeta, nombre)
+                    yield ruta, os.path.relpath(ruta, origen).replace(os.sep, '/')
+
+    # ──────────────────────────────────────────────
+    # 🚀 Ejecución
+    # ──────────────────────────────────────────────
+    def handle(self, *args, **options):
+        origen, destino = options['origen'], options['destino']
+        if not os.path.isdir(origen):
+            raise CommandError(f"No existe la carpeta {origen}")
+
+        receta_base = self._receta(options)
+        textos = self._textos(options['textos'])
+        manifiesto = laboratorio.cargar_manifiesto(destino)
+        inicio = time.monotonic()
+
+        pendientes, salteadas = [], 0
+        for ruta, relativa in self._fotos(origen):
+            receta = receta_base.con_textos(textos.get(relativa) or textos.get(os.path.basename(relativa)))
+            salida_relativa = os.path.splitext(relativa)[0] + '.jpg'
+            salida = os.path.join(destino, salida_relativa)
+            if not options['forzar'] and laboratorio.sin_cambios(manifiesto.get(relativa), ruta, salida, receta.firma()):
+                salteadas += 1
+                continue
+            pendientes.append((ruta, relativa, salida, salida_relativa, receta))
+
+        self.stdout.write(f"🖼️ {len(pendientes)} fotos para procesar, {salteadas} sin cambios.")
+
+        procesadas, errores = [], 0
+        try:
+            for ruta, relativa, salida, salida_relativa, receta, error in self._ejecutar(pendientes, options['workers']):
+                if error:
+                    errores += 1
+                    self.stderr.write(f"⚠️ {relativa}: {error}")
+                    continue
+                manifiesto[relativa] = laboratorio.entrada_manifiesto(ruta, salida_relativa, receta.firma())
+                procesadas.append((relativa, salida))
+        finally:
+            # Aunque se corte a mitad (Ctrl+C), lo ya procesado no se repite
+            laboratorio.guardar_manifiesto(destino, manifiesto)
+
+        adjuntadas = self._adjuntar(procesadas, textos) if options['adjuntar'] else 0
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(procesadas)} procesadas, {salteadas} sin cambios, {errores} con error"
+            f"{f', {adjuntadas} adjuntadas a productos' if options['adjuntar'] else ''}"
+            f" en {time.monotonic() - inicio:.1f}s."
+        ))
+
+    def _ejecutar(self, pendientes, workers):
+        """Genera (ruta, relativa, salida, salida_relativa, receta, error) a medida que terminan."""
+        if workers <= 1 or len(pendientes) <= 1:
+            for ruta, relativa, salida, salida_relativa, receta in pendientes:
+                _, _, error = laboratorio.procesar(ruta, salida, receta)
+                yield ruta, relativa, salida, salida_relativa, receta, error
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futuros = {
+                pool.submit(laboratorio.procesar, ruta, salida, receta): (ruta, relativa, salida, salida_relativa, receta)
+                for ruta, relativa, salida, salida_relativa, receta in pendientes
+            }
+            for futuro in as_completed(futuros):
+                _, _, error = futuro.result()
+                yield (*futuros[futuro], error)
+
+    # ──────────────────────────────────────────────
+    # 📎 Adjuntar a productos
+    # ──────────────────────────────────────────────
+    def _producto_de(self, relativa, textos):
+        datos = textos.get(relativa) or textos.get(os.path.basename(relativa)) or {}
+        if datos.get('producto'):
+            return datos['producto']
+        coincidencia = PATRON_PRODUCTO.match(os.path.basename(relativa))
+        return int(coincidencia.group(1)) if coincidencia else None
+
+    def _adjuntar(self, procesadas, textos):
+        productos = Producto.objects.in_bulk(
+            {pk for pk in (self._producto_de(r, textos) for r, _ in procesadas) if pk}
+        )
+        adjuntadas = 0
+        for relativa, salida in sorted(procesadas):
+            producto = productos.get(self._producto_de(relativa, textos))
+            if producto is None:
+                continue
+            if not lugares_libres(producto):
+                self.stderr.write(f"⚠️ {producto.nombre} ya tiene 5 portadas: {relativa} no se adjuntó.")
+                continue
+            # El storage deduplica: la misma foto procesada no se vuelve a subir
+            with open(salida, 'rb') as f:
+                PortadaProducto.objects.create(
+                    producto=producto,
+                    imagen=File(f, name=os.path.basename(salida)),
+                    orden=siguiente_orden(producto),
+                )
+            adjuntadas += 1
+        return adjuntadas
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from productos.precios import recalcular_precios_efectivos, refrescar_precios_vencidos
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula el precio efectivo materializado de los productos cuya campaña u oferta '
+        'arrancó o terminó. Pensado para correr periódicamente (cron); con --todos recorre el catálogo entero.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', action='store_true', help='Recalcular todos los productos, no solo los vencidos.')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['todos']:
+            actualizados = recalcular_precios_efectivos(batch_size=options['batch_size'])
+        else:
+            actualizados = refrescar_precios_vencidos()
+        self.stdout.write(self.style.SUCCESS(f"✅ Precio efectivo actualizado en {actualizados} productos."))
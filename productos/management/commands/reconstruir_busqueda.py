@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from productos import busqueda
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero el índice de búsqueda de texto completo del catálogo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        from django.db import connection
+        # Por si la tabla se borró a mano: la vuelve a crear si falta
+        busqueda.crear_indice(connection)
+        total = busqueda.reconstruir(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"✅ Índice de búsqueda reconstruido: {total} productos."))
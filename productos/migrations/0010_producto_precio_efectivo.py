@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:07
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def inicializar_precio_efectivo(apps, schema_editor):
+    # Arranca igual al precio base y queda "vencido": el primer
+    # `recalcular_precios_efectivos` (o listado del catálogo) aplica campañas y ofertas.
+    Producto = apps.get_model('productos', 'Producto')
+    Producto.objects.update(precio_efectivo=F('precio'), precio_efectivo_vence=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categorias', '0002_categoria_imagen'),
+        ('productos', '0009_codigodescuento_envio_gratis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='precio_efectivo',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='Precio efectivo'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='precio_efectivo_vence',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Próximo inicio/fin de campaña u oferta. Pasada esta fecha se recalcula.', null=True, verbose_name='Precio efectivo válido hasta'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['precio_efectivo'], name='idx_producto_precio_efectivo'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['precio_efectivo_vence'], name='idx_producto_precio_vence'),
+        ),
+        migrations.RunPython(inicializar_precio_efectivo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,102 @@
+import unicodedata
+
+from django.db import migrations
+
+# El SQL y la normalización quedan escritos acá y no se importan de
+# productos/busqueda.py ni de biblioteca_plus/normalizacion.py: la migración
+# tiene que seguir funcionando (y cargando lo mismo) aunque esos módulos cambien.
+
+
+def normalizar(texto):
+    """Copia de `biblioteca_plus.normalizacion.normalizar` al crear esta migración."""
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+CREAR = {
+    'postgresql': [
+        "CREATE TABLE IF NOT EXISTS productos_busqueda ("
+        " producto_id bigint PRIMARY KEY REFERENCES productos_producto(id) ON DELETE CASCADE,"
+        " documento tsvector NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS productos_busqueda_gin ON productos_busqueda USING GIN (documento)",
+    ],
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS productos_busqueda_fts USING fts5("
+        " nombre, categoria, incluidos, descripcion,"
+        " tokenize = 'unicode61 remove_diacritics 2')",
+    ],
+}
+
+ELIMINAR = {
+    'postgresql': ["DROP TABLE IF EXISTS productos_busqueda"],
+    'sqlite': ["DROP TABLE IF EXISTS productos_busqueda_fts"],
+}
+
+INSERTAR = {
+    'postgresql': (
+        "INSERT INTO productos_busqueda (producto_id, documento) VALUES (%s,"
+        " setweight(to_tsvector('spanish', %s), 'A') ||"
+        " setweight(to_tsvector('spanish', %s), 'B') ||"
+        " setweight(to_tsvector('spanish', %s), 'B') ||"
+        " setweight(to_tsvector('spanish', %s), 'C'))"
+    ),
+    'sqlite': (
+        "INSERT INTO productos_busqueda_fts (rowid, nombre, categoria, incluidos, descripcion)"
+        " VALUES (%s, %s, %s, %s, %s)"
+    ),
+}
+
+
+def crear_y_poblar(apps, schema_editor):
+    conexion = schema_editor.connection
+    if conexion.vendor not in CREAR:
+        return
+    with conexion.cursor() as cursor:
+        for sql in CREAR[conexion.vendor]:
+            cursor.execute(sql)
+
+    # Carga inicial: un documento normalizado por producto, por lotes
+    Producto = apps.get_model('productos', 'Producto')
+    productos = (
+        Producto.objects.select_related('categoria')
+        .only('pk', 'nombre', 'descripcion', 'productos_incluidos', 'categoria__nombre')
+        .order_by('pk')
+    )
+    lote = []
+    with conexion.cursor() as cursor:
+        for p in productos.iterator(chunk_size=1000):
+            lote.append((
+                p.pk,
+                normalizar(p.nombre),
+                normalizar(p.categoria.nombre if p.categoria_id else ''),
+                normalizar(p.productos_incluidos),
+                normalizar(p.descripcion),
+            ))
+            if len(lote) >= 1000:
+                cursor.executemany(INSERTAR[conexion.vendor], lote)
+                lote = []
+        if lote:
+            cursor.executemany(INSERTAR[conexion.vendor], lote)
+
+
+def eliminar(apps, schema_editor):
+    conexion = schema_editor.connection
+    with conexion.cursor() as cursor:
+        for sql in ELIMINAR.get(conexion.vendor, []):
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categorias', '0002_categoria_imagen'),
+        ('productos', '0010_producto_precio_efectivo'),
+    ]
+
+    operations = [
+        # Tabla del índice de texto completo: tsvector + GIN en PostgreSQL, FTS5 en SQLite
+        migrations.RunPython(crear_y_poblar, eliminar),
+    ]
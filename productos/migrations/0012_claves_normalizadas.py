@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:09
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalizar(texto):
+    """Copia de `biblioteca_plus.normalizacion.normalizar` al crear esta migración:
+    las claves tienen que salir iguales aunque esa función cambie después."""
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+def completar_claves(apps, schema_editor):
+    Producto = apps.get_model('productos', 'Producto')
+    lote = []
+    for obj in Producto.objects.only('pk', 'nombre').iterator(chunk_size=1000):
+        obj.nombre_normalizado = normalizar(obj.nombre)
+        lote.append(obj)
+        if len(lote) >= 1000:
+            Producto.objects.bulk_update(lote, ['nombre_normalizado'])
+            lote = []
+    if lote:
+        Producto.objects.bulk_update(lote, ['nombre_normalizado'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0011_indice_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='nombre_normalizado',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(completar_claves, migrations.RunPython.noop),
+    ]
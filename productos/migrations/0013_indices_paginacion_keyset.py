@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categorias', '0003_claves_normalizadas'),
+        ('productos', '0012_claves_normalizadas'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='idx_producto_precio_efectivo',
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['nombre', 'id'], name='idx_producto_nombre_id'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['precio_efectivo', 'id'], name='idx_producto_precio_efectivo'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:42
+
+import productos.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0013_indices_paginacion_keyset'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='portadaproducto',
+            name='imagen',
+            field=models.ImageField(storage=productos.models.storage_fotos, upload_to='productos/portadas/'),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='portada',
+            field=models.ImageField(blank=True, null=True, storage=productos.models.storage_fotos, upload_to='productos/portadas/'),
+        ),
+        migrations.CreateModel(
+            name='ArchivoMedia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('storage', models.CharField(help_text='Storage real (clase y destino).', max_length=200)),
+                ('sha256', models.CharField(max_length=64)),
+                ('nombre', models.CharField(help_text='Nombre del objeto en el storage real.', max_length=255)),
+                ('url', models.URLField(max_length=500)),
+                ('tamanio', models.PositiveBigIntegerField(default=0)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archivo subido',
+                'verbose_name_plural': 'Archivos subidos',
+                'constraints': [models.UniqueConstraint(fields=('storage', 'sha256'), name='archivo_media_storage_sha256')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0014_archivos_deduplicados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='sku',
+            field=models.CharField(blank=True, help_text='Código del proveedor. Las importaciones actualizan el producto con este SKU.', max_length=64, null=True, unique=True, verbose_name='SKU'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categorias', '0003_claves_normalizadas'),
+        ('productos', '0015_sku_producto'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='producto',
+            constraint=models.CheckConstraint(condition=models.Q(('stock__gte', 0)), name='producto_stock_no_negativo'),
+        ),
+    ]
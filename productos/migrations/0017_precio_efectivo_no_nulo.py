@@ -0,0 +1,28 @@
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def completar_nulos(apps, schema_editor):
+    # 0010 ya lo inicializó desde `precio`; por si quedó alguno sin calcular,
+    # mismo criterio: precio base y vencido, para que se recalcule
+    Producto = apps.get_model('productos', 'Producto')
+    Producto.objects.filter(precio_efectivo__isnull=True).update(
+        precio_efectivo=F('precio'), precio_efectivo_vence=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0016_stock_no_negativo'),
+    ]
+
+    operations = [
+        migrations.RunPython(completar_nulos, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='producto',
+            name='precio_efectivo',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=10, verbose_name='Precio efectivo'),
+        ),
+    ]
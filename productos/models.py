@@ -3,10 +3,27 @@ from django.utils import timezone
 from django.utils.safestring import mark_safe
 from django.urls import reverse
 from cloudinary_storage.storage import MediaCloudinaryStorage
+from biblioteca_plus.normalizacion import normalizar
+from .almacenamiento import StorageDeduplicado
+
+
+# Fotos de producto: Cloudinary con deduplicación por contenido (ver almacenamiento.py)
+_storage_fotos = StorageDeduplicado(MediaCloudinaryStorage())
+
+
+def storage_fotos():
+    return _storage_fotos
 
 
 class Producto(models.Model):
     nombre = models.CharField(max_length=100)
+    # Clave de búsqueda: nombre en minúsculas y sin tildes (ver biblioteca_plus.normalizacion)
+    nombre_normalizado = models.CharField(max_length=100, blank=True, editable=False, db_index=True)
+    # Código del proveedor: clave estable para `import_catalog` (upsert por SKU)
+    sku = models.CharField(
+        "SKU", max_length=64, unique=True, null=True, blank=True,
+        help_text="Código del proveedor. Las importaciones actualizan el producto con este SKU."
+    )
     descripcion = models.TextField(blank=True, null=True)
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
@@ -62,7 +79,7 @@ class Producto(models.Model):
 
     # Portada principal existente (opcional, la podés seguir usando)
     portada = models.ImageField(
-        storage=MediaCloudinaryStorage(),
+        storage=storage_fotos,
         upload_to="productos/portadas/",
         blank=True,
         null=True
@@ -76,9 +93,23 @@ class Producto(models.Model):
         blank=True
     )
 
+    # ----- PRECIO EFECTIVO (materializado) -----
+    # Precio que ve el cliente (campaña > oferta manual > precio base), guardado
+    # en una columna indexada para poder filtrar y ordenar por él en la base.
+    # NOT NULL: es campo de orden de la paginación por cursor (ver paginacion.py)
+    precio_efectivo = models.DecimalField(
+        "Precio efectivo", max_digits=10, decimal_places=2, editable=False
+    )
+    precio_efectivo_vence = models.DateTimeField(
+        "Precio efectivo válido hasta", null=True, blank=True, editable=False,
+        help_text="Próximo inicio/fin de campaña u oferta. Pasada esta fecha se recalcula."
+    )
+
     creado = models.DateTimeField(default=timezone.now)
     actualizado = models.DateTimeField(auto_now=True)
 
+    CAMPOS_PRECIO = ('precio', 'precio_oferta', 'en_oferta', 'fecha_fin_oferta')
+
     class Meta:
         ordering = ["nombre"]
         verbose_name = "Producto"
@@ -88,11 +119,43 @@ class Producto(models.Model):
             models.Index(fields=['nombre'], name='idx_producto_nombre'),
             models.Index(fields=['precio'], name='idx_producto_precio'),
             models.Index(fields=['stock'], name='idx_producto_stock'),
+            # Compuestos para paginar por cursor: (orden, id)
+            models.Index(fields=['nombre', 'id'], name='idx_producto_nombre_id'),
+            models.Index(fields=['precio_efectivo', 'id'], name='idx_producto_precio_efectivo'),
+            models.Index(fields=['precio_efectivo_vence'], name='idx_producto_precio_vence'),
+        ]
+        constraints = [
+            # Última red contra la sobreventa: ningún UPDATE puede dejar stock negativo
+            # (los descuentos son condicionales, ver ventas/stock.py)
+            models.CheckConstraint(condition=models.Q(stock__gte=0), name='producto_stock_no_negativo'),
         ]
 
     def __str__(self):
         return self.nombre
 
+    def save(self, *args, **kwargs):
+        self.nombre_normalizado = normalizar(self.nombre)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nombre' in update_fields:
+            update_fields = kwargs['update_fields'] = {*update_fields, 'nombre_normalizado'}
+        if update_fields is None or set(update_fields) & set(self.CAMPOS_PRECIO):
+            self.actualizar_precio_efectivo()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'precio_efectivo', 'precio_efectivo_vence'}
+        super().save(*args, **kwargs)
+
+    def actualizar_precio_efectivo(self, ahora=None):
+        """Recalcula en memoria `precio_efectivo` y su vencimiento (no guarda)."""
+        from .precios import campanias_vigentes, proximas_fronteras, calcular_vencimiento
+
+        ahora = ahora or timezone.now()
+        campania = frontera = None
+        if self.pk:
+            campania = campanias_vigentes([self.pk], ahora=ahora).get(self.pk)
+            frontera = proximas_fronteras([self.pk], ahora=ahora).get(self.pk)
+        self.precio_efectivo = self.calcular_precio_final(campania, ahora=ahora)
+        self.precio_efectivo_vence = calcular_vencimiento(self, frontera, ahora)
+
     def hay_stock(self, cantidad=1):
         return self.stock >= cantidad
 
@@ -113,11 +176,14 @@ class Producto(models.Model):
     @property
     def oferta_activa(self):
         """Verifica si la oferta está activa (en_oferta=True y no expirada)."""
+        return self._oferta_activa_en(timezone.now())
+
+    def _oferta_activa_en(self, ahora):
         if not self.en_oferta:
             return False
         if self.fecha_fin_oferta is None:
             return True  # Oferta sin fecha de expiración = siempre activa
-        return self.fecha_fin_oferta > timezone.now()
+        return self.fecha_fin_oferta > ahora
 
     @property
     def precio_display(self):
@@ -126,32 +192,31 @@ class Producto(models.Model):
         1. Campaña de descuento activa (CampaniaDescuento) → descuento masivo automático.
         2. Oferta manual del producto (precio_oferta + en_oferta activo).
         3. Precio base normal.
+
+        Optimización: si el precio ya fue precargado en lote con
+        `productos.precios.precargar_precios` se devuelve directo, sin query.
         """
-        from django.apps import apps
-        CampaniaDescuento = apps.get_model('productos', 'CampaniaDescuento')
-        from django.utils import timezone
-        now = timezone.now()
+        precargado = self.__dict__.get('_precio_display')
+        if precargado is not None:
+            return precargado
+
+        from .precios import campanias_vigentes
+        return self.calcular_precio_final(campanias_vigentes([self.pk]).get(self.pk))
+
+    def calcular_precio_final(self, campania=None, ahora=None):
+        """
+        Aplica la cascada de precios a partir de la campaña ya resuelta.
+        `campania` es una tupla (tipo_descuento, valor) o None si no hay campaña vigente.
+        """
+        from .precios import aplicar_campania
 
         # --- Prioridad 1: Campaña activa ---
-        campania = (
-            CampaniaDescuento.objects
-            .filter(
-                activa=True,
-                productos=self,
-                fecha_inicio__lte=now,
-                fecha_fin__gte=now,
-            )
-            .first()
-        )
         if campania:
-            if campania.tipo_descuento == 'porcentaje':
-                descuento = self.precio * (campania.valor / 100)
-                return round(self.precio - descuento, 2)
-            else:  # monto_fijo
-                return max(round(self.precio - campania.valor, 2), 0)
+            tipo_descuento, valor = campania
+            return aplicar_campania(self.precio, tipo_descuento, valor)
 
         # --- Prioridad 2: Oferta manual ---
-        if self.oferta_activa and self.precio_oferta:
+        if self.precio_oferta and self._oferta_activa_en(ahora or timezone.now()):
             return self.precio_oferta
 
         # --- Prioridad 3: Precio base ---
@@ -160,9 +225,30 @@ class Producto(models.Model):
     def get_absolute_url(self):
         return reverse("productos:producto_detail", args=[self.pk])
 
+    @property
+    def portada_principal(self):
+        """
+        Primera PortadaProducto (por orden, id). Si la vista hizo
+        `prefetch_related('portadas')` (también anidado, p. ej.
+        `detalles__producto__portadas`) sale del caché del prefetch, sin query.
+        """
+        if 'portadas' in getattr(self, '_prefetched_objects_cache', {}):
+            portadas = self.portadas.all()
+            return portadas[0] if portadas else None
+        return self.portadas.first()
+
     @property
     def imagen_principal_url(self):
-        primera = self.portadas.first()
+        """
+        URL de la imagen principal: primera portada múltiple o, si no hay, la
+        portada única. Sin query si la portada vino anotada (`lectura.con_datos_card`)
+        o prefetcheada.
+        """
+        anotada = self.__dict__.get('imagen_portada')
+        if anotada:
+            return PortadaProducto._meta.get_field('imagen').storage.url(anotada)
+
+        primera = None if 'imagen_portada' in self.__dict__ else self.portada_principal
         if primera and primera.imagen:
             return primera.imagen.url
         if self.portada:
@@ -197,7 +283,7 @@ class PortadaProducto(models.Model):
         related_name="portadas"
     )
     imagen = models.ImageField(
-        storage=MediaCloudinaryStorage(),
+        storage=storage_fotos,
         upload_to="productos/portadas/"
     )
     orden = models.PositiveIntegerField(
@@ -222,6 +308,32 @@ class PortadaProducto(models.Model):
     imagen_preview.short_description = "Imagen"
 
 
+# ──────────────────────────────────────────────
+# 🗂️ Índice de archivos subidos (storage deduplicado)
+# ──────────────────────────────────────────────
+class ArchivoMedia(models.Model):
+    """
+    Hash del contenido → objeto ya subido al storage real. Lo usa
+    `StorageDeduplicado` para no volver a subir una foto repetida.
+    """
+    storage = models.CharField(max_length=200, help_text="Storage real (clase y destino).")
+    sha256 = models.CharField(max_length=64)
+    nombre = models.CharField(max_length=255, help_text="Nombre del objeto en el storage real.")
+    url = models.URLField(max_length=500)
+    tamanio = models.PositiveBigIntegerField(default=0)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Archivo subido"
+        verbose_name_plural = "Archivos subidos"
+        constraints = [
+            models.UniqueConstraint(fields=['storage', 'sha256'], name='archivo_media_storage_sha256'),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} ({self.sha256[:12]})"
+
+
 # ──────────────────────────────────────────────
 # 🔥 Motor de Ofertas: Campaña Automática Global
 # ──────────────────────────────────────────────
@@ -0,0 +1,218 @@
+"""
+Motor de precios de la vidriera.
+
+`Producto.precio_display` resuelve la campaña vigente con una query por lectura.
+Cuando hay que mostrar muchos productos juntos (catálogo, carrito, POS) este
+módulo trae las campañas vigentes de TODOS en una sola query y deja el precio
+final precalculado en cada instancia. `precio_display` lee ese valor y solo
+vuelve a consultar la base si nadie lo precargó.
+"""
+from decimal import Decimal
+
+from django.utils import timezone
+
+from biblioteca_plus.inicio import invalidar_home
+
+from .catalogo import invalidar_catalogo
+from .fragmentos import invalidar_tarjetas
+
+
+def aplicar_campania(precio, tipo_descuento, valor):
+    """Aplica el descuento de una campaña sobre un precio base."""
+    if tipo_descuento == 'porcentaje':
+        descuento = precio * (valor / 100)
+        return round(precio - descuento, 2)
+    # monto_fijo
+    return max(round(precio - valor, 2), Decimal('0'))
+
+
+def campanias_vigentes(producto_ids, ahora=None):
+    """
+    Devuelve {producto_id: (tipo_descuento, valor)} con la campaña que aplica a
+    cada producto. Una sola query sobre la tabla intermedia del M2M.
+
+    Si un producto está en varias campañas vigentes gana la de inicio más
+    reciente (mismo criterio que el `ordering` de CampaniaDescuento).
+    """
+    from .models import CampaniaDescuento
+
+    producto_ids = set(producto_ids)
+    if not producto_ids:
+        return {}
+
+    ahora = ahora or timezone.now()
+    Relacion = CampaniaDescuento.productos.through
+    filas = (
+        Relacion.objects
+        .filter(
+            producto_id__in=producto_ids,
+            campaniadescuento__activa=True,
+            campaniadescuento__fecha_inicio__lte=ahora,
+            campaniadescuento__fecha_fin__gte=ahora,
+        )
+        .order_by('-campaniadescuento__fecha_inicio', 'campaniadescuento_id')
+        .values_list(
+            'producto_id',
+            'campaniadescuento__tipo_descuento',
+            'campaniadescuento__valor',
+        )
+    )
+
+    resultado = {}
+    for producto_id, tipo, valor in filas:
+        # La primera fila de cada producto es la campaña ganadora
+        resultado.setdefault(producto_id, (tipo, valor))
+    return resultado
+
+
+def precargar_precios(productos, ahora=None):
+    """
+    Calcula el precio final de cada producto y lo deja guardado en la instancia,
+    de modo que `precio_display` no vuelva a tocar la base.
+
+    Acepta cualquier iterable de Producto (lista, QuerySet, page.object_list).
+    Devuelve la misma colección como lista para poder encadenarlo.
+    """
+    productos = [p for p in productos if p is not None]
+    if not productos:
+        return productos
+
+    ahora = ahora or timezone.now()
+    campanias = campanias_vigentes((p.pk for p in productos), ahora=ahora)
+
+    for producto in productos:
+        producto._precio_display = producto.calcular_precio_final(
+            campanias.get(producto.pk), ahora=ahora
+        )
+    return productos
+
+
+# ──────────────────────────────────────────────
+# 💾 Precio efectivo materializado (columna indexada)
+# ──────────────────────────────────────────────
+def proximas_fronteras(producto_ids, ahora=None):
+    """
+    Devuelve {producto_id: datetime} con el próximo instante en que arranca o
+    termina alguna campaña activa del producto. Pasado ese momento el precio
+    efectivo guardado puede quedar viejo y hay que recalcularlo.
+    """
+    from .models import CampaniaDescuento
+
+    producto_ids = set(producto_ids)
+    if not producto_ids:
+        return {}
+
+    ahora = ahora or timezone.now()
+    Relacion = CampaniaDescuento.productos.through
+    filas = (
+        Relacion.objects
+        .filter(
+            producto_id__in=producto_ids,
+            campaniadescuento__activa=True,
+            campaniadescuento__fecha_fin__gte=ahora,
+        )
+        .values_list(
+            'producto_id',
+            'campaniadescuento__fecha_inicio',
+            'campaniadescuento__fecha_fin',
+        )
+    )
+
+    resultado = {}
+    for producto_id, inicio, fin in filas:
+        # Si todavía no arrancó, la frontera es el inicio; si ya está corriendo, el fin
+        frontera = inicio if inicio > ahora else fin
+        actual = resultado.get(producto_id)
+        if actual is None or frontera < actual:
+            resultado[producto_id] = frontera
+    return resultado
+
+
+def calcular_vencimiento(producto, frontera_campania, ahora):
+    """Próxima fecha en la que el precio efectivo del producto puede cambiar solo."""
+    candidatos = [frontera_campania] if frontera_campania else []
+    if producto._oferta_activa_en(ahora) and producto.fecha_fin_oferta:
+        candidatos.append(producto.fecha_fin_oferta)
+    return min(candidatos) if candidatos else None
+
+
+def recalcular_precios_efectivos(productos=None, ahora=None, batch_size=500):
+    """
+    Recalcula `precio_efectivo` y `precio_efectivo_vence` de los productos
+    indicados (QuerySet o lista de ids). Sin argumentos recorre todo el catálogo.
+
+    Trabaja por lotes: 2 queries de lectura por lote y un único bulk_update
+    con las filas que realmente cambiaron. Devuelve la cantidad actualizada.
+    """
+    from .models import Producto
+
+    ahora = ahora or timezone.now()
+    if productos is None:
+        qs = Producto.objects.all()
+    elif hasattr(productos, 'model'):
+        qs = productos
+    else:
+        qs = Producto.objects.filter(pk__in=list(productos))
+
+    qs = qs.order_by('pk').only(
+        'pk', 'precio', 'precio_oferta', 'en_oferta', 'fecha_fin_oferta',
+        'precio_efectivo', 'precio_efectivo_vence',
+    )
+
+    actualizados = 0
+    ultimo_pk = 0
+    while True:
+        lote = list(qs.filter(pk__gt=ultimo_pk)[:batch_size])
+        if not lote:
+            break
+        ultimo_pk = lote[-1].pk
+
+        ids = [p.pk for p in lote]
+        campanias = campanias_vigentes(ids, ahora=ahora)
+        fronteras = proximas_fronteras(ids, ahora=ahora)
+
+        cambiados = []
+        for producto in lote:
+            precio = producto.calcular_precio_final(campanias.get(producto.pk), ahora=ahora)
+            vence = calcular_vencimiento(producto, fronteras.get(producto.pk), ahora)
+            if producto.precio_efectivo != precio or producto.precio_efectivo_vence != vence:
+                producto.precio_efectivo = precio
+                producto.precio_efectivo_vence = vence
+                cambiados.append(producto)
+
+        if cambiados:
+            Producto.objects.bulk_update(cambiados, ['precio_efectivo', 'precio_efectivo_vence'])
+            # bulk_update no dispara señales: las tarjetas cacheadas se invalidan acá
+            invalidar_tarjetas(p.pk for p in cambiados)
+            actualizados += len(cambiados)
+
+    return actualizados
+
+
+def refrescar_precios_vencidos(ahora=None):
+    """
+    Recalcula solo los productos cuya campaña u oferta arrancó o terminó desde
+    el último cálculo. Es una búsqueda sobre el índice de `precio_efectivo_vence`,
+    así que se puede llamar antes de cada listado sin costo apreciable.
+    """
+    from .models import Producto
+
+    ahora = ahora or timezone.now()
+    vencidos = Producto.objects.filter(precio_efectivo_vence__lt=ahora)
+    if not vencidos.exists():
+        return 0
+    actualizados = recalcular_precios_efectivos(vencidos, ahora=ahora)
+    if actualizados:
+        # bulk_update no dispara señales: avisamos a lo cacheado por versión (facetas, la home, etc.)
+        invalidar_catalogo()
+        invalidar_home()
+    return actualizados
+
+
+def proximo_vencimiento():
+    """Primer momento en que algún precio efectivo del catálogo cambia solo (o None)."""
+    from django.db.models import Min
+
+    from .models import Producto
+
+    return Producto.objects.aggregate(vence=Min('precio_efectivo_vence'))['vence']
@@ -0,0 +1,270 @@
+"""
+Actualización masiva de precios a partir de un archivo de reglas.
+
+Reemplaza a `actualizar_precios.py`, que hacía un `icontains` por regla y un
+`save(update_fields=['precio'])` por producto (cada save disparaba señales:
+índice de búsqueda, versión del catálogo, home...). Acá:
+
+- todas las reglas se resuelven con UNA query (un OR de sus selectores) y se
+  aplican en memoria, en el orden del archivo;
+- los cambios se guardan con un único `bulk_update` dentro de una
+  transacción, junto con el recálculo del precio efectivo;
+- tarjetas, catálogo y home se invalidan una sola vez al final;
+- `calcular_cambios` no toca la base: sirve para el `--dry-run` del comando
+  y para la vista previa del admin;
+- un producto cuyo precio de oferta quedaría igual o mayor que su precio
+  (por la regla sobre la oferta o sobre el precio) se muestra con el error y
+  `aplicar_cambios` no lo guarda, igual que el gestor de ofertas.
+
+Formato (CSV con encabezado, o JSON con una lista de objetos):
+
+    sku,id,nombre,campo,cambio,redondeo
+    SAC-60,,,precio,5790,
+    ,12,,precio,+10%,100
+    ,,rascador*,precio_oferta,-5%,10
+
+- Selector: `sku` exacto, `id` exacto o `nombre` (parte del nombre sin
+  tildes ni mayúsculas; con `*` o `?` es un patrón sobre el nombre entero).
+- `campo`: `precio` (por defecto) o `precio_oferta`.
+- `cambio`: `5790` o `=5790` fija el precio, `+500`/`-500` suma o resta,
+  `+10%`/`-5%` aplica un porcentaje.
+- `redondeo` (opcional): redondea al múltiplo más cercano (10, 100, ...).
+"""
+import csv
+import io
+import json
+import re
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from fnmatch import fnmatchcase
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from biblioteca_plus.inicio import invalidar_home
+from biblioteca_plus.normalizacion import normalizar
+
+from .catalogo import invalidar_catalogo
+from .fragmentos import invalidar_tarjetas
+from .precios import recalcular_precios_efectivos
+
+CAMPOS = ('precio', 'precio_oferta')
+PATRON_CAMBIO = re.compile(r'^(?P<op>[=+-]?)\s*(?P<valor>\d+(?:[.,]\d+)?)\s*(?P<porcentaje>%?)$')
+CENTAVOS = Decimal('0.01')
+
+
+class ReglaInvalida(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Regla:
+    linea: int
+    campo: str
+    operacion: str      # 'fijar', 'sumar' o 'porcentaje'
+    valor: Decimal
+    sku: str = ''
+    id: int | None = None
+    nombre: str = ''    # ya normalizado
+    redondeo: Decimal | None = None
+
+    def __str__(self):
+        selector = self.sku or (f"#{self.id}" if self.id else f"'{self.nombre}'")
+        return f"línea {self.linea} ({selector})"
+
+    @property
+    def es_patron(self):
+        return any(c in self.nombre for c in '*?')
+
+    def coincide(self, producto):
+        if self.sku:
+            return producto.sku == self.sku
+        if self.id:
+            return producto.pk == self.id
+        if self.es_patron:
+            return fnmatchcase(producto.nombre_normalizado, self.nombre)
+        return self.nombre in producto.nombre_normalizado
+
+    def filtro(self):
+        if self.sku:
+            return Q(sku=self.sku)
+        if self.id:
+            return Q(pk=self.id)
+        # Con patrón, la base filtra por el tramo literal más largo y el resto se resuelve en Python
+        literal = max(re.split(r'[*?]', self.nombre), key=len) if self.es_patron else self.nombre
+        return Q(nombre_normalizado__contains=literal)
+
+    def aplicar(self, precio):
+        if self.operacion == 'fijar':
+            nuevo = self.valor
+        elif self.operacion == 'sumar':
+            nuevo = precio + self.valor
+        else:
+            nuevo = precio * (1 + self.valor / 100)
+        if self.redondeo:
+            nuevo = (nuevo / self.redondeo).quantize(Decimal('1'), ROUND_HALF_UP) * self.redondeo
+        return max(nuevo, Decimal('0')).quantize(CENTAVOS, ROUND_HALF_UP)
+
+
+@dataclass
+class Cambio:
+    producto: object
+    campo: str
+    antes: Decimal
+    despues: Decimal
+    reglas: list = field(default_factory=list)
+    error: str = ''     # si no está vacío, el cambio no se aplica
+
+    @property
+    def porcentaje(self):
+        if not self.antes:
+            return None
+        return (self.despues - self.antes) / self.antes * 100
+
+
+# ──────────────────────────────────────────────
+# 📄 Lectura de reglas
+# ──────────────────────────────────────────────
+def _decimal(texto, que, linea):
+    try:
+        return Decimal(str(texto).replace(',', '.'))
+    except InvalidOperation:
+        raise ReglaInvalida(f"línea {linea}: {que} inválido ({texto!r})")
+
+
+def _regla(datos, linea):
+    datos = {k.strip().lower(): (str(v).strip() if v is not None else '') for k, v in datos.items() if k}
+    sku, id_, nombre = datos.get('sku', ''), datos.get('id', ''), normalizar(datos.get('nombre', ''))
+    if sum(bool(s) for s in (sku, id_, nombre)) != 1:
+        raise ReglaInvalida(f"línea {linea}: indicá uno (y solo uno) de sku, id o nombre")
+    if id_ and not id_.isdigit():
+        raise ReglaInvalida(f"línea {linea}: id inválido ({id_!r})")
+    if nombre and not nombre.strip('*? '):
+        raise ReglaInvalida(f"línea {linea}: el patrón de nombre no puede ser solo comodines")
+
+    campo = datos.get('campo') or 'precio'
+    if campo not in CAMPOS:
+        raise ReglaInvalida(f"línea {linea}: campo inválido ({campo!r}); usá {' o '.join(CAMPOS)}")
+
+    coincidencia = PATRON_CAMBIO.match(datos.get('cambio', ''))
+    if not coincidencia:
+        raise ReglaInvalida(f"línea {linea}: cambio inválido ({datos.get('cambio', '')!r}); ej. 5790, +500, -10%")
+    op, porcentaje = coincidencia['op'], coincidencia['porcentaje']
+    valor = _decimal(coincidencia['valor'], 'cambio', linea)
+    if porcentaje and op in ('', '='):
+        raise ReglaInvalida(f"línea {linea}: un porcentaje necesita signo (+10% o -10%)")
+    if op == '-':
+        valor = -valor
+    operacion = 'porcentaje' if porcentaje else ('sumar' if op in ('+', '-') else 'fijar')
+
+    redondeo = _decimal(datos['redondeo'], 'redondeo', linea) if datos.get('redondeo') else None
+    if redondeo is not None and redondeo <= 0:
+        raise ReglaInvalida(f"línea {linea}: el redondeo tiene que ser positivo")
+
+    return Regla(
+        linea=linea, campo=campo, operacion=operacion, valor=valor,
+        sku=sku, id=int(id_) if id_ else None, nombre=nombre, redondeo=redondeo,
+    )
+
+
+def leer_reglas(texto, formato=None):
+    """Parsea CSV o JSON. Una regla mal escrita invalida todo el archivo."""
+    formato = formato or ('json' if texto.lstrip().startswith('[') else 'csv')
+    if formato == 'json':
+        try:
+            filas = json.loads(texto)
+        except ValueError as e:
+            raise ReglaInvalida(f"JSON inválido: {e}")
+        if not isinstance(filas, list) or not all(isinstance(f, dict) for f in filas):
+            raise ReglaInvalida("El JSON tiene que ser una lista de objetos")
+        reglas = [_regla(f, i) for i, f in enumerate(filas, 1)]
+    else:
+        lector = csv.DictReader(io.StringIO(texto))
+        reglas = [_regla(f, lector.line_num) for f in lector]
+    if not reglas:
+        raise ReglaInvalida("El archivo no tiene reglas")
+    return reglas
+
+
+# ──────────────────────────────────────────────
+# 🧮 Cálculo (sin escribir) y aplicación
+# ──────────────────────────────────────────────
+def calcular_cambios(reglas):
+    """
+    Devuelve (cambios, reglas sin coincidencias). Una sola query trae todos los
+    productos alcanzados; las reglas se aplican en orden sobre el resultado de
+    las anteriores. No guarda nada.
+    """
+    from .models import Producto
+
+    filtro = Q()
+    for regla in reglas:
+        filtro |= regla.filtro()
+    productos = list(
+        Producto.objects.filter(filtro)
+        .only('pk', 'sku', 'nombre', 'nombre_normalizado', 'actualizado', *Producto.CAMPOS_PRECIO)
+        .order_by('nombre', 'pk')
+    )
+
+    cambios, usadas = {}, set()
+    for producto in productos:
+        for regla in reglas:
+            if not regla.coincide(producto):
+                continue
+            usadas.add(regla)
+            actual = getattr(producto, regla.campo)
+            if actual is None and regla.operacion != 'fijar':
+                continue  # no hay precio de oferta al que sumarle
+            clave = (producto.pk, regla.campo)
+            cambio = cambios.setdefault(clave, Cambio(producto, regla.campo, actual, actual))
+            cambio.despues = regla.aplicar(actual)
+            cambio.reglas.append(regla)
+            setattr(producto, regla.campo, cambio.despues)
+
+    efectivos = [c for c in cambios.values() if c.antes != c.despues]
+    _validar_ofertas(efectivos)
+    return efectivos, [r for r in reglas if r not in usadas]
+
+
+def _validar_ofertas(cambios):
+    """Marca con error los cambios de productos cuya oferta no quedaría por debajo del precio."""
+    for cambio in cambios:
+        producto = cambio.producto
+        if producto.precio_oferta is not None and producto.precio_oferta >= producto.precio:
+            cambio.error = (
+                f"el precio de oferta (${producto.precio_oferta}) tiene que ser menor "
+                f"al precio de lista (${producto.precio})"
+            )
+
+
+def validos(cambios):
+    """Los cambios que se pueden guardar (sin error)."""
+    return [c for c in cambios if not c.error]
+
+
+def aplicar_cambios(cambios):
+    """
+    Guarda los cambios ya calculados: un bulk_update, en una transacción.
+    Los que tienen error no se guardan (ver `_validar_ofertas`).
+    """
+    from .models import Producto
+
+    cambios = validos(cambios)
+    if not cambios:
+        return 0
+    productos = list({c.producto.pk: c.producto for c in cambios}.values())
+    ids = [p.pk for p in productos]
+    ahora = timezone.now()
+    for producto in productos:
+        producto.actualizado = ahora  # bulk_update no aplica auto_now
+
+    with transaction.atomic():
+        Producto.objects.bulk_update(productos, sorted({c.campo for c in cambios}) + ['actualizado'])
+        recalcular_precios_efectivos(ids, ahora=ahora)
+
+    # bulk_update no dispara señales: una sola invalidación para todo el lote
+    invalidar_tarjetas(ids)
+    invalidar_catalogo()
+    invalidar_home()
+    return len(productos)
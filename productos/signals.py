@@ -0,0 +1,160 @@
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from biblioteca_plus.inicio import invalidar_home
+from categorias.models import Categoria
+from .models import CampaniaDescuento, PortadaProducto, Producto
+from .precios import recalcular_precios_efectivos
+from . import busqueda
+from .almacenamiento import referenciado
+from .catalogo import invalidar_catalogo
+from .derivados import borrar_derivados, generar_derivados_seguro
+from .fragmentos import invalidar_tarjetas
+
+
+# ──────────────────────────────────────────────
+# 💾 Precio efectivo: recalcular cuando cambia una campaña
+# ──────────────────────────────────────────────
+@receiver(post_save, sender=CampaniaDescuento)
+def campania_guardada(sender, instance, **kwargs):
+    # Cambió fecha, valor o el toggle "activa": recalculamos sus productos actuales
+    recalcular_precios_efectivos(list(instance.productos.values_list('pk', flat=True)))
+
+
+@receiver(pre_delete, sender=CampaniaDescuento)
+def campania_por_borrar(sender, instance, **kwargs):
+    # Después del delete ya no existe la relación, así que guardamos los ids antes
+    instance._productos_afectados = list(instance.productos.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=CampaniaDescuento)
+def campania_borrada(sender, instance, **kwargs):
+    recalcular_precios_efectivos(getattr(instance, '_productos_afectados', []))
+
+
+@receiver(m2m_changed, sender=CampaniaDescuento.productos.through)
+def productos_de_campania_cambiados(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # producto.campanias.add(...): el afectado es el propio producto
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            recalcular_precios_efectivos([instance.pk])
+        return
+
+    if action == 'pre_clear':
+        instance._productos_afectados = list(instance.productos.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        recalcular_precios_efectivos(getattr(instance, '_productos_afectados', []))
+    elif action in ('post_add', 'post_remove'):
+        recalcular_precios_efectivos(pk_set or [])
+
+
+# ──────────────────────────────────────────────
+# 🔎 Índice de búsqueda: mantenerlo sincronizado
+# ──────────────────────────────────────────────
+@receiver(post_save, sender=Producto)
+def indexar_producto(sender, instance, raw=False, **kwargs):
+    if raw:
+        return  # loaddata: se reconstruye después con `reconstruir_busqueda`
+    busqueda.indexar([instance])
+
+
+@receiver(post_delete, sender=Producto)
+def quitar_producto_del_indice(sender, instance, **kwargs):
+    busqueda.quitar([instance.pk])
+
+
+@receiver(post_save, sender=Categoria)
+def reindexar_categoria(sender, instance, created, raw=False, **kwargs):
+    # El nombre de la categoría forma parte del documento de cada producto
+    if raw or created:
+        return
+    busqueda.indexar(instance.productos.select_related('categoria'))
+
+
+# ──────────────────────────────────────────────
+# 🏷️ Versión del catálogo: invalida índices y fragmentos en caché
+# ──────────────────────────────────────────────
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_save, sender=CampaniaDescuento)
+@receiver(post_delete, sender=CampaniaDescuento)
+def catalogo_modificado(sender, **kwargs):
+    invalidar_catalogo()
+
+
+@receiver(m2m_changed, sender=CampaniaDescuento.productos.through)
+def campania_productos_modificados(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidar_catalogo()
+
+
+# ──────────────────────────────────────────────
+# 🃏 Tarjetas cacheadas: sello de versión por producto
+# ──────────────────────────────────────────────
+# Los cambios de precio por campañas/ofertas los avisa `recalcular_precios_efectivos`.
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def tarjeta_producto_modificada(sender, instance, **kwargs):
+    invalidar_tarjetas([instance.pk])
+
+
+@receiver(post_save, sender=PortadaProducto)
+@receiver(post_delete, sender=PortadaProducto)
+def portada_modificada(sender, instance, **kwargs):
+    invalidar_tarjetas([instance.producto_id])
+
+
+@receiver(post_save, sender=Categoria)
+def tarjetas_de_categoria(sender, instance, created, raw=False, **kwargs):
+    # La tarjeta muestra el nombre de la categoría
+    if raw or created:
+        return
+    invalidar_tarjetas(instance.productos.values_list('pk', flat=True))
+
+
+# ──────────────────────────────────────────────
+# 🏠 Home: se marca vieja y la reconstruye un solo worker
+# ──────────────────────────────────────────────
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=PortadaProducto)
+@receiver(post_delete, sender=PortadaProducto)
+@receiver(post_save, sender=CampaniaDescuento)
+@receiver(post_delete, sender=CampaniaDescuento)
+def home_modificada(sender, **kwargs):
+    invalidar_home()
+
+
+@receiver(m2m_changed, sender=CampaniaDescuento.productos.through)
+def home_campania_productos(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidar_home()
+
+
+# ──────────────────────────────────────────────
+# 🖼️ Derivados responsive de las fotos (ver derivados.py)
+# ──────────────────────────────────────────────
+# Con Cloudinary no hacen nada: los derivados son transformaciones en la URL.
+@receiver(post_save, sender=PortadaProducto)
+def derivados_de_portada(sender, instance, raw=False, **kwargs):
+    if not raw:
+        generar_derivados_seguro(instance.imagen)
+
+
+@receiver(post_save, sender=Producto)
+def derivados_de_producto(sender, instance, raw=False, **kwargs):
+    # Si la portada no cambió, los derivados ya existen y no se rehacen
+    if not raw and instance.portada:
+        generar_derivados_seguro(instance.portada)
+
+
+@receiver(post_delete, sender=PortadaProducto)
+def borrar_derivados_de_portada(sender, instance, **kwargs):
+    nombre = instance.imagen.name
+    if not nombre:
+        return
+    # Con el storage deduplicado otra foto puede apuntar al mismo archivo
+    if not referenciado(nombre):
+        borrar_derivados(instance.imagen.storage, nombre)
@@ -0,0 +1,140 @@
+"""
+Subida de portadas en segundo plano.
+
+Con `MediaCloudinaryStorage` cada `PortadaProducto.objects.create` es una
+subida remota sincrónica; cinco fotos en serie dentro del request podían pasar
+el timeout de gunicorn. Ahora el formulario encola las fotos y responde al
+instante:
+
+- las fotos se copian a memoria (los archivos del request se borran al
+  terminarlo) y se suben en un pool de hilos acotado por worker
+  (`PORTADAS_SUBIDA_HILOS`, por defecto 3; con 0 se suben en el request);
+- cada una ya tiene su `orden` asignado al encolarla, así la galería respeta
+  el orden en que se eligieron aunque terminen desordenadas;
+- cuántas faltan (y cuáles fallaron) queda en el caché compartido: el
+  formulario consulta `portadas_estado` y va agregando las que terminan.
+
+Si el worker se reinicia a mitad de una subida, esa foto se pierde y hay que
+volver a cargarla (el contador de pendientes vence solo).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import Max
+
+from .models import PortadaProducto
+
+logger = logging.getLogger(__name__)
+
+MAXIMO_PORTADAS = 5
+PREFIJO_ESTADO = 'portadas_subiendo_'  # sin copia local: lo consultan todos los workers
+TIEMPO_ESTADO = 60 * 30
+
+_ejecutor = None
+_ejecutor_lock = threading.Lock()
+_estado_lock = threading.Lock()
+
+
+def _hilos():
+    return getattr(settings, 'PORTADAS_SUBIDA_HILOS', 3)
+
+
+def _pool():
+    global _ejecutor
+    with _ejecutor_lock:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(max_workers=_hilos(), thread_name_prefix='subida-portadas')
+        return _ejecutor
+
+
+# ──────────────────────────────────────────────
+# 📋 Estado por producto
+# ──────────────────────────────────────────────
+def estado_subidas(producto_id):
+    """{'pendientes': n, 'errores': [nombres de archivo]} del producto."""
+    return cache.get(f'{PREFIJO_ESTADO}{producto_id}') or {'pendientes': 0, 'errores': []}
+
+
+def _actualizar_estado(producto_id, pendientes=0, error=None):
+    # Las subidas de un producto corren en el worker que recibió el form: el lock alcanza
+    with _estado_lock:
+        estado = estado_subidas(producto_id)
+        estado['pendientes'] = max(0, estado['pendientes'] + pendientes)
+        if error:
+            estado['errores'] = estado['errores'] + [error]
+        cache.set(f'{PREFIJO_ESTADO}{producto_id}', estado, TIEMPO_ESTADO)
+
+
+def limpiar_errores(producto_id):
+    with _estado_lock:
+        estado = estado_subidas(producto_id)
+        if estado['errores']:
+            estado['errores'] = []
+            cache.set(f'{PREFIJO_ESTADO}{producto_id}', estado, TIEMPO_ESTADO)
+
+
+# ──────────────────────────────────────────────
+# ☁️ Subida
+# ──────────────────────────────────────────────
+def _subir(producto_id, archivo, orden):
+    try:
+        PortadaProducto.objects.create(producto_id=producto_id, imagen=archivo, orden=orden)
+    except Exception:
+        logger.exception("No se pudo subir la portada %s del producto %s", archivo.name, producto_id)
+        _actualizar_estado(producto_id, pendientes=-1, error=archivo.name)
+    else:
+        _actualizar_estado(producto_id, pendientes=-1)
+
+
+def _subir_en_hilo(producto_id, archivo, orden):
+    try:
+        _subir(producto_id, archivo, orden)
+    finally:
+        close_old_connections()
+
+
+def lugares_libres(producto):
+    ocupados = producto.portadas.count() + estado_subidas(producto.pk)['pendientes']
+    return max(0, MAXIMO_PORTADAS - ocupados)
+
+
+def siguiente_orden(producto):
+    """Orden para una portada nueva: después de todas las actuales."""
+    ultimo = producto.portadas.aggregate(ultimo=Max('orden'))['ultimo']
+    return 0 if ultimo is None else ultimo + 1
+
+
+def encolar_portadas(producto, archivos):
+    """
+    Encola las fotos del formulario (hasta completar `MAXIMO_PORTADAS`) y
+    devuelve cuántas se aceptaron. La subida arranca cuando se confirma la
+    transacción del request, así el hilo ya ve el producto recién creado.
+    """
+    archivos = list(archivos)[:lugares_libres(producto)]
+    if not archivos:
+        return 0
+
+    primero = siguiente_orden(producto)
+    # Copia en memoria: el archivo temporal del request no sobrevive al response
+    copias = [(ContentFile(f.read(), name=f.name), primero + i) for i, f in enumerate(archivos)]
+
+    if not _hilos():
+        for copia, orden in copias:
+            _actualizar_estado(producto.pk, pendientes=1)
+            _subir(producto.pk, copia, orden)
+        return len(copias)
+
+    _actualizar_estado(producto.pk, pendientes=len(copias))
+
+    def lanzar():
+        pool = _pool()
+        for copia, orden in copias:
+            pool.submit(_subir_en_hilo, producto.pk, copia, orden)
+
+    transaction.on_commit(lanzar)
+    return len(copias)
@@ -0,0 +1,177 @@
+"""
+"¿Quisiste decir…?" para búsquedas sin resultados.
+
+Se arma en memoria un índice de trigramas con el vocabulario de los nombres de
+producto (palabras normalizadas). Para una palabra mal escrita ("rasacdor")
+se cuentan los trigramas que comparte con cada palabra del vocabulario, y solo
+las mejores candidatas se verifican con distancia de Levenshtein. Así no se
+recorre todo el vocabulario y la consulta es de una fracción de milisegundo
+aun con decenas de miles de palabras.
+
+Las palabras pegadas ("sacapelusas") se resuelven partiéndolas en dos
+palabras conocidas ("saca" + "pelusas").
+
+El índice se reconstruye cuando cambia la versión del catálogo (ver
+`productos/catalogo.py`). Para medir la latencia con un catálogo grande:
+`python manage.py benchmark_sugerencias --cantidad 50000`.
+"""
+import heapq
+from collections import Counter
+
+from django.urls import reverse
+
+from biblioteca_plus.normalizacion import normalizar
+from .catalogo import IndiceEnProceso
+
+LARGO_MINIMO = 3
+CANDIDATAS_A_VERIFICAR = 30
+
+
+def levenshtein(a, b, maximo=None):
+    """
+    Distancia de edición clásica, con dos filas de memoria. Si se pasa
+    `maximo` corta apenas la distancia lo supera (devuelve maximo + 1).
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if maximo is not None and len(a) - len(b) > maximo:
+        return maximo + 1
+    if not b:
+        return len(a)
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(
+                anterior[j] + 1,
+                actual[j - 1] + 1,
+                anterior[j - 1] + (ca != cb),
+            ))
+        if maximo is not None and min(actual) > maximo:
+            return maximo + 1
+        anterior = actual
+    return anterior[-1]
+
+
+def tolerancia(palabra):
+    """Errores admitidos según el largo: 1 hasta 4 letras, 2 hasta 8, 3 después."""
+    if len(palabra) <= 4:
+        return 1
+    if len(palabra) <= 8:
+        return 2
+    return 3
+
+
+def trigramas(palabra):
+    relleno = f'  {palabra} '
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+class IndiceSugerencias:
+    def __init__(self, nombres):
+        """`nombres`: iterable de (producto_id, nombre)."""
+        # Ordenados por nombre: la posición más chica es la primera alfabéticamente
+        self.nombres = sorted(nombres, key=lambda n: n[1])
+        self.productos_por_palabra = {}
+        for posicion, (pk, nombre) in enumerate(self.nombres):
+            for palabra in normalizar(nombre).split():
+                if len(palabra) >= LARGO_MINIMO and not palabra.isdigit():
+                    self.productos_por_palabra.setdefault(palabra, set()).add(posicion)
+
+        self.vocabulario = list(self.productos_por_palabra)
+        self.por_trigrama = {}
+        for i, palabra in enumerate(self.vocabulario):
+            for trigrama in trigramas(palabra):
+                self.por_trigrama.setdefault(trigrama, []).append(i)
+
+    def _parecidas(self, palabra):
+        """Palabras del vocabulario a distancia <= tolerancia, [(distancia, palabra)]."""
+        maximo = tolerancia(palabra)
+        propios = trigramas(palabra)
+        # Cada error de edición rompe a lo sumo 3 trigramas
+        minimo_comun = max(1, len(propios) - 3 * maximo)
+
+        # Counter.update y most_common cuentan en C: es la parte caliente
+        comunes = Counter()
+        for trigrama in propios:
+            comunes.update(self.por_trigrama.get(trigrama, ()))
+
+        encontradas = []
+        for i, n in comunes.most_common(CANDIDATAS_A_VERIFICAR):
+            if n < minimo_comun:
+                break
+            candidata = self.vocabulario[i]
+            distancia = levenshtein(palabra, candidata, maximo)
+            if distancia <= maximo:
+                encontradas.append((distancia, candidata))
+        return encontradas
+
+    def _partir(self, palabra):
+        """'sacapelusas' -> ['saca', 'pelusas'] si ambas mitades son conocidas."""
+        for i in range(LARGO_MINIMO, len(palabra) - LARGO_MINIMO + 1):
+            izquierda, derecha = palabra[:i], palabra[i:]
+            if izquierda in self.productos_por_palabra and derecha in self.productos_por_palabra:
+                return [izquierda, derecha]
+        return None
+
+    def corregir_palabra(self, palabra):
+        """Devuelve la lista de palabras que reemplazan a `palabra` (vacía si no hay)."""
+        if palabra in self.productos_por_palabra or len(palabra) < LARGO_MINIMO:
+            return [palabra]
+        partes = self._partir(palabra)
+        if partes:
+            return partes
+        candidatas = self._parecidas(palabra)
+        if not candidatas:
+            return []
+        # La más cercana; a igual distancia, la que aparece en más productos
+        _, mejor = min(
+            candidatas,
+            key=lambda c: (c[0], -len(self.productos_por_palabra[c[1]]), c[1]),
+        )
+        return [mejor]
+
+    def sugerir(self, termino, limite=5):
+        """
+        Devuelve {'consulta': texto corregido, 'productos': [(id, nombre), ...]}
+        o None si no hay nada razonable que sugerir.
+        """
+        palabras = normalizar(termino).split()
+        corregidas = [c for p in palabras for c in self.corregir_palabra(p)]
+        if not corregidas or corregidas == palabras:
+            return None
+
+        conjuntos = [
+            self.productos_por_palabra[p] for p in corregidas if p in self.productos_por_palabra
+        ]
+        posiciones = set.intersection(*conjuntos) if conjuntos else set()
+        if not posiciones and conjuntos:
+            posiciones = set.union(*conjuntos)
+
+        productos = [self.nombres[p] for p in heapq.nsmallest(limite, posiciones)]
+        return {'consulta': ' '.join(corregidas), 'productos': productos}
+
+
+# ──────────────────────────────────────────────
+# 🧠 Índice del proceso (perezoso, por versión de catálogo)
+# ──────────────────────────────────────────────
+def _construir():
+    from .models import Producto
+    return IndiceSugerencias(Producto.objects.order_by().values_list('pk', 'nombre').iterator())
+
+
+_indice = IndiceEnProceso(_construir)
+
+
+def sugerir_correccion(termino, limite=5):
+    """Sugerencia para una búsqueda sin resultados (ver `IndiceSugerencias.sugerir`)."""
+    sugerencia = _indice.obtener().sugerir(termino, limite=limite)
+    if sugerencia is None:
+        return None
+    sugerencia['productos'] = [
+        {'nombre': nombre, 'url': reverse('productos:producto_detail', args=[pk])}
+        for pk, nombre in sugerencia['productos']
+    ]
+    return sugerencia
@@ -0,0 +1,84 @@
+"""
+{% imagen_responsive origen "uso" alt="..." class="..." style="..." %}
+
+Emite la foto con `srcset`/`sizes` (ver `productos/derivados.py`). `origen`
+puede ser una `ProductoCard`, un `Producto`, una `PortadaProducto` o un
+ImageField. El uso ("card", "galeria", "zoom", "miniatura", "email") define
+el atributo `sizes`. Si no hay imagen no emite nada: el placeholder queda en
+manos del template.
+
+    {% load imagenes %}
+    {% imagen_responsive producto "card" alt=producto.nombre class="card-img-top" %}
+
+`{% imagen_variante origen "email" %}` devuelve una sola URL al ancho del uso.
+"""
+from django import template
+from django.db.models.fields.files import FieldFile
+from django.utils.html import format_html, format_html_join
+
+from productos.derivados import TAMANIOS, ImagenResponsive, imagen_responsive, url_variante
+
+register = template.Library()
+
+
+def _archivo(origen):
+    """El ImageField detrás del origen, o None."""
+    if isinstance(origen, FieldFile):
+        return origen or None
+    imagen = getattr(origen, 'imagen', None)
+    if isinstance(imagen, FieldFile):  # PortadaProducto
+        return imagen or None
+    portada_principal = getattr(origen, 'portada_principal', None)  # Producto
+    if portada_principal is not None and portada_principal.imagen:
+        return portada_principal.imagen
+    portada = getattr(origen, 'portada', None)
+    return portada if isinstance(portada, FieldFile) and portada else None
+
+
+def _resolver(origen):
+    if isinstance(origen, ImagenResponsive):
+        return origen
+    imagen = getattr(origen, 'imagen', None)
+    if isinstance(imagen, ImagenResponsive):  # ProductoCard
+        return imagen
+    archivo = _archivo(origen)
+    return imagen_responsive(archivo.storage, archivo.name) if archivo else None
+
+
+@register.simple_tag(name='imagen_responsive')
+def imagen_responsive_tag(origen, uso='card', alt='', loading='lazy', **atributos):
+    imagen = _resolver(origen)
+    if imagen is None:
+        return ''
+
+    sizes = TAMANIOS.get(uso, TAMANIOS['card'])
+    extras = format_html_join('', ' {}="{}"', sorted(atributos.items()))
+
+    if imagen.fuentes:
+        # Derivados en disco: un <source> por formato. Con display:contents el
+        # <img> se comporta como hijo directo del contenedor (no rompe el CSS).
+        fuentes = format_html_join(
+            '', '<source type="{}" srcset="{}" sizes="{}">',
+            ((tipo, srcset, sizes) for tipo, srcset in imagen.fuentes),
+        )
+        return format_html(
+            '<picture style="display: contents;">{}<img src="{}" alt="{}" loading="{}" decoding="async"{}></picture>',
+            fuentes, imagen.src, alt, loading, extras,
+        )
+
+    if imagen.srcset:
+        return format_html(
+            '<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="{}" decoding="async"{}>',
+            imagen.src, imagen.srcset, sizes, alt, loading, extras,
+        )
+
+    # Sin derivados todavía (fotos viejas en disco): la original
+    return format_html('<img src="{}" alt="{}" loading="{}" decoding="async"{}>', imagen.src, alt, loading, extras)
+
+
+@register.simple_tag
+def imagen_variante(origen, uso):
+    archivo = _archivo(origen)
+    if archivo is None:
+        return getattr(origen, 'imagen_url', None) or ''
+    return url_variante(archivo.storage, archivo.name, uso) or ''
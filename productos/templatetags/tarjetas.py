@@ -0,0 +1,80 @@
+"""
+{% tarjeta_cacheada producto "variante" %} ... {% endtarjeta_cacheada %}
+
+Cachea el HTML de una tarjeta de producto por id + sello de versión del
+producto (ver `productos/fragmentos.py`). Con la página "tibia" la tarjeta no
+toca la base: ni `imagen_principal_url` ni `precio_display` se evalúan. Si la
+vista puso un `LoteTarjetas` en el contexto, se lee y escribe a través de él.
+
+Dentro del bloque no puede ir nada que dependa del usuario o del request
+({% csrf_token %}, `user.is_staff`, ...): la misma tarjeta se sirve a todos.
+"""
+import hashlib
+import os
+
+from django import template
+from django.core.cache import cache
+
+from productos.fragmentos import NOMBRE_LOTE, TIEMPO_TARJETA, clave_tarjeta
+
+register = template.Library()
+
+
+def _huella_plantilla(origen):
+    """
+    Identifica la versión del template: si se despliega un cambio en el HTML
+    de la tarjeta, las claves cambian y no se sirve el fragmento viejo.
+    """
+    nombre = getattr(origen, 'name', '') or ''
+    try:
+        modificado = os.path.getmtime(nombre)
+    except (OSError, TypeError, ValueError):
+        modificado = 0
+    return hashlib.md5(f'{nombre}:{modificado}'.encode()).hexdigest()[:8]
+
+
+class TarjetaCacheadaNode(template.Node):
+    def __init__(self, nodelist, producto, variante, huella):
+        self.nodelist = nodelist
+        self.producto = producto
+        self.variante = variante
+        self.huella = huella
+
+    def render(self, context):
+        producto = self.producto.resolve(context)
+        if producto is None or getattr(producto, 'pk', None) is None:
+            return self.nodelist.render(context)
+
+        variante = self.variante.resolve(context)
+        clave = clave_tarjeta(variante, producto, self.huella)
+        lote = context.get(NOMBRE_LOTE)
+        if lote is not None:
+            # Lectura y escritura por lotes (ver `LoteTarjetas`)
+            html = lote.obtener(clave, variante, producto, self.huella)
+            if html is None:
+                html = self.nodelist.render(context)
+                lote.guardar(clave, html)
+            return html
+
+        html = cache.get(clave)
+        if html is None:
+            html = self.nodelist.render(context)
+            cache.set(clave, html, TIEMPO_TARJETA)
+        return html
+
+
+@register.tag('tarjeta_cacheada')
+def tarjeta_cacheada(parser, token):
+    partes = token.split_contents()
+    if len(partes) != 3:
+        raise template.TemplateSyntaxError(
+            "'tarjeta_cacheada' espera dos argumentos: el producto y el nombre de la variante."
+        )
+    nodelist = parser.parse(('endtarjeta_cacheada',))
+    parser.delete_first_token()
+    return TarjetaCacheadaNode(
+        nodelist,
+        parser.compile_filter(partes[1]),
+        parser.compile_filter(partes[2]),
+        _huella_plantilla(parser.origin),
+    )
@@ -1,3 +1,335 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from categorias.models import Categoria
+
+from . import busqueda
+from .catalogo import CLAVE_VERSION, IndiceEnProceso, invalidar_catalogo
+from .importacion import Importador, leer_filas
+from .models import CampaniaDescuento, PortadaProducto, Producto
+from .reglas_precios import ReglaInvalida, aplicar_cambios, calcular_cambios, leer_reglas
+
+# El caché va en memoria: así solo se cuentan las queries a la base
+CACHES_EN_MEMORIA = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas'},
+    'compartido': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas-compartido'},
+}
+
+
+class ConsultasConstantesMixin:
+    """
+    Una página no puede hacer más queries cuantos más productos muestra: se
+    mide con N y se exige el mismo número con 2N. Antes de cada pedido se
+    vacía el caché y se invalidan los índices en memoria, así las dos
+    mediciones son en frío; un primer pedido sin medir absorbe lo que se hace
+    una sola vez (p. ej. crear la `ConfiguracionTienda`).
+    """
+
+    def en_frio(self):
+        cache.clear()
+        invalidar_catalogo()
+
+    def medir(self, pedir):
+        self.en_frio()
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = pedir()
+        self.assertLess(respuesta.status_code, 400)
+        return len(consultas)
+
+    def assertConsultasConstantes(self, pedir, agregar, n=2):
+        agregar(n)
+        pedir()
+        esperadas = self.medir(pedir)
+        agregar(n)
+        self.en_frio()
+        with self.assertNumQueries(esperadas):
+            pedir()
+
+
+def crear_productos(cantidad, categoria=None, campania=None, **campos):
+    """`cantidad` productos nuevos ($1000, 10 unidades); si hay campaña, quedan dentro de ella."""
+    campos = {'precio': Decimal('1000'), 'stock': 10, **campos}
+    inicio = Producto.objects.count()
+    productos = [
+        Producto.objects.create(nombre=f"Producto {inicio + i}", categoria=categoria, **campos)
+        for i in range(cantidad)
+    ]
+    if campania:
+        campania.productos.add(*productos)
+    return productos
+
+
+def crear_portadas(productos, cantidad=2):
+    """Portadas con solo el nombre del archivo: la URL se arma sin subir nada."""
+    for producto in productos:
+        for orden in range(cantidad):
+            PortadaProducto.objects.create(
+                producto=producto, imagen=f"productos/portadas/{producto.pk}-{orden}.jpg", orden=orden,
+            )
+
+
+def crear_campania():
+    ahora = timezone.now()
+    return CampaniaDescuento.objects.create(
+        nombre="Campaña de prueba", tipo_descuento='porcentaje', valor=Decimal('10'),
+        fecha_inicio=ahora - timedelta(days=1), fecha_fin=ahora + timedelta(days=1), activa=True,
+    )
+
+
+# ──────────────────────────────────────────────
+# 🔢 Cantidad de queries por página
+# ──────────────────────────────────────────────
+@override_settings(CACHES=CACHES_EN_MEMORIA)
+class ProductoListViewConsultasTests(ConsultasConstantesMixin, TestCase):
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre="Gatos")
+        self.campania = crear_campania()
+
+    def test_catalogo(self):
+        # Dos tandas de 2 entran en la primera página (paginate_by = 5)
+        self.assertConsultasConstantes(
+            lambda: self.client.get(reverse('productos:producto_list')),
+            lambda n: crear_productos(n, self.categoria, self.campania),
+        )
+
+
+@override_settings(CACHES=CACHES_EN_MEMORIA)
+class ProductoDetailViewConsultasTests(ConsultasConstantesMixin, TestCase):
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre="Gatos")
+        self.campania = crear_campania()
+        self.producto = crear_productos(1, self.categoria, self.campania)[0]
+
+    def agregar(self, n):
+        # Más fotos en la galería y más relacionados (entran hasta 4), todos con portadas
+        PortadaProducto.objects.bulk_create(
+            PortadaProducto(producto=self.producto, imagen=f"productos/portadas/galeria-{i}.jpg", orden=i)
+            for i in range(self.producto.portadas.count(), self.producto.portadas.count() + n)
+        )
+        crear_portadas(crear_productos(n, self.categoria, self.campania))
+
+    def test_ficha(self):
+        self.assertConsultasConstantes(
+            lambda: self.client.get(reverse('productos:producto_detail', args=[self.producto.pk])), self.agregar,
+        )
+
+
+# ──────────────────────────────────────────────
+# 🧠 Índices en memoria: sin I/O entre revisiones del sello
+# ──────────────────────────────────────────────
+@override_settings(CACHES=CACHES_EN_MEMORIA)
+class IndiceEnProcesoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.construcciones = 0
+        self.indice = IndiceEnProceso(self.construir, revisar_cada=60)
+
+    def construir(self):
+        self.construcciones += 1
+        return self.construcciones
+
+    def test_no_lee_el_sello_en_cada_pedido(self):
+        self.indice.obtener()
+        with mock.patch('productos.catalogo.cache') as compartido:
+            for _ in range(10):
+                self.indice.obtener()
+        compartido.get.assert_not_called()
+        self.assertEqual(self.construcciones, 1)
+
+    def test_invalidacion_local_se_ve_al_instante(self):
+        self.indice.obtener()
+        invalidar_catalogo()
+        self.assertEqual(self.indice.obtener(), 2)
+
+    def test_invalidacion_de_otro_worker_se_ve_al_revisar(self):
+        self.indice.obtener()
+        cache.incr(CLAVE_VERSION)  # otro proceso: no mueve la generación local
+        self.assertEqual(self.indice.obtener(), 1)
+        self.indice.revisar_cada = 0
+        self.assertEqual(self.indice.obtener(), 2)
+
+
+# ──────────────────────────────────────────────
+# 💲 Reglas de precios
+# ──────────────────────────────────────────────
+class LeerReglasTests(TestCase):
+    def test_csv(self):
+        regla_sku, regla_id, regla_nombre = leer_reglas(
+            "sku,id,nombre,campo,cambio,redondeo\n"
+            "SAC-60,,,precio,5790,\n"
+            ",12,,precio,+10%,100\n"
+            ",,Rascadór*,precio_oferta,-5%,10\n"
+        )
+        self.assertEqual((regla_sku.sku, regla_sku.operacion, regla_sku.valor), ('SAC-60', 'fijar', Decimal('5790')))
+        self.assertEqual((regla_id.id, regla_id.operacion, regla_id.redondeo), (12, 'porcentaje', Decimal('100')))
+        self.assertEqual((regla_nombre.nombre, regla_nombre.campo, regla_nombre.valor), ('rascador*', 'precio_oferta', Decimal('-5')))
+        self.assertEqual(regla_nombre.linea, 4)
+
+    def test_json(self):
+        regla, = leer_reglas('[{"nombre": "saco", "cambio": "-500"}]')
+        self.assertEqual((regla.campo, regla.operacion, regla.valor), ('precio', 'sumar', Decimal('-500')))
+
+    def test_errores(self):
+        malas = {
+            "sku,nombre,cambio\n,,100\n": "uno (y solo uno)",
+            "sku,nombre,cambio\nA,saco,100\n": "uno (y solo uno)",
+            "id,cambio\nx1,100\n": "id inválido",
+            "nombre,cambio\n*?,100\n": "solo comodines",
+            "sku,campo,cambio\nA,costo,100\n": "campo inválido",
+            "sku,cambio\nA,mucho\n": "cambio inválido",
+            "sku,cambio\nA,10%\n": "necesita signo",
+            "sku,cambio,redondeo\nA,100,0\n": "tiene que ser positivo",
+            "sku,cambio\n": "no tiene reglas",
+            '{"sku": "A"}': "lista de objetos",
+            '[{"sku": "A", ': "JSON inválido",
+        }
+        for texto, mensaje in malas.items():
+            with self.subTest(texto=texto), self.assertRaisesMessage(ReglaInvalida, mensaje):
+                leer_reglas(texto, formato='json' if texto.startswith('{') else None)
+
+    def test_la_linea_del_error(self):
+        with self.assertRaisesMessage(ReglaInvalida, "línea 3"):
+            leer_reglas("sku,cambio\nA,100\nB,\n")
+
+
+class CalcularCambiosTests(TestCase):
+    def setUp(self):
+        self.saco = Producto.objects.create(nombre="Saco Rascador", sku='SAC-60', precio=Decimal('1000'), stock=1)
+        self.gatito = Producto.objects.create(nombre="Rascador Gatito", precio=Decimal('1000'), stock=1)
+        self.grande = Producto.objects.create(nombre="Rascador Grande", precio=Decimal('1234'), stock=1)
+        self.oferta = Producto.objects.create(
+            nombre="Cama Ofertón", precio=Decimal('1000'), precio_oferta=Decimal('800'), en_oferta=True, stock=1,
+        )
+
+    def cambios_por_producto(self, texto):
+        cambios, sin_coincidencias = calcular_cambios(leer_reglas(texto))
+        return {(c.producto.pk, c.campo): c for c in cambios}, sin_coincidencias
+
+    def test_patron_y_reglas_encadenadas(self):
+        cambios, sin_coincidencias = self.cambios_por_producto(
+            "nombre,cambio,redondeo\n"
+            "rascador*,+5%,100\n"        # el patrón es sobre el nombre entero: no toca el saco
+            "rascador gr*,-50,\n"        # se aplica sobre el resultado de la anterior
+            "inexistente,+1,\n"
+        )
+        self.assertNotIn((self.saco.pk, 'precio'), cambios)
+        self.assertEqual(cambios[(self.gatito.pk, 'precio')].despues, Decimal('1100.00'))   # 1050 → 1100
+        grande = cambios[(self.grande.pk, 'precio')]
+        self.assertEqual(grande.despues, Decimal('1250.00'))   # 1295.70 → 1300 → 1250
+        self.assertEqual([r.linea for r in grande.reglas], [2, 3])
+        self.assertEqual([r.nombre for r in sin_coincidencias], ['inexistente'])
+
+    def test_nombre_sin_patron_es_parte_del_nombre(self):
+        cambios, _ = self.cambios_por_producto("nombre,cambio\nrascador,=999\n")
+        self.assertEqual(
+            {pk for pk, _ in cambios}, {self.saco.pk, self.gatito.pk, self.grande.pk},
+        )
+
+    def test_redondeo_al_multiplo_mas_cercano(self):
+        cambios, _ = self.cambios_por_producto("sku,cambio,redondeo\nSAC-60,+250,100\n")
+        self.assertEqual(cambios[(self.saco.pk, 'precio')].despues, Decimal('1300.00'))  # 1250: para arriba
+
+    def test_oferta_igual_o_mayor_al_precio_es_error(self):
+        cambios, _ = self.cambios_por_producto(
+            f"id,campo,cambio\n{self.oferta.pk},precio,=800\n{self.gatito.pk},precio_oferta,=900\n"
+        )
+        self.assertIn("tiene que ser menor", cambios[(self.oferta.pk, 'precio')].error)
+        # Sin precio de oferta previo, fijarlo por debajo del precio es válido
+        self.assertEqual(cambios[(self.gatito.pk, 'precio_oferta')].error, '')
+
+    def test_aplicar_salta_los_errores_y_recalcula_el_precio_efectivo(self):
+        cambios, _ = calcular_cambios(leer_reglas(
+            f"id,campo,cambio\n{self.gatito.pk},precio,+10%\n"
+            f"{self.oferta.pk},precio_oferta,-10%\n"
+            f"{self.grande.pk},precio_oferta,=1500\n"
+        ))
+        self.assertEqual(aplicar_cambios(cambios), 2)
+
+        self.gatito.refresh_from_db()
+        self.assertEqual((self.gatito.precio, self.gatito.precio_efectivo), (Decimal('1100.00'), Decimal('1100.00')))
+        self.oferta.refresh_from_db()
+        self.assertEqual((self.oferta.precio_oferta, self.oferta.precio_efectivo), (Decimal('720.00'), Decimal('720.00')))
+        self.grande.refresh_from_db()
+        self.assertIsNone(self.grande.precio_oferta)
+        self.assertEqual(self.grande.precio_efectivo, Decimal('1234.00'))
+
+
+# ──────────────────────────────────────────────
+# 📥 Importación del feed del proveedor
+# ──────────────────────────────────────────────
+FEED_CSV = """sku,nombre,precio,stock,categoria,descripcion
+A-1,Rascador Deluxe,1200,,,
+B-2,CAMA GRANDE ÑANDU,800,3,Camas,Cama mullida
+C-3,Túnel Plegable,500,4,Perros,
+D-4,Sin Precio,,1,,
+,Sin SKU,100,1,,
+"""
+
+
+class ImportacionTests(TestCase):
+    def setUp(self):
+        self.gatos = Categoria.objects.create(nombre="Gatos")
+        self.existente = Producto.objects.create(
+            sku='A-1', nombre="Rascador", precio=Decimal('1000'), stock=7,
+            categoria=self.gatos, descripcion="La de siempre",
+        )
+        self.manual = Producto.objects.create(nombre="Cama Grande Ñandú", precio=Decimal('700'), stock=1)
+        crear_campania().productos.add(self.existente)
+
+    def importar(self, contenido, sufijo='.csv'):
+        with tempfile.NamedTemporaryFile('w', suffix=sufijo, delete=False, encoding='utf-8') as f:
+            f.write(contenido)
+        self.addCleanup(os.remove, f.name)
+        return Importador(batch_size=2, con_imagenes=False).importar(leer_filas(f.name))
+
+    def buscar(self, termino):
+        return set(busqueda.buscar(Producto.objects.all(), termino).values_list('sku', flat=True))
+
+    def test_crea_actualiza_y_adopta(self):
+        resultado = self.importar(FEED_CSV)
+        self.assertEqual((resultado.filas, resultado.creados, resultado.actualizados, resultado.adoptados), (5, 1, 2, 1))
+        self.assertEqual(resultado.errores, 2)  # sin precio siendo nuevo, y sin SKU
+        self.assertFalse(Producto.objects.filter(nombre__in=["Sin Precio", "Sin SKU"]).exists())
+
+        # Actualizado: las celdas vacías no pisan stock, categoría ni descripción
+        self.existente.refresh_from_db()
+        self.assertEqual(self.existente.nombre, "Rascador Deluxe")
+        self.assertEqual(self.existente.nombre_normalizado, "rascador deluxe")
+        self.assertEqual((self.existente.stock, self.existente.categoria_id), (7, self.gatos.pk))
+        self.assertEqual(self.existente.descripcion, "La de siempre")
+        # Precio nuevo con la campaña del 10% recalculada
+        self.assertEqual(self.existente.precio, Decimal('1200'))
+        self.assertEqual(self.existente.precio_efectivo, Decimal('1080.00'))
+
+        # Adoptado por nombre normalizado: el mismo registro, ahora con SKU
+        self.manual.refresh_from_db()
+        self.assertEqual((self.manual.sku, self.manual.precio, self.manual.stock), ('B-2', Decimal('800'), 3))
+        self.assertEqual(self.manual.categoria.nombre, "Camas")
+        self.assertEqual(Producto.objects.filter(nombre_normalizado="cama grande nandu").count(), 1)
+
+        nuevo = Producto.objects.get(sku='C-3')
+        self.assertEqual((nuevo.nombre_normalizado, nuevo.precio_efectivo), ("tunel plegable", Decimal('500')))
+        self.assertEqual(nuevo.categoria.nombre, "Perros")
+
+        # Índice de búsqueda al día para los tres
+        self.assertEqual(self.buscar("deluxe"), {'A-1'})
+        self.assertEqual(self.buscar("tunel"), {'C-3'})
+        self.assertEqual(self.buscar("mullida"), {'B-2'})
+
+    def test_jsonl_solo_con_algunas_columnas(self):
+        resultado = self.importar('{"sku": "A-1", "precio": "1100"}\n{"sku": "A-1", "nombre": ""\n', sufijo='.jsonl')
+        self.assertEqual((resultado.actualizados, resultado.errores), (1, 1))  # la segunda línea es JSON roto
+        self.existente.refresh_from_db()
+        self.assertEqual((self.existente.nombre, self.existente.precio), ("Rascador", Decimal('1100')))
+        self.assertEqual(self.existente.precio_efectivo, Decimal('990.00'))
+        self.assertEqual(self.buscar("rascador"), {'A-1'})
@@ -5,6 +5,7 @@ app_name = "productos"
 
 urlpatterns = [
     path("", views.ProductoListView.as_view(), name="producto_list"),
+    path("autocompletar/", views.autocompletar, name="autocompletar"),
     path("crear/", views.ProductoCreateView.as_view(), name="producto_create"),
     path("editar/<int:pk>/", views.ProductoUpdateView.as_view(), name="producto_update"),
     path("borrar/<int:pk>/", views.ProductoDeleteView.as_view(), name="producto_delete"),
@@ -14,4 +15,5 @@ urlpatterns = [
     # ── Gestión granular de portadas (AJAX, solo staff) ──────────────────
     path("portada/<int:portada_id>/eliminar/", views.eliminar_portada, name="eliminar_portada"),
     path("<int:producto_id>/reordenar-portadas/", views.reordenar_portadas, name="reordenar_portadas"),
+    path("<int:producto_id>/portadas-estado/", views.portadas_estado, name="portadas_estado"),
 ]
@@ -4,63 +4,114 @@ from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMix
 from django.contrib import messages
 from categorias.models import Categoria
 from .models import Producto, PortadaProducto
+from .precios import precargar_precios, refrescar_precios_vencidos
+from . import busqueda
+from .fragmentos import NOMBRE_LOTE, LoteTarjetas, LoteTarjetasMixin, invalidar_tarjetas, precargar_versiones
+from .lectura import cards_de, con_datos_card, descontar_reservas
+from .facetas import calcular_facetas, leer_filtros, q_en_oferta
+from biblioteca_plus.paginacion import KeysetPaginationMixin
+from ventas.reservas import disponible
+from .autocompletar import sugerir
+from .sugerencias import sugerir_correccion
+from .subidas import encolar_portadas, estado_subidas, limpiar_errores
 from .forms import ProductoForm, ProductoPortadaForm, PortadasMultiplesForm
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.http import require_POST
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_POST, require_GET
+from django.utils.cache import patch_cache_control
 from django.contrib.admin.views.decorators import staff_member_required
 from django.db.models import ProtectedError
 import traceback
 
 
-class ProductoListView(ListView):
+class ProductoListView(LoteTarjetasMixin, KeysetPaginationMixin, ListView):
     model = Producto
     template_name = 'productos/producto_list.html'
     context_object_name = 'productos'
     paginate_by = 5
+    conteo_keyset = 'estimado'
+
+    def get_orden_keyset(self):
+        # Orden estable (termina en id) para paginar por cursor en vez de OFFSET
+        sort = self.request.GET.get('sort')
+        if sort == 'precio_asc':
+            return ('precio_efectivo', 'id')
+        if sort == 'precio_desc':
+            return ('-precio_efectivo', '-id')
+        if sort == 'nuevos':
+            return ('-id',)
+        if self.request.GET.get('search'):
+            return None  # Orden por relevancia: paginación clásica
+        return ('nombre', 'id')
 
     def get_queryset(self):
-        queryset = Producto.objects.select_related('categoria').prefetch_related('portadas')
+        # Campañas/ofertas que arrancaron o vencieron desde el último cálculo
+        refrescar_precios_vencidos()
+        # Solo lo que usa la tarjeta, con la imagen principal como subquery (sin prefetch)
+        queryset = con_datos_card(Producto.objects.all())
 
-        categoria_id = self.request.GET.get('categoria')
+        # Mismos filtros normalizados que usan las facetas del lateral
+        filtros = self.filtros = leer_filtros(self.request.GET)
         search = self.request.GET.get('search')
-        min_precio = self.request.GET.get('min_precio')
-        max_precio = self.request.GET.get('max_precio')
-        stock_min = self.request.GET.get('stock_min')
 
-        if categoria_id:
-            queryset = queryset.filter(categoria_id=categoria_id)
+        if filtros['categoria'] is not None:
+            queryset = queryset.filter(categoria_id=filtros['categoria'])
         if search:
-            queryset = queryset.filter(nombre__icontains=search)
-        if min_precio:
-            queryset = queryset.filter(precio__gte=min_precio)
-        if max_precio:
-            queryset = queryset.filter(precio__lte=max_precio)
-        if stock_min:
-            queryset = queryset.filter(stock__gte=stock_min)
+            # Texto completo sobre nombre, categoría, kit y descripción (anota `relevancia`)
+            queryset = busqueda.buscar(queryset, search)
+        # Filtro y orden sobre el precio que ve el cliente (columna indexada)
+        if filtros['min_precio'] is not None:
+            queryset = queryset.filter(precio_efectivo__gte=filtros['min_precio'])
+        if filtros['max_precio'] is not None:
+            queryset = queryset.filter(precio_efectivo__lte=filtros['max_precio'])
+        if filtros['stock_min'] is not None:
+            queryset = queryset.filter(stock__gte=filtros['stock_min'])
+        if filtros['oferta']:
+            queryset = queryset.filter(q_en_oferta())
+        if filtros['combo']:
+            queryset = queryset.filter(es_combo=True)
 
         sort = self.request.GET.get('sort')
         if sort == 'precio_asc':
-            queryset = queryset.order_by('precio')
+            queryset = queryset.order_by('precio_efectivo', 'id')
         elif sort == 'precio_desc':
-            queryset = queryset.order_by('-precio')
+            queryset = queryset.order_by('-precio_efectivo', '-id')
         elif sort == 'nuevos':
             queryset = queryset.order_by('-id')
+        elif search and 'relevancia' in queryset.query.annotations:
+            queryset = queryset.order_by('-relevancia', 'nombre')
 
         return queryset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categorias'] = Categoria.objects.all()
+        # Tarjetas livianas (precio efectivo e imagen ya resueltos en la misma query),
+        # sin lo reservado por carritos y con los sellos de su caché de fragmentos
+        context['productos'] = precargar_versiones(descontar_reservas(cards_de(context['productos'])))
+        context[NOMBRE_LOTE] = LoteTarjetas(context['productos'])
+        # Contadores del lateral: 1 query agregada (cacheada por filtros + versión del catálogo)
+        facetas = calcular_facetas(self.filtros)
+        categorias = list(Categoria.objects.all())
+        for cat in categorias:
+            cat.cantidad = facetas['categorias'].get(cat.id, 0)
+        context['categorias'] = categorias
+        context['facetas'] = facetas
         context['categoria_id'] = self.request.GET.get('categoria', '')
         context['search'] = self.request.GET.get('search', '')
         context['min_precio'] = self.request.GET.get('min_precio', '')
         context['max_precio'] = self.request.GET.get('max_precio', '')
         context['stock_min'] = self.request.GET.get('stock_min', '')
         context['sort'] = self.request.GET.get('sort', '')
+        context['oferta'] = self.request.GET.get('oferta', '')
+        context['combo'] = self.request.GET.get('combo', '')
+
+        # Búsqueda sin resultados: "¿Quisiste decir...?" desde el índice de trigramas en memoria
+        if context['search'] and not context['productos'] and not context['page_obj'].has_previous():
+            context['sugerencia'] = sugerir_correccion(context['search'])
         return context
 
 
-class ProductoDetailView(DetailView):
+class ProductoDetailView(LoteTarjetasMixin, DetailView):
     model = Producto
     template_name = 'productos/producto_detail.html'
     context_object_name = 'producto'
@@ -77,16 +128,21 @@ class ProductoDetailView(DetailView):
         producto = self.object  # ya viene con portadas prefetch
 
         if producto.categoria:
-            relacionados_qs = (
-                Producto.objects.filter(categoria=producto.categoria)
-                .exclude(id=producto.id)
-                .select_related('categoria')
-                .prefetch_related('portadas')
-                .order_by('-id')[:4]
+            relacionados = cards_de(
+                con_datos_card(
+                    Producto.objects.filter(categoria=producto.categoria).exclude(id=producto.id)
+                ).order_by('-id')[:4]
             )
-            context['relacionados'] = relacionados_qs
         else:
-            context['relacionados'] = []
+            relacionados = []
+        context['relacionados'] = precargar_versiones(descontar_reservas(relacionados))
+        context[NOMBRE_LOTE] = LoteTarjetas(context['relacionados'])
+
+        # Precio final del producto con su campaña resuelta en una sola query
+        precargar_precios([producto])
+
+        # Stock menos lo apartado por otros carritos: un aggregate, sin bloquear la fila
+        context['disponible'] = disponible(producto, self.request.user if self.request.user.is_authenticated else None)
 
         context['portadas'] = producto.portadas.all()
         context['portadas_count'] = len(list(producto.portadas.all()))  # list() usa el prefetch cache
@@ -107,9 +163,11 @@ class ProductoCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView
 
     def form_valid(self, form):
         self.object = form.save()
-        files = self.request.FILES.getlist("portadas")
-        for f in files[:5]:
-            PortadaProducto.objects.create(producto=self.object, imagen=f)
+        # Las fotos se suben en segundo plano (ver subidas.py): la respuesta no espera a Cloudinary
+        encoladas = encolar_portadas(self.object, self.request.FILES.getlist("portadas"))
+        if encoladas:
+            messages.success(self.request, f"✅ Producto creado. Subiendo {encoladas} foto(s): van a aparecer en la galería en unos segundos.")
+            return redirect("productos:producto_update", pk=self.object.pk)
         messages.success(self.request, "✅ Producto creado correctamente con portadas.")
         return super().form_valid(form)
 
@@ -124,19 +182,24 @@ class ProductoUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['portadas_form'] = PortadasMultiplesForm(self.request.POST or None, self.request.FILES or None)
+        context['subidas'] = estado_subidas(self.object.pk)
         return context
 
+    def get(self, request, *args, **kwargs):
+        # Fotos que fallaron en segundo plano después de que el admin se fue de la página
+        errores = estado_subidas(kwargs['pk'])['errores']
+        if errores:
+            limpiar_errores(kwargs['pk'])
+            messages.error(request, "❌ No se pudieron subir: " + ", ".join(errores) + ". Volvé a cargarlas.")
+        return super().get(request, *args, **kwargs)
+
     def form_valid(self, form):
         self.object = form.save()
-        files = self.request.FILES.getlist("portadas")
-
-        if files:
-            # Calcular cuántos lugares quedan para no superar las 5 portadas
-            current_count = self.object.portadas.count()
-            slots_left = max(0, 5 - current_count)
-            
-            for f in files[:slots_left]:
-                PortadaProducto.objects.create(producto=self.object, imagen=f)
+        # Hasta completar 5 portadas, contando las que todavía se están subiendo
+        encoladas = encolar_portadas(self.object, self.request.FILES.getlist("portadas"))
+        if encoladas:
+            messages.info(self.request, f"✨ Producto actualizado. Subiendo {encoladas} foto(s) en segundo plano.")
+            return redirect("productos:producto_update", pk=self.object.pk)
 
         messages.info(self.request, "✨ Producto actualizado correctamente.")
         return super().form_valid(form)
@@ -158,6 +221,19 @@ class ProductoDeleteView(LoginRequiredMixin, PermissionRequiredMixin, DeleteView
             return redirect('productos:producto_list')
 
 
+@require_GET
+def autocompletar(request):
+    """
+    Sugerencias para el buscador (JSON). Sale del índice en memoria del
+    proceso, sin queries, así se puede llamar en cada tecla.
+    """
+    termino = request.GET.get('q', '').strip()
+    resultados = sugerir(termino) if len(termino) >= 2 else []
+    response = JsonResponse({'resultados': resultados})
+    patch_cache_control(response, public=True, max_age=60)
+    return response
+
+
 def subir_portada(request, producto_id):
     producto = get_object_or_404(Producto, id=producto_id)
     if request.method == "POST":
@@ -232,6 +308,9 @@ def reordenar_portadas(request, producto_id):
                 # Usar update para no emitir señales innecesarias, o save() si es necesario
                 # Para ser seguros, verificamos que la portada pertenezca al producto
                 PortadaProducto.objects.filter(id=p_id, producto=producto).update(orden=index)
+
+            # update() no emite señales: la portada principal de la tarjeta pudo cambiar
+            invalidar_tarjetas([producto.pk])
                 
             # Las portadas que no se enviaron quedarán con su orden actual,
             # pero típicamente el frontend envía todas.
@@ -241,3 +320,31 @@ def reordenar_portadas(request, producto_id):
         return JsonResponse({'ok': False, 'error': 'Payload inválido.'}, status=400)
     except Exception as e:
         return JsonResponse({'ok': False, 'error': str(e)}, status=500)
+
+
+@staff_member_required
+@require_GET
+def portadas_estado(request, producto_id):
+    '''
+    Estado de las portadas que se suben en segundo plano (ver subidas.py).
+    Devuelve cuántas faltan, cuáles fallaron y la tarjeta de cada portada ya
+    subida, para que la galería del formulario las vaya sumando sin recargar.
+    '''
+    producto = get_object_or_404(Producto, id=producto_id)
+    estado = estado_subidas(producto.pk)
+    if estado['errores']:
+        limpiar_errores(producto.pk)  # se avisan una sola vez
+
+    tarjetas = [
+        {
+            'id': portada.id,
+            'html': render_to_string('productos/_portada_card.html', {'portada': portada, 'principal': i == 0}),
+        }
+        for i, portada in enumerate(producto.portadas.all())
+    ]
+    return JsonResponse({
+        'ok': True,
+        'pendientes': estado['pendientes'],
+        'errores': estado['errores'],
+        'portadas': tarjetas,
+    })
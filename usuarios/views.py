@@ -38,8 +38,8 @@ def mi_cuenta(request):
         user_form = UserForm(instance=usuario)
         perfil_form = PerfilForm(instance=perfil)
 
-    # Obtenemos los pedidos del usuario
-    pedidos = Pedido.objects.filter(usuario=usuario).order_by('-fecha_pedido')
+    # Obtenemos los pedidos del usuario con sus renglones: sin una query por pedido
+    pedidos = Pedido.objects.filter(usuario=usuario).prefetch_related('detalles__producto').order_by('-fecha_pedido')
 
     context = {
         'user_form': user_form,
@@ -1,7 +1,8 @@
 from django.contrib import admin
+from biblioteca_plus.admin import BusquedaNormalizadaAdmin
 from .models import (
     Pedido, DetallePedido, Carrito, ItemCarrito,
-    HistorialPedido, PedidoLog, ConfiguracionTienda,
+    HistorialPedido, PedidoLog, ConfiguracionTienda, ReservaStock,
 )
 
 
@@ -51,7 +52,7 @@ class DetallePedidoInline(admin.TabularInline):
 
 # 2. Registramos el Pedido (La cabecera)
 @admin.register(Pedido)
-class PedidoAdmin(admin.ModelAdmin):
+class PedidoAdmin(BusquedaNormalizadaAdmin):
     # Quitamos 'producto', 'cantidad' y 'precio_unitario' porque ahora están en el Inline
     list_display = (
         "id",
@@ -65,7 +66,7 @@ class PedidoAdmin(admin.ModelAdmin):
         "fecha_entrega",
     )
     list_filter = ("estado", "metodo_pago", "fecha_pedido", "fecha_entrega")
-    search_fields = ("usuario__username", "metodo_pago") 
+    search_fields = ("usuario__username", "metodo_pago", "nombre_envio_normalizado__startswith", "email_envio_normalizado__startswith")
     autocomplete_fields = ["usuario"]
     readonly_fields = ("cupon_aplicado", "descuento_aplicado")
     
@@ -79,9 +80,16 @@ class CarritoAdmin(admin.ModelAdmin):
     search_fields = ("usuario__username",)
 
 @admin.register(ItemCarrito)
-class ItemCarritoAdmin(admin.ModelAdmin):
+class ItemCarritoAdmin(BusquedaNormalizadaAdmin):
     list_display = ("id", "carrito", "producto", "cantidad", "subtotal")
-    search_fields = ("producto__nombre", "carrito__usuario__username")
+    search_fields = ("producto__nombre_normalizado__startswith", "carrito__usuario__username")
+
+@admin.register(ReservaStock)
+class ReservaStockAdmin(BusquedaNormalizadaAdmin):
+    list_display = ("id", "usuario", "producto", "cantidad", "vence")
+    list_filter = ("vence",)
+    search_fields = ("producto__nombre_normalizado__startswith", "usuario__username")
+    list_select_related = ("usuario", "producto")
 
 @admin.register(HistorialPedido)
 class HistorialPedidoAdmin(admin.ModelAdmin):
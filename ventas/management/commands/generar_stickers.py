@@ -0,0 +1,122 @@
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ventas import stickers
+from ventas.models import Pedido
+
+LOGO_TIENDA = os.path.join(settings.BASE_DIR, 'static', 'img', 'logo_tienda.png')
+
+
+class Command(BaseCommand):
+    help = (
+        'Arma hojas A4 de stickers circulares con logos y/o etiquetas de envío de los pedidos de un día. '
+        'Las hojas se dibujan en paralelo y se guardan como un PDF de varias páginas o una carpeta de PNG.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('destino', help='Archivo .pdf, o carpeta donde guardar hoja-01.png, hoja-02.png, ...')
+        parser.add_argument('--logo', action='append', default=[], help='Imagen para stickers (se puede repetir).')
+        parser.add_argument(
+            '--tamanios', default='120,100,100,70,70',
+            help='Diámetros en mm del juego de stickers de cada logo (por defecto, el de la hoja clásica).',
+        )
+        parser.add_argument('--copias', type=int, default=1, help='Juegos de stickers por logo.')
+        parser.add_argument(
+            '--pedidos', nargs='?', const='hoy', metavar='AAAA-MM-DD',
+            help='Agregar una etiqueta de envío por pedido de ese día (por defecto hoy).',
+        )
+        parser.add_argument('--estado', default='pagado', help='Estado de los pedidos a etiquetar.')
+        parser.add_argument('--etiqueta', default='100x55', help='Tamaño de la etiqueta de envío en mm (ANCHOxALTO).')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Procesos en paralelo (1 = sin pool).')
+
+    # ──────────────────────────────────────────────
+    # 🧾 Piezas
+    # ──────────────────────────────────────────────
+    def _stickers(self, options):
+        try:
+            diametros = [float(d) for d in options['tamanios'].split(',') if d.strip()]
+        except ValueError:
+            raise CommandError("--tamanios debe ser una lista de números separados por coma")
+        for logo in options['logo']:
+            if not os.path.isfile(logo):
+                raise CommandError(f"No existe el logo {logo}")
+        return [
+            stickers.sticker(logo, d)
+            for logo in options['logo']
+            for _ in range(options['copias'])
+            for d in diametros
+        ]
+
+    def _lineas(self, pedido):
+        calle = ' '.join(filter(None, [pedido.direccion_envio, pedido.numero_envio]))
+        depto = ' '.join(filter(None, [
+            f"Piso {pedido.piso_envio}" if pedido.piso_envio else '',
+            f"Depto {pedido.depto_envio}" if pedido.depto_envio else '',
+        ]))
+        localidad = ' '.join(filter(None, [pedido.codigo_postal_envio, pedido.ciudad_envio]))
+        return [
+            linea for linea in (
+                f"Pedido #{pedido.id}",
+                pedido.nombre_envio or '',
+                ', '.join(filter(None, [calle, depto])),
+                ', '.join(filter(None, [localidad, pedido.provincia_envio])),
+                f"Tel. {pedido.telefono_envio}" if pedido.telefono_envio else '',
+                pedido.metodo_envio or '',
+            ) if linea
+        ]
+
+    def _etiquetas(self, options):
+        if options['pedidos'] is None:
+            return []
+        try:
+            dia = timezone.localdate() if options['pedidos'] == 'hoy' else date.fromisoformat(options['pedidos'])
+            ancho, alto = (float(v) for v in options['etiqueta'].lower().split('x'))
+        except ValueError as e:
+            raise CommandError(f"Fecha o tamaño de etiqueta inválido: {e}")
+
+        logo = options['logo'][0] if options['logo'] else LOGO_TIENDA
+        pedidos = Pedido.objects.filter(fecha_pedido__date=dia, estado=options['estado']).order_by('id')
+        return [stickers.etiqueta(self._lineas(p), ancho, alto, logo=logo) for p in pedidos]
+
+    # ──────────────────────────────────────────────
+    # 🖨️ Hojas
+    # ──────────────────────────────────────────────
+    def _renderizar(self, hojas, rutas, workers):
+        if workers <= 1 or len(hojas) <= 1:
+            return [stickers.renderizar_hoja(h, r) for h, r in zip(hojas, rutas)]
+        workers = min(workers, len(hojas))
+        # Hojas consecutivas al mismo proceso: comparten los logos ya escalados
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(stickers.renderizar_hoja, hojas, rutas, chunksize=math.ceil(len(hojas) / workers)))
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        piezas = self._stickers(options) + self._etiquetas(options)
+        if not piezas:
+            raise CommandError("Nada para imprimir: pasá --logo y/o --pedidos (o no hay pedidos ese día).")
+        try:
+            hojas = stickers.armar_hojas(piezas)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        destino = options['destino']
+        if destino.lower().endswith('.pdf'):
+            with tempfile.TemporaryDirectory() as carpeta:
+                rutas = [os.path.join(carpeta, f'hoja-{i:02d}.jpg') for i in range(1, len(hojas) + 1)]
+                stickers.unir_pdf(self._renderizar(hojas, rutas, options['workers']), destino)
+        else:
+            os.makedirs(destino, exist_ok=True)
+            rutas = [os.path.join(destino, f'hoja-{i:02d}.png') for i in range(1, len(hojas) + 1)]
+            self._renderizar(hojas, rutas, options['workers'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(piezas)} piezas en {len(hojas)} hojas → {destino} ({time.monotonic() - inicio:.1f}s)."
+        ))
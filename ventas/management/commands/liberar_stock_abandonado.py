@@ -2,14 +2,17 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
 from ventas.models import Pedido
-from productos.models import Producto
+from ventas import reservas, stock
 from ventas.views.helpers import registrar_historial, registrar_log
 import logging
 
 logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
-    help = 'Cancela pedidos de Mercado Pago que llevan más de 24hs pendientes y libera su stock.'
+    help = (
+        'Cancela pedidos de Mercado Pago que llevan más de 24hs pendientes y libera su stock. '
+        'También borra las reservas de carrito vencidas.'
+    )
 
     def handle(self, *args, **options):
         # Límite de tiempo: 24 horas hacia atrás
@@ -31,12 +34,11 @@ class Command(BaseCommand):
                 pedido.estado = 'cancelado'
                 pedido.save()
 
-                # Devolver el stock de cada detalle
-                for detalle in pedido.detalles.all():
-                    producto = detalle.producto
-                    producto.stock += detalle.cantidad
-                    producto.save()
-                    self.stdout.write(f"Stock recuperado: +{detalle.cantidad} de '{producto.nombre}'")
+                # Devolver el stock de todos los detalles en un solo UPDATE
+                detalles = list(pedido.detalles.select_related('producto'))
+                stock.reponer((d.producto_id, d.cantidad) for d in detalles)
+                for detalle in detalles:
+                    self.stdout.write(f"Stock recuperado: +{detalle.cantidad} de '{detalle.producto.nombre}'")
                     
                 # Devolver uso del cupón si lo hubiera
                 if pedido.cupon_aplicado:
@@ -55,4 +57,9 @@ class Command(BaseCommand):
                 logger.error(f"Error liberando stock del pedido {pedido.id}: {e}")
                 self.stdout.write(self.style.ERROR(f"Error en pedido #{pedido.id}: {e}"))
 
-        self.stdout.write(self.style.SUCCESS(f"✅ Proceso finalizado. {cantidad_cancelados} pedidos cancelados."))
+        # Reservas de carrito vencidas: ya no cuentan, se borran en un solo DELETE
+        vencidas = reservas.barrer_vencidas()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Proceso finalizado. {cantidad_cancelados} pedidos cancelados, {vencidas} reservas vencidas borradas."
+        ))
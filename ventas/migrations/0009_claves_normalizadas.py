@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:09
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalizar(texto):
+    """Copia de `biblioteca_plus.normalizacion.normalizar` al crear esta migración:
+    las claves tienen que salir iguales aunque esa función cambie después."""
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+def completar_claves(apps, schema_editor):
+    Pedido = apps.get_model('ventas', 'Pedido')
+    lote = []
+    for obj in Pedido.objects.only('pk', 'nombre_envio', 'email_envio').iterator(chunk_size=1000):
+        obj.nombre_envio_normalizado = normalizar(obj.nombre_envio)
+        obj.email_envio_normalizado = normalizar(obj.email_envio)
+        lote.append(obj)
+        if len(lote) >= 1000:
+            Pedido.objects.bulk_update(lote, ['nombre_envio_normalizado', 'email_envio_normalizado'])
+            lote = []
+    if lote:
+        Pedido.objects.bulk_update(lote, ['nombre_envio_normalizado', 'email_envio_normalizado'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0008_pedido_cupon_aplicado_pedido_descuento_aplicado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='email_envio_normalizado',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='nombre_envio_normalizado',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=120),
+        ),
+        migrations.RunPython(completar_claves, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0013_indices_paginacion_keyset'),
+        ('ventas', '0009_claves_normalizadas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='historialpedido',
+            index=models.Index(fields=['pedido', 'fecha_cambio', 'id'], name='idx_historial_pedido_fecha'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['fecha_pedido', 'id'], name='idx_pedido_fecha_id'),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.db import models
 # pyrefly: ignore [missing-import]
 from django.conf import settings
 from productos.models import Producto
+from biblioteca_plus.normalizacion import normalizar
 
 
 # ────────────────────────────────────────────
@@ -97,6 +98,9 @@ class Pedido(models.Model):
     # ----- DATOS DE ENVÍO -----
     nombre_envio = models.CharField("Nombre completo", max_length=120, blank=True, null=True)
     email_envio = models.EmailField("Email de contacto", blank=True, null=True)
+    # Claves de búsqueda del panel (minúsculas, sin tildes)
+    nombre_envio_normalizado = models.CharField(max_length=120, blank=True, editable=False, db_index=True)
+    email_envio_normalizado = models.CharField(max_length=254, blank=True, editable=False, db_index=True)
     telefono_envio = models.CharField("Teléfono / WhatsApp", max_length=30, blank=True, null=True)
     direccion_envio = models.CharField("Calle", max_length=255, blank=True, null=True)
     numero_envio = models.CharField("Número", max_length=20, blank=True, null=True)
@@ -114,10 +118,40 @@ class Pedido(models.Model):
 
     class Meta:
         ordering = ["-fecha_pedido"]
+        indexes = [
+            # Paginación por cursor del panel y de "mis pedidos"
+            models.Index(fields=['fecha_pedido', 'id'], name='idx_pedido_fecha_id'),
+        ]
 
     def __str__(self):
         return f"Pedido #{self.id} - {self.get_estado_display()}"
 
+    def save(self, *args, **kwargs):
+        self.nombre_envio_normalizado = normalizar(self.nombre_envio)
+        self.email_envio_normalizado = normalizar(self.email_envio)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # save(update_fields=[...]) también tiene que guardar las claves derivadas
+            extra = {
+                clave for campo, clave in (('nombre_envio', 'nombre_envio_normalizado'),
+                                           ('email_envio', 'email_envio_normalizado'))
+                if campo in update_fields
+            }
+            if extra:
+                kwargs['update_fields'] = {*update_fields, *extra}
+        super().save(*args, **kwargs)
+
+    @property
+    def primer_detalle(self):
+        """
+        Primer ítem del pedido. `detalles.first()` ordena por pk y vuelve a la
+        base aunque la vista haya hecho prefetch; esto usa el prefetch si existe.
+        """
+        if 'detalles' in getattr(self, '_prefetched_objects_cache', {}):
+            detalles = sorted(self.detalles.all(), key=lambda d: d.pk)
+            return detalles[0] if detalles else None
+        return self.detalles.order_by('pk').first()
+
 
 # -------------------------------
 # 📋 2. El Detalle: DetallePedido
@@ -162,6 +196,9 @@ class HistorialPedido(models.Model):
 
     class Meta:
         ordering = ["-fecha_cambio"]
+        indexes = [
+            models.Index(fields=['pedido', 'fecha_cambio', 'id'], name='idx_historial_pedido_fecha'),
+        ]
 
 class PedidoLog(models.Model):
     pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name='logs')
@@ -183,6 +220,26 @@ class Carrito(models.Model):
     def total(self):
         return sum(item.subtotal for item in self.items.all())
 
+    def precargar_items(self):
+        """
+        Trae los items con su producto (1 query) y sus portadas (1 query) y
+        resuelve el precio final de todos en lote (1 query). Después de
+        llamarlo, `self.items.all()`, `total`, `imagen_principal_url` y el
+        template leen del caché de prefetch sin volver a la base.
+        """
+        from django.db.models import Prefetch, prefetch_related_objects
+        from productos.precios import precargar_precios
+
+        prefetch_related_objects(
+            [self],
+            Prefetch(
+                'items',
+                queryset=ItemCarrito.objects.select_related('producto__categoria').prefetch_related('producto__portadas'),
+            ),
+        )
+        precargar_precios(item.producto for item in self.items.all())
+        return self
+
 class ItemCarrito(models.Model):
     carrito = models.ForeignKey(Carrito, related_name="items", on_delete=models.CASCADE)
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
@@ -194,4 +251,34 @@ class ItemCarrito(models.Model):
         # Usa precio_display para respetar los descuentos activos.
         if self.cantidad is not None and self.producto and self.producto.precio_display is not None:
             return self.cantidad * self.producto.precio_display
-        return 0
\ No newline at end of file
+        return 0
+
+
+# -------------------------------
+# ⏳ 5. Reservas de stock del carrito
+# -------------------------------
+class ReservaStock(models.Model):
+    """
+    Unidades que un carrito tiene apartadas mientras corre su temporizador.
+    Stock disponible = stock - reservas vigentes (ver ventas/reservas.py).
+    """
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='reservas_stock')
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='reservas')
+    cantidad = models.PositiveIntegerField()
+    vence = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Reserva de stock"
+        verbose_name_plural = "Reservas de stock"
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'producto'], name='reserva_unica_por_carrito'),
+        ]
+        indexes = [
+            # Disponible de un producto: suma de sus reservas con vence > ahora
+            models.Index(fields=['producto', 'vence'], name='idx_reserva_producto_vence'),
+            # Barrido de vencidas
+            models.Index(fields=['vence'], name='idx_reserva_vence'),
+        ]
+
+    def __str__(self):
+        return f"{self.cantidad} x {self.producto_id} para {self.usuario_id} hasta {self.vence:%H:%M}"
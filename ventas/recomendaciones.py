@@ -0,0 +1,131 @@
+"""
+Recomendaciones del carrito: "el cierre" y "el impulso".
+
+El motor anterior cargaba en una lista todos los productos con stock (con
+categoría y portadas), les calculaba el precio final y recién ahí elegía el
+más barato que alcanzara lo que falta para el envío gratis. El costo crecía
+con el catálogo.
+
+Acá cada proceso guarda un índice ordenado de (precio efectivo, id) de los
+productos elegibles, uno para productos sueltos y otro para kits:
+
+- el cierre es un `bisect` sobre los precios: el primero >= `falta` que no
+  esté en el carrito;
+- el impulso es el más barato que no esté en el carrito ni sea el cierre;
+- saltear lo que ya está en el carrito cuesta a lo sumo tantos pasos como
+  items tenga.
+
+El índice se reconstruye cuando cambia la versión del catálogo (ver
+`productos/catalogo.py`) o cuando vence el precio de alguno de sus
+productos (`precio_efectivo_vence`). La página del carrito solo trae de la
+base los dos productos elegidos.
+"""
+from bisect import bisect_left
+
+from django.utils import timezone
+
+from productos.catalogo import IndiceEnProceso
+
+
+class PreciosOrdenados:
+    """Precios e ids en dos arrays paralelos, ordenados por (precio, id)."""
+
+    def __init__(self, filas):
+        filas = sorted(filas)
+        self.precios = [precio for precio, _ in filas]
+        self.ids = [pk for _, pk in filas]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def primero_desde(self, minimo, excluir=()):
+        """Id del producto más barato con precio >= `minimo` que no esté en `excluir`."""
+        for posicion in range(bisect_left(self.precios, minimo), len(self.ids)):
+            if self.ids[posicion] not in excluir:
+                return self.ids[posicion]
+        return None
+
+    def mas_barato(self, excluir=()):
+        return self.primero_desde(self.precios[0], excluir) if self.ids else None
+
+
+class IndiceRecomendaciones:
+    def __init__(self, filas):
+        sueltos, kits = [], []
+        self.vence = None
+        for pk, precio, es_combo, vence in filas:
+            (kits if es_combo else sueltos).append((precio, pk))
+            if vence and (self.vence is None or vence < self.vence):
+                self.vence = vence
+        self.sueltos = PreciosOrdenados(sueltos)
+        self.kits = PreciosOrdenados(kits)
+
+    def recomendar(self, falta, en_carrito, hay_kit_en_carrito=False):
+        """
+        Devuelve (id del cierre, id del impulso), cualquiera puede ser None.
+        Los kits solo se ofrecen si no quedan productos sueltos para
+        recomendar y el carrito todavía no tiene ninguno.
+        """
+        pool = self.sueltos
+        if pool.mas_barato(en_carrito) is None:
+            if hay_kit_en_carrito:
+                return None, None
+            pool = self.kits
+
+        cierre = pool.primero_desde(falta, en_carrito)
+        impulso = pool.mas_barato(en_carrito | {cierre})
+        return cierre, impulso
+
+
+# ──────────────────────────────────────────────
+# 🧠 Índice del proceso (perezoso, por versión de catálogo)
+# ──────────────────────────────────────────────
+def _construir():
+    from productos.models import Producto
+    return IndiceRecomendaciones(
+        Producto.objects
+        .filter(stock__gt=0)
+        .order_by()
+        .values_list('pk', 'precio_efectivo', 'es_combo', 'precio_efectivo_vence')
+        .iterator()
+    )
+
+
+_indice = IndiceEnProceso(_construir)
+
+
+def indice_recomendaciones():
+    indice = _indice.obtener()
+    if indice.vence and indice.vence <= timezone.now():
+        # Arrancó o terminó una campaña u oferta: refrescar los precios
+        # guardados mueve la versión del catálogo y el índice se rearma
+        from productos.precios import refrescar_precios_vencidos
+        refrescar_precios_vencidos()
+        indice = _indice.obtener()
+    return indice
+
+
+def recomendar(falta, en_carrito, hay_kit_en_carrito=False):
+    """
+    Productos para cerrar la brecha al envío gratis y para la compra por
+    impulso, ya con categoría, portadas y precio final precargados.
+    Devuelve (rec_cierre, rec_impulso); cualquiera puede ser None.
+    """
+    from productos.models import Producto
+    from productos.precios import precargar_precios
+
+    ids = indice_recomendaciones().recomendar(falta, set(en_carrito), hay_kit_en_carrito)
+    elegidos = [pk for pk in ids if pk is not None]
+    if not elegidos:
+        return None, None
+
+    # El índice puede ir unos minutos atrás en stock: se vuelve a filtrar acá
+    productos = (
+        Producto.objects
+        .filter(pk__in=elegidos, stock__gt=0)
+        .select_related('categoria')
+        .prefetch_related('portadas')
+        .in_bulk()
+    )
+    precargar_precios(productos.values())
+    return tuple(productos.get(pk) if pk is not None else None for pk in ids)
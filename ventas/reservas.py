@@ -0,0 +1,196 @@
+"""
+Reservas de stock del carrito.
+
+El temporizador de 15 minutos del carrito (`session['cart_expiry']`) era solo
+visual: el stock se tomaba recién al crear el pedido, así que en una venta
+relámpago diez clientes podían tener en el carrito el último kit y nueve se
+enteraban en el pago. Ahora agregar al carrito aparta las unidades en
+`ReservaStock` hasta que vence ese mismo temporizador:
+
+    disponible = stock - reservas vigentes de otros carritos
+
+- `disponibles` lo calcula con un solo aggregate sobre el índice
+  (producto, vence), sin bloquear la fila del `Producto`: es lo que leen la
+  ficha del producto y el resumen del carrito en cada página;
+- `reservar` es el único que bloquea la fila, y solo cuando el carrito pide
+  más unidades que las que ya tenía apartadas (agregar, sumar, pagar);
+- una reserva vencida deja de contar sola (el aggregate filtra por `vence`);
+  `barrer_vencidas` las borra en lote con un solo DELETE, a lo sumo una vez
+  por minuto desde `reservar` y en cada corrida de `liberar_stock_abandonado`.
+
+El descuento real sigue siendo `ventas.stock.descontar` al crear el pedido;
+en ese momento las reservas del usuario se liberan. Las ventas que no pasan
+por el carrito (mostrador, entrega de un pedido desde el panel) descuentan con
+`descontar_respetando_reservas`: no se pueden llevar lo que otro cliente ya
+tiene apartado.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from ventas.stock import StockInsuficiente, _agrupar, descontar
+
+MINUTOS_RESERVA = 15          # el mismo temporizador del carrito
+CLAVE_BARRIDO = 'reservas_barrido'
+INTERVALO_BARRIDO = 60
+
+
+def vence_del_carrito(session):
+    """Fin del temporizador del carrito de la sesión; si no corre, lo arranca."""
+    cart_expiry = session.get('cart_expiry')
+    if not cart_expiry or cart_expiry <= timezone.now().timestamp():
+        cart_expiry = (timezone.now() + timedelta(minutes=MINUTOS_RESERVA)).timestamp()
+        session['cart_expiry'] = cart_expiry
+    return datetime.fromtimestamp(cart_expiry, tz=dt_timezone.utc)
+
+
+# ──────────────────────────────────────────────
+# 📊 Lectura (sin bloqueos)
+# ──────────────────────────────────────────────
+def reservado(producto_ids, excluir_usuario=None):
+    """{producto_id: unidades reservadas por carritos vigentes} en un solo aggregate."""
+    from ventas.models import ReservaStock
+
+    reservas = ReservaStock.objects.filter(producto_id__in=list(producto_ids), vence__gt=timezone.now())
+    if excluir_usuario is not None:
+        reservas = reservas.exclude(usuario=excluir_usuario)
+    return dict(
+        reservas.order_by().values('producto_id').annotate(total=Sum('cantidad')).values_list('producto_id', 'total')
+    )
+
+
+def disponibles(productos, usuario=None):
+    """
+    {producto_id: stock que todavía se puede llevar `usuario`}: el stock menos
+    lo que tienen apartado los demás carritos. Sus propias reservas no restan.
+    """
+    productos = list(productos)
+    otros = reservado((p.pk for p in productos), excluir_usuario=usuario)
+    return {p.pk: max(p.stock - otros.get(p.pk, 0), 0) for p in productos}
+
+
+def disponible(producto, usuario=None):
+    return disponibles([producto], usuario)[producto.pk]
+
+
+# ──────────────────────────────────────────────
+# 🔒 Reservar / descontar / liberar
+# ──────────────────────────────────────────────
+def reservar(usuario, cantidades, vence):
+    """
+    Deja reservadas para `usuario` exactamente esas cantidades
+    ({producto_id: unidades en el carrito}) hasta `vence`.
+    Pedir más de lo que ya tenía apartado exige stock libre y bloquea las
+    filas en orden de id (igual que `ventas.stock`); achicar nunca falla.
+    Levanta `StockInsuficiente` y no toca nada si alguna línea no alcanza o
+    si el producto ya no existe.
+    """
+    from productos.models import Producto
+    from ventas.models import ReservaStock
+
+    cantidades = {pk: cantidad for pk, cantidad in sorted(cantidades.items()) if cantidad > 0}
+    if not cantidades:
+        return
+    ids = list(cantidades)
+    ahora = timezone.now()
+
+    with transaction.atomic():
+        productos = {
+            pk: (nombre, stock) for pk, nombre, stock in
+            Producto.objects.filter(pk__in=ids).order_by('pk').select_for_update()
+            .values_list('pk', 'nombre', 'stock')
+        }
+        # Reservas vigentes de los demás y las propias, en el mismo aggregate
+        totales = {
+            fila['producto_id']: fila for fila in
+            ReservaStock.objects
+            .filter(producto_id__in=ids, vence__gt=ahora)
+            .order_by().values('producto_id')
+            .annotate(
+                otros=Sum('cantidad', filter=~Q(usuario=usuario)),
+                mias=Sum('cantidad', filter=Q(usuario=usuario)),
+            )
+        }
+        faltantes = []
+        for pk in ids:
+            # Un producto borrado que quedó en el carrito tiene 0 unidades libres
+            nombre, stock = productos.get(pk, (f"#{pk}", 0))
+            fila = totales.get(pk, {})
+            libre = max(stock - (fila.get('otros') or 0), 0)
+            if cantidades[pk] > (fila.get('mias') or 0) and cantidades[pk] > libre:
+                faltantes.append((nombre, libre, cantidades[pk]))
+        if faltantes:
+            raise StockInsuficiente(faltantes)
+
+        ReservaStock.objects.bulk_create(
+            [ReservaStock(usuario=usuario, producto_id=pk, cantidad=cantidad, vence=vence)
+             for pk, cantidad in cantidades.items()],
+            update_conflicts=True,
+            unique_fields=['usuario', 'producto'],
+            update_fields=['cantidad', 'vence'],
+        )
+
+    if cache.add(CLAVE_BARRIDO, True, INTERVALO_BARRIDO):
+        barrer_vencidas()
+
+
+def descontar_respetando_reservas(cantidades, usuario=None):
+    """
+    Descuenta stock ({producto_id: unidades} o pares) sin tocar las unidades
+    que tienen apartadas los carritos vigentes de otros usuarios (las de
+    `usuario` sí cuentan como libres). Bloquea las filas en orden de id, igual
+    que `reservar`, y descuenta con `ventas.stock.descontar`. Levanta
+    `StockInsuficiente` y no toca nada si alguna línea no alcanza.
+    """
+    from productos.models import Producto
+
+    cantidades = _agrupar(cantidades)
+    if not cantidades:
+        return
+    ids = list(cantidades)
+
+    with transaction.atomic():
+        productos = {
+            pk: (nombre, stock) for pk, nombre, stock in
+            Producto.objects.filter(pk__in=ids).order_by('pk').select_for_update()
+            .values_list('pk', 'nombre', 'stock')
+        }
+        # Se lee después del bloqueo: una reserva que entró mientras esperábamos ya cuenta
+        otros = reservado(ids, excluir_usuario=usuario)
+        faltantes = []
+        for pk, cantidad in cantidades.items():
+            nombre, stock = productos.get(pk, (f"#{pk}", 0))
+            libre = max(stock - otros.get(pk, 0), 0)
+            if cantidad > libre:
+                faltantes.append((nombre, libre, cantidad))
+        if faltantes:
+            raise StockInsuficiente(faltantes)
+        descontar(cantidades)
+
+
+def achicar(usuario, producto_id, cantidad):
+    """Baja la reserva a `cantidad` unidades (nunca falla ni bloquea el producto)."""
+    from ventas.models import ReservaStock
+
+    ReservaStock.objects.filter(usuario=usuario, producto_id=producto_id, cantidad__gt=cantidad).update(cantidad=cantidad)
+
+
+def liberar(usuario, producto_ids=None):
+    """Borra las reservas del usuario (todas, o solo las de esos productos)."""
+    from ventas.models import ReservaStock
+
+    reservas = ReservaStock.objects.filter(usuario=usuario)
+    if producto_ids is not None:
+        reservas = reservas.filter(producto_id__in=list(producto_ids))
+    reservas.delete()
+
+
+def barrer_vencidas():
+    """Borra en un solo DELETE las reservas vencidas. Devuelve cuántas borró."""
+    from ventas.models import ReservaStock
+
+    borradas, _ = ReservaStock.objects.filter(vence__lte=timezone.now()).delete()
+    return borradas
@@ -0,0 +1,280 @@
+"""
+Resumen de precios del carrito, compartido por todo el checkout.
+
+Antes `ver_carrito`, `finalizar_compra`, `DatosEnvioView`, `MetodoPagoView` y
+`api_cotizar_envio` recalculaban cada uno subtotal, cupón, barra de envío
+gratis y totales (con `Carrito.total`, que recorre los items y pide
+`precio_display` a cada uno). Acá se calcula una vez por versión del carrito:
+
+- `calcular_resumen` hace un número fijo de queries, tenga el carrito 1 o 50
+  productos: items + producto + categoría, portadas, campañas vigentes,
+  reservas de otros carritos, cupón y configuración de la tienda;
+- el resultado (`ResumenCarrito`, inmutable y sin instancias de modelos) se
+  guarda en el request y en el caché compartido, con el sello
+  `carrito_version_user_<id>`, la versión del catálogo y el cupón de la sesión;
+- cualquier cambio en el carrito llama a `invalidar_resumen`, que mueve el
+  sello: el resumen viejo deja de leerse y expira solo. Guardar un producto
+  (nombre, precio, stock a mano) mueve la versión del catálogo y tiene el
+  mismo efecto.
+
+Los cambios que no pasan por el carrito (fin de una campaña, cupón agotado por
+otro cliente, stock vendido a otro cliente, que mueve el sello de stock y no
+el del catálogo) se reflejan en pantalla a lo sumo `TIEMPO_RESUMEN` segundos
+después. Al confirmar el pago no se usa este resumen: `MetodoPagoView` lo
+vuelve a calcular dentro de la transacción y canjea el cupón con
+`canjear_cupon`, que solo suma el uso si el cupón sigue vigente.
+"""
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from productos.catalogo import version_catalogo
+
+PREFIJO_VERSION = 'carrito_version_user_'
+PREFIJO_RESUMEN = 'carrito_resumen_user_'
+TIEMPO_RESUMEN = 120
+ENVIO_GRATIS_NOMBRE = "Envío Gratis (Promo Tienda Plus)"
+
+
+@dataclass(frozen=True)
+class LineaCarrito:
+    item_id: int
+    producto_id: int
+    nombre: str
+    categoria: str
+    imagen: str | None
+    cantidad: int
+    precio_unitario: Decimal   # precio final (campaña u oferta incluida)
+    stock: int                 # disponible para este carrito (ver ventas/reservas.py)
+    es_combo: bool = False
+
+    @property
+    def subtotal(self):
+        return self.cantidad * self.precio_unitario
+
+    @property
+    def sin_stock(self):
+        return self.stock < self.cantidad
+
+
+@dataclass(frozen=True)
+class CuponAplicado:
+    id: int
+    codigo: str
+    envio_gratis: bool
+
+
+@dataclass(frozen=True)
+class ResumenCarrito:
+    version: int
+    catalogo: int
+    cupon_sesion: str             # el código que había en la sesión al calcularlo
+    lineas: tuple = ()
+    cupon: CuponAplicado | None = None
+    descuento: float = 0
+    envio_gratis_activo: bool = False
+    umbral: float = 0
+    mensaje: str = ''
+    mensaje_logrado: str = ''
+
+    @property
+    def vacio(self):
+        return not self.lineas
+
+    @property
+    def cantidad(self):
+        return sum(linea.cantidad for linea in self.lineas)
+
+    @property
+    def subtotal(self):
+        return sum((linea.subtotal for linea in self.lineas), Decimal('0'))
+
+    @property
+    def cupon_invalido(self):
+        """Había un código en la sesión pero no existe o ya no es válido."""
+        return bool(self.cupon_sesion) and self.cupon is None
+
+    @property
+    def total_con_descuento(self):
+        return max(float(self.subtotal) - self.descuento, 0)
+
+    # ── Envío gratis (se evalúa sobre el total ya descontado) ──
+    @property
+    def porcentaje(self):
+        if self.umbral <= 0:
+            return 100
+        return min(round(self.total_con_descuento / self.umbral * 100, 1), 100)
+
+    @property
+    def falta(self):
+        return max(self.umbral - self.total_con_descuento, 0) if self.umbral > 0 else 0
+
+    @property
+    def umbral_alcanzado(self):
+        return self.total_con_descuento >= self.umbral or bool(self.cupon and self.cupon.envio_gratis)
+
+    @property
+    def envio_gratis(self):
+        """El envío sale $0: promo de la tienda activa y alcanzada, o cupón con envío gratis."""
+        if self.cupon and self.cupon.envio_gratis:
+            return True
+        return self.envio_gratis_activo and self.total_con_descuento >= self.umbral
+
+    @property
+    def barra_envio_visible(self):
+        return self.envio_gratis_activo or bool(self.cupon and self.cupon.envio_gratis)
+
+    def total_a_pagar(self, costo_envio=0):
+        return max(self.total_con_descuento + float(costo_envio or 0), 0)
+
+
+# ──────────────────────────────────────────────
+# 🔖 Sello por usuario
+# ──────────────────────────────────────────────
+def _clave_version(user_id):
+    return f"{PREFIJO_VERSION}{user_id}"
+
+
+def _clave_resumen(user_id):
+    return f"{PREFIJO_RESUMEN}{user_id}"
+
+
+def _nuevo_sello():
+    return int(time.time() * 1000)
+
+
+def invalidar_resumen(user_id):
+    """
+    Llamar después de cualquier cambio en el carrito del usuario (items,
+    cantidades, vaciado). Mueve el sello del resumen y borra el contador del
+    navbar (`context_processors.carrito_count`).
+    """
+    try:
+        cache.incr(_clave_version(user_id))
+    except ValueError:
+        cache.set(_clave_version(user_id), _nuevo_sello(), None)
+    cache.delete(f"carrito_count_user_{user_id}")
+
+
+# ──────────────────────────────────────────────
+# 🧮 Cálculo
+# ──────────────────────────────────────────────
+class CuponNoValido(Exception):
+    """El cupón del carrito venció, se desactivó o se agotó antes de confirmar el pedido."""
+
+
+def canjear_cupon(cupon_id):
+    """
+    Suma un uso al cupón en un solo UPDATE condicional: si entre el resumen y
+    este momento venció, se desactivó o llegó a `uso_maximo` (también por otro
+    cliente que confirmó a la vez), no toca nada y levanta `CuponNoValido`.
+    Llamar dentro del `transaction.atomic()` que crea el pedido.
+    """
+    from django.db.models import F, Q
+    from django.utils import timezone
+    from productos.models import CodigoDescuento
+
+    ahora = timezone.now()
+    canjeados = (
+        CodigoDescuento.objects
+        .filter(pk=cupon_id, activo=True, fecha_inicio__lte=ahora, fecha_fin__gte=ahora)
+        .filter(Q(uso_maximo=0) | Q(usos_actuales__lt=F('uso_maximo')))
+        .update(usos_actuales=F('usos_actuales') + 1)
+    )
+    if not canjeados:
+        raise CuponNoValido()
+
+
+def calcular_resumen(usuario, cupon_codigo='', version=0, catalogo=0):
+    """Arma el resumen desde la base con un número fijo de queries."""
+    from productos.models import CodigoDescuento
+    from productos.precios import precargar_precios
+    from ventas.models import ConfiguracionTienda, ItemCarrito
+    from ventas.reservas import disponibles
+
+    items = list(
+        ItemCarrito.objects
+        .filter(carrito__usuario=usuario)
+        .select_related('producto__categoria')
+        .prefetch_related('producto__portadas')
+        .order_by('id')
+    )
+    precargar_precios(item.producto for item in items)
+    stock = disponibles((item.producto for item in items), usuario) if items else {}
+    lineas = tuple(
+        LineaCarrito(
+            item_id=item.id,
+            producto_id=item.producto_id,
+            nombre=item.producto.nombre,
+            categoria=item.producto.categoria.nombre if item.producto.categoria else '',
+            imagen=item.producto.imagen_principal_url,
+            cantidad=item.cantidad,
+            precio_unitario=item.producto.precio_display or Decimal('0'),
+            stock=stock[item.producto_id],
+            es_combo=item.producto.es_combo,
+        )
+        for item in items
+    )
+    subtotal = sum((linea.subtotal for linea in lineas), Decimal('0'))
+
+    cupon, descuento = None, 0
+    if cupon_codigo:
+        obj = CodigoDescuento.objects.filter(codigo__iexact=cupon_codigo).first()
+        if obj and obj.es_valido:
+            cupon = CuponAplicado(obj.pk, obj.codigo, obj.envio_gratis)
+            descuento = float(obj.calcular_descuento(subtotal))
+
+    config = ConfiguracionTienda.get()
+    umbral = float(config.envio_gratis_umbral)
+    return ResumenCarrito(
+        version=version,
+        catalogo=catalogo,
+        cupon_sesion=cupon_codigo,
+        lineas=lineas,
+        cupon=cupon,
+        descuento=descuento,
+        envio_gratis_activo=config.envio_gratis_activo,
+        umbral=umbral,
+        mensaje=config.envio_gratis_mensaje.replace("{umbral}", f"{umbral:,.0f}"),
+        mensaje_logrado=config.envio_gratis_mensaje_logrado,
+    )
+
+
+def obtener_resumen(request):
+    """
+    Resumen del carrito del usuario del request. Se reutiliza dentro del mismo
+    request y entre requests mientras no cambien el carrito, el catálogo ni el
+    cupón de la sesión: en ese caso cuesta una lectura del caché compartido.
+    """
+    resumen = getattr(request, '_resumen_carrito', None)
+    cupon_codigo = request.session.get('cupon_codigo') or ''
+    if resumen is not None and resumen.cupon_sesion == cupon_codigo:
+        return resumen
+
+    user_id = request.user.id
+    guardados = cache.get_many([_clave_version(user_id), _clave_resumen(user_id)])
+    version = guardados.get(_clave_version(user_id))
+    if version is None:
+        version = _nuevo_sello()
+        if not cache.add(_clave_version(user_id), version, None):
+            version = cache.get(_clave_version(user_id), version)
+    catalogo = version_catalogo()
+
+    resumen = guardados.get(_clave_resumen(user_id))
+    vigente = (
+        resumen is not None
+        and resumen.version == version
+        and resumen.catalogo == catalogo
+        and resumen.cupon_sesion == cupon_codigo
+    )
+    if not vigente:
+        resumen = calcular_resumen(request.user, cupon_codigo, version, catalogo)
+        # Si otro request movió el sello mientras calculábamos, este resumen
+        # queda guardado con la versión vieja y el próximo lector lo descarta
+        cache.set(_clave_resumen(user_id), resumen, TIEMPO_RESUMEN)
+
+    request._resumen_carrito = resumen
+    return resumen
+
@@ -0,0 +1,183 @@
+"""
+Hojas de stickers y etiquetas de envío listas para imprimir (A4 a 300 DPI).
+
+Reemplaza a `generar_stickers.py`, que armaba una sola hoja fija y volvía a
+redimensionar el logo con LANCZOS para cada sticker aunque el diámetro se
+repitiera. Acá:
+
+- cada pieza (sticker circular o etiqueta rectangular) se ubica en filas
+  sobre tantas hojas como haga falta (`armar_hojas`);
+- el logo escalado se memoiza por (archivo, lado): en una hoja de 40
+  etiquetas iguales se redimensiona una sola vez por proceso;
+- cada hoja se dibuja en un proceso aparte (`renderizar_hoja`), por eso acá
+  solo hay Pillow y dataclasses que viajan pickleados, nada de Django.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageOps
+
+from productos.laboratorio import FUENTES_TEXTO, FUENTES_TITULO, cargar_fuente
+
+DPI = 300
+A4_ANCHO, A4_ALTO = 2480, 3508
+MARGEN = 30       # px al borde de la hoja
+SEPARACION = 40   # px entre piezas (margen de corte)
+COLOR_CORTE = '#b0b0b0'
+
+
+def mm_a_px(mm):
+    return round(mm / 25.4 * DPI)
+
+
+@dataclass(frozen=True)
+class Pieza:
+    ancho: int              # px
+    alto: int               # px
+    logo: str = ''          # ruta al archivo; vacío = sin logo
+    lineas: tuple = ()      # textos de la etiqueta (la primera va en negrita)
+    forma: str = 'circulo'  # 'circulo' o 'etiqueta'
+
+
+@dataclass(frozen=True)
+class Colocacion:
+    x: int
+    y: int
+    pieza: Pieza
+
+
+def sticker(logo, diametro_mm):
+    lado = mm_a_px(diametro_mm)
+    return Pieza(ancho=lado, alto=lado, logo=logo)
+
+
+def etiqueta(lineas, ancho_mm, alto_mm, logo=''):
+    return Pieza(
+        ancho=mm_a_px(ancho_mm), alto=mm_a_px(alto_mm),
+        logo=logo, lineas=tuple(lineas), forma='etiqueta',
+    )
+
+
+# ──────────────────────────────────────────────
+# 📐 Armado de hojas
+# ──────────────────────────────────────────────
+def armar_hojas(piezas):
+    """
+    Reparte las piezas en filas (de la más alta a la más baja, cada una en la
+    primera fila donde entre) y las filas en hojas. Devuelve una tupla de
+    `Colocacion` por hoja.
+    """
+    ancho_util = A4_ANCHO - 2 * MARGEN
+    filas = []  # [alto, ancho ocupado, [piezas]]
+    for pieza in sorted(piezas, key=lambda p: p.alto, reverse=True):
+        if pieza.ancho > ancho_util or pieza.alto > A4_ALTO - 2 * MARGEN:
+            raise ValueError(f"Una pieza de {pieza.ancho}x{pieza.alto}px no entra en la hoja")
+        for fila in filas:
+            if fila[1] + SEPARACION + pieza.ancho <= ancho_util:
+                fila[1] += SEPARACION + pieza.ancho
+                fila[2].append(pieza)
+                break
+        else:
+            filas.append([pieza.alto, pieza.ancho, [pieza]])
+
+    hojas, hoja, y = [], [], MARGEN
+    for alto, ancho, contenido in filas:
+        if hoja and y + alto > A4_ALTO - MARGEN:
+            hojas.append(tuple(hoja))
+            hoja, y = [], MARGEN
+        x = (A4_ANCHO - ancho) // 2
+        for pieza in contenido:
+            hoja.append(Colocacion(x, y + (alto - pieza.alto) // 2, pieza))
+            x += pieza.ancho + SEPARACION
+        y += alto + SEPARACION
+    if hoja:
+        hojas.append(tuple(hoja))
+    return hojas
+
+
+# ──────────────────────────────────────────────
+# 🧠 Memoización (por proceso)
+# ──────────────────────────────────────────────
+@lru_cache(maxsize=16)
+def _logo_original(ruta):
+    with Image.open(ruta) as img:
+        return img.convert('RGBA')
+
+
+@lru_cache(maxsize=128)
+def logo_escalado(ruta, lado):
+    """El logo dentro de un cuadrado de `lado` px, sin deformarlo."""
+    return ImageOps.contain(_logo_original(ruta), (lado, lado), Image.Resampling.LANCZOS)
+
+
+@lru_cache(maxsize=32)
+def _fuente(tamanio, negrita=False):
+    return cargar_fuente('', FUENTES_TITULO if negrita else FUENTES_TEXTO, tamanio)
+
+
+# ──────────────────────────────────────────────
+# 🖨️ Dibujo
+# ──────────────────────────────────────────────
+def _pegar_logo(hoja, ruta, x, y, lado):
+    logo = logo_escalado(ruta, lado)
+    hoja.paste(logo, (x + (lado - logo.width) // 2, y + (lado - logo.height) // 2), logo)
+
+
+def _dibujar_sticker(hoja, draw, c):
+    d = c.pieza.ancho
+    draw.ellipse([c.x, c.y, c.x + d, c.y + d], outline=COLOR_CORTE, width=8)
+    if c.pieza.logo:
+        sangria = int(d * 0.12)
+        _pegar_logo(hoja, c.pieza.logo, c.x + sangria, c.y + sangria, d - 2 * sangria)
+
+
+def _recortar(draw, texto, fuente, ancho):
+    if draw.textlength(texto, font=fuente) <= ancho:
+        return texto
+    while texto and draw.textlength(texto + '…', font=fuente) > ancho:
+        texto = texto[:-1]
+    return texto + '…'
+
+
+def _dibujar_etiqueta(hoja, draw, c):
+    p = c.pieza
+    draw.rounded_rectangle([c.x, c.y, c.x + p.ancho, c.y + p.alto], radius=30, outline=COLOR_CORTE, width=4)
+    sangria = int(p.alto * 0.08)
+    x = c.x + sangria
+    if p.logo:
+        lado = min(p.alto - 2 * sangria, int(p.ancho * 0.22))
+        _pegar_logo(hoja, p.logo, x, c.y + (p.alto - lado) // 2, lado)
+        x += lado + sangria
+
+    if not p.lineas:
+        return
+    interlineado = (p.alto - 2 * sangria) // max(len(p.lineas), 4)
+    tamanio = int(interlineado * 0.62)
+    y = c.y + sangria
+    for i, linea in enumerate(p.lineas):
+        fuente = _fuente(tamanio, negrita=(i == 0))
+        draw.text((x, y), _recortar(draw, linea, fuente, c.x + p.ancho - sangria - x), font=fuente, fill=(40, 40, 40))
+        y += interlineado
+
+
+def renderizar_hoja(hoja, destino, calidad=95):
+    """Dibuja una hoja y la guarda en `destino` (PNG o JPEG según la extensión)."""
+    lienzo = Image.new('RGB', (A4_ANCHO, A4_ALTO), 'white')
+    draw = ImageDraw.Draw(lienzo)
+    for colocacion in hoja:
+        if colocacion.pieza.forma == 'etiqueta':
+            _dibujar_etiqueta(lienzo, draw, colocacion)
+        else:
+            _dibujar_sticker(lienzo, draw, colocacion)
+    lienzo.save(destino, quality=calidad, dpi=(DPI, DPI))
+    return destino
+
+
+def unir_pdf(paginas, destino):
+    """Junta las hojas ya dibujadas en un único PDF de varias páginas."""
+    primera, *resto = paginas
+    with Image.open(primera) as img:
+        img.save(
+            destino, format='PDF', resolution=DPI, save_all=True,
+            append_images=(Image.open(p) for p in resto),
+        )
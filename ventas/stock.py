@@ -0,0 +1,133 @@
+"""
+Movimientos de stock atómicos.
+
+El viejo `descontar_stock` leía `producto.stock` en Python, restaba y hacía
+`save()`: dos compras simultáneas pasaban las dos la validación y la última
+escritura pisaba a la primera (sobreventa). Acá el stock se mueve con UN solo UPDATE
+condicional para todas las líneas del pedido:
+
+    UPDATE productos_producto
+       SET stock = stock - CASE id WHEN 3 THEN 2 WHEN 7 THEN 1 END
+     WHERE id IN (SELECT id FROM productos_producto
+                   WHERE id IN (3, 7) ORDER BY id FOR UPDATE)
+       AND stock >= CASE id WHEN 3 THEN 2 WHEN 7 THEN 1 END
+
+- la condición `stock >= n` la evalúa la base sobre la fila ya bloqueada, así
+  que dos compradores nunca pueden dejarla en negativo;
+- las filas se bloquean en orden de id (el subquery con ORDER BY ... FOR
+  UPDATE), el mismo orden para todos: dos pedidos con productos en común no
+  se trancan entre sí;
+- si alguna línea no alcanza, se deshace todo el lote (savepoint) y se
+  levanta `StockInsuficiente` con el detalle;
+- el CheckConstraint `producto_stock_no_negativo` es la última red.
+
+Como `update()` no dispara señales, tarjetas, home y el sello de stock se
+invalidan una sola vez, cuando la transacción confirma. El sello del catálogo
+no se toca: nombres, precios y categorías no cambiaron, y los índices en
+memoria que dependen de él no tienen por qué rearmarse en cada venta.
+
+La prueba con compradores concurrentes está en `ventas/tests.py`
+(`DescuentoConcurrenteTests`, solo corre contra PostgreSQL).
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, Subquery, Value, When
+from django.utils import timezone
+
+
+class StockInsuficiente(ValueError):
+    def __init__(self, faltantes):
+        self.faltantes = faltantes  # [(nombre, disponible, pedido)]
+        detalle = ', '.join(
+            f"{nombre} (disponible: {disponible}, pedido: {pedido})" for nombre, disponible, pedido in faltantes
+        )
+        super().__init__(f"Stock insuficiente para: {detalle}")
+
+
+def _agrupar(cantidades):
+    """Acepta {producto_id: cantidad} o pares (producto_id, cantidad); suma repetidos."""
+    pares = cantidades.items() if hasattr(cantidades, 'items') else cantidades
+    total = Counter()
+    for producto_id, cantidad in pares:
+        if cantidad < 0:
+            raise ValueError("La cantidad a mover no puede ser negativa.")
+        total[producto_id] += cantidad
+    return {pk: cantidad for pk, cantidad in sorted(total.items()) if cantidad}
+
+
+def _por_producto(cantidades):
+    return Case(*[When(pk=pk, then=Value(cantidad)) for pk, cantidad in cantidades.items()])
+
+
+def _bloqueo_ordenado(ids):
+    from productos.models import Producto
+    return Subquery(Producto.objects.filter(pk__in=ids).order_by('pk').select_for_update().values('pk'))
+
+
+def _invalidar_al_confirmar(ids):
+    from biblioteca_plus.inicio import invalidar_home
+    from productos.catalogo import invalidar_stock
+    from productos.fragmentos import invalidar_tarjetas
+
+    def invalidar():
+        invalidar_tarjetas(ids)
+        invalidar_stock()
+        invalidar_home()
+
+    transaction.on_commit(invalidar)
+
+
+# ──────────────────────────────────────────────
+# 📦 Descontar / reponer
+# ──────────────────────────────────────────────
+def descontar(cantidades):
+    """
+    Descuenta stock de varios productos en un solo UPDATE condicional.
+    Todo o nada: si a alguno no le alcanza no se descuenta ninguno.
+    """
+    from productos.models import Producto
+
+    cantidades = _agrupar(cantidades)
+    if not cantidades:
+        return
+    ids = list(cantidades)
+    pedido = _por_producto(cantidades)
+
+    try:
+        with transaction.atomic():
+            actualizados = (
+                Producto.objects
+                .filter(pk__in=_bloqueo_ordenado(ids), stock__gte=pedido)
+                .update(stock=F('stock') - pedido, actualizado=timezone.now())
+            )
+            if actualizados != len(ids):
+                raise StockInsuficiente([])
+    except StockInsuficiente:
+        # Solo en el camino del error, ya deshecho el descuento parcial:
+        # averiguar cuáles no alcanzaron
+        actuales = {pk: (nombre, stock) for pk, nombre, stock in
+                    Producto.objects.filter(pk__in=ids).values_list('pk', 'nombre', 'stock')}
+        faltantes = [
+            (*actuales.get(pk, (f"#{pk}", 0)), cantidad)
+            for pk, cantidad in cantidades.items()
+            if actuales.get(pk, ('', 0))[1] < cantidad
+        ]
+        raise StockInsuficiente(faltantes) from None
+
+    _invalidar_al_confirmar(ids)
+
+
+def reponer(cantidades):
+    """Devuelve stock (pedido cancelado o abandonado) con un solo UPDATE."""
+    from productos.models import Producto
+
+    cantidades = _agrupar(cantidades)
+    if not cantidades:
+        return
+    ids = list(cantidades)
+    with transaction.atomic():
+        Producto.objects.filter(pk__in=_bloqueo_ordenado(ids)).update(
+            stock=F('stock') + _por_producto(cantidades), actualizado=timezone.now(),
+        )
+    _invalidar_al_confirmar(ids)
@@ -1,3 +1,391 @@
-from django.test import TestCase
+import json
+import random
+import threading
+import unittest
+from collections import Counter
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from categorias.models import Categoria
+from productos.catalogo import version_catalogo, version_stock
+from productos.facetas import calcular_facetas, leer_filtros
+from productos.models import CampaniaDescuento, CodigoDescuento, Producto
+from productos.tests import (
+    CACHES_EN_MEMORIA, ConsultasConstantesMixin, crear_campania, crear_portadas, crear_productos,
+)
+from ventas import reservas, stock
+from ventas.models import Carrito, DetallePedido, ItemCarrito, Pedido, ReservaStock
+from ventas.resumen_carrito import CuponNoValido, canjear_cupon
+from ventas.views.pedidos import PedidoListView
+
+
+# ──────────────────────────────────────────────
+# 🔢 Cantidad de queries por página
+# ──────────────────────────────────────────────
+@override_settings(CACHES=CACHES_EN_MEMORIA)
+class CarritoConsultasTests(ConsultasConstantesMixin, TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user('cliente', password='x')
+        self.carrito = Carrito.objects.create(usuario=self.usuario)
+        self.categoria = Categoria.objects.create(nombre="Perros")
+        self.campania = crear_campania()
+        self.client.force_login(self.usuario)
+
+    def agregar_items(self, n):
+        for producto in crear_productos(n, self.categoria, self.campania):
+            ItemCarrito.objects.create(carrito=self.carrito, producto=producto, cantidad=1)
+
+    def agregar_items_con_portadas(self, n):
+        for producto in crear_productos(n, self.categoria, self.campania):
+            crear_portadas([producto])
+            ItemCarrito.objects.create(carrito=self.carrito, producto=producto, cantidad=1)
+
+    def test_ver_carrito(self):
+        self.assertConsultasConstantes(lambda: self.client.get(reverse('carrito:carrito_detail')), self.agregar_items)
+
+    def test_ver_carrito_con_portadas(self):
+        self.assertConsultasConstantes(
+            lambda: self.client.get(reverse('carrito:carrito_detail')), self.agregar_items_con_portadas,
+        )
+
+
+@override_settings(CACHES=CACHES_EN_MEMORIA)
+class PedidoConsultasTests(ConsultasConstantesMixin, TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user('cliente', password='x')
+        self.pedido = Pedido.objects.create(usuario=self.usuario, total=0)
+        self.client.force_login(self.usuario)
+
+    def agregar_detalles(self, pedido, n):
+        productos = crear_productos(n)
+        crear_portadas(productos)
+        DetallePedido.objects.bulk_create(
+            DetallePedido(pedido=pedido, producto=p, cantidad=1, precio_unitario=p.precio) for p in productos
+        )
+
+    def agregar_pedidos(self, n):
+        for _ in range(n):
+            self.agregar_detalles(Pedido.objects.create(usuario=self.usuario, total=0), 2)
+
+    def test_detalle(self):
+        self.assertConsultasConstantes(
+            lambda: self.client.get(reverse('pedidos:detail', args=[self.pedido.pk])),
+            lambda n: self.agregar_detalles(self.pedido, n),
+        )
+
+    def test_listado(self):
+        # PedidoListView no tiene URL propia (pedidos:list redirige a Mi Cuenta): se llama directo
+        def listar():
+            request = RequestFactory().get('/pedidos/')
+            request.user = self.usuario
+            return PedidoListView.as_view()(request).render()
+
+        self.assertConsultasConstantes(listar, self.agregar_pedidos)
+
+    def test_mi_cuenta(self):
+        self.assertConsultasConstantes(lambda: self.client.get(reverse('usuarios:mi_cuenta')), self.agregar_pedidos)
+
+
+@override_settings(CACHES=CACHES_EN_MEMORIA)
+class VentaMostradorConsultasTests(ConsultasConstantesMixin, TestCase):
+    def setUp(self):
+        self.cajero = User.objects.create_user('cajero', password='x', is_staff=True)
+        self.campania = crear_campania()
+        self.client.force_login(self.cajero)
+
+    def test_catalogo_del_pos(self):
+        self.assertConsultasConstantes(
+            lambda: self.client.get(reverse('panel:venta_mostrador')),
+            lambda n: crear_productos(n, campania=self.campania),
+        )
+
+    def test_venta(self):
+        productos = []
+
+        def vender():
+            items = [{'id': p.pk, 'cantidad': 1} for p in productos]
+            respuesta = self.client.post(
+                reverse('panel:venta_mostrador'), json.dumps({'items': items}), content_type='application/json',
+            )
+            self.assertEqual(respuesta.status_code, 200, respuesta.content)
+            return respuesta
+
+        self.assertConsultasConstantes(vender, lambda n: productos.extend(crear_productos(n, campania=self.campania)))
+
+
+# ──────────────────────────────────────────────
+# 🎟️ Confirmar el pedido con precios y cupón al día
+# ──────────────────────────────────────────────
+@override_settings(CACHES=CACHES_EN_MEMORIA)
+class ConfirmarPedidoTests(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user('cliente', password='x')
+        self.carrito = Carrito.objects.create(usuario=self.usuario)
+        self.campania = crear_campania()
+        self.producto = crear_productos(1, campania=self.campania)[0]
+        ItemCarrito.objects.create(carrito=self.carrito, producto=self.producto, cantidad=1)
+        ahora = timezone.now()
+        self.cupon = CodigoDescuento.objects.create(
+            codigo='PRUEBA10', tipo_descuento='porcentaje', valor=10, uso_maximo=5,
+            fecha_inicio=ahora - timedelta(days=1), fecha_fin=ahora + timedelta(days=1),
+        )
+        self.client.force_login(self.usuario)
+        sesion = self.client.session
+        sesion['cupon_codigo'] = 'PRUEBA10'
+        sesion.save()
+        # El cliente ve la pantalla de pago: el resumen queda en caché
+        self.assertEqual(self.client.get(reverse('pagos:metodo')).status_code, 200)
+
+    def confirmar(self):
+        return self.client.post(reverse('pagos:metodo'), {'metodo': 'efectivo'})
+
+    def test_cupon_vigente_suma_un_uso(self):
+        self.confirmar()
+        pedido = Pedido.objects.get(usuario=self.usuario)
+        self.assertEqual(pedido.cupon_aplicado_id, self.cupon.pk)
+        self.cupon.refresh_from_db()
+        self.assertEqual(self.cupon.usos_actuales, 1)
+
+    def test_cupon_agotado_despues_del_resumen(self):
+        CodigoDescuento.objects.filter(pk=self.cupon.pk).update(usos_actuales=5)
+        respuesta = self.confirmar()
+        self.assertRedirects(respuesta, reverse('carrito:carrito_detail'), fetch_redirect_response=False)
+        self.assertFalse(Pedido.objects.exists())
+        self.cupon.refresh_from_db()
+        self.assertEqual(self.cupon.usos_actuales, 5)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 10)
+        self.assertNotIn('cupon_codigo', self.client.session)
+
+    def test_cupon_desactivado_despues_del_resumen(self):
+        CodigoDescuento.objects.filter(pk=self.cupon.pk).update(activo=False)
+        self.confirmar()
+        self.assertFalse(Pedido.objects.exists())
+
+    def test_campania_terminada_despues_del_resumen(self):
+        # update() no dispara señales: el resumen en caché sigue con el precio de campaña
+        CampaniaDescuento.objects.filter(pk=self.campania.pk).update(fecha_fin=timezone.now() - timedelta(minutes=1))
+        self.confirmar()
+        detalle = DetallePedido.objects.get(pedido__usuario=self.usuario)
+        self.assertEqual(detalle.precio_unitario, self.producto.precio)
+
+    def test_canjear_cupon_no_pasa_el_maximo(self):
+        CodigoDescuento.objects.filter(pk=self.cupon.pk).update(usos_actuales=4)
+        canjear_cupon(self.cupon.pk)
+        with self.assertRaises(CuponNoValido):
+            canjear_cupon(self.cupon.pk)
+        self.cupon.refresh_from_db()
+        self.assertEqual(self.cupon.usos_actuales, 5)
+
+
+# ──────────────────────────────────────────────
+# 🏷️ Una venta mueve el sello de stock, no el del catálogo
+# ──────────────────────────────────────────────
+@override_settings(CACHES=CACHES_EN_MEMORIA)
+class SellosDeStockTests(TestCase):
+    def setUp(self):
+        self.producto = crear_productos(1)[0]
+
+    def test_venta_no_invalida_el_catalogo(self):
+        catalogo, sello_stock = version_catalogo(), version_stock()
+        with self.captureOnCommitCallbacks(execute=True):
+            stock.descontar({self.producto.pk: 3})
+        self.assertEqual(version_catalogo(), catalogo)
+        self.assertNotEqual(version_stock(), sello_stock)
+
+    def test_facetas_ven_la_venta(self):
+        filtros = leer_filtros({})
+        self.assertEqual(calcular_facetas(filtros)['sin_stock'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            stock.descontar({self.producto.pk: 10})
+        self.assertEqual(calcular_facetas(filtros)['sin_stock'], 1)
+
+
+# ──────────────────────────────────────────────
+# 🔒 Reservas de stock del carrito
+# ──────────────────────────────────────────────
+class ReservasTests(TestCase):
+    def setUp(self):
+        self.producto = crear_productos(1, stock=10)[0]
+        self.cliente = User.objects.create_user('cliente', password='x')
+        self.otro = User.objects.create_user('otro', password='x')
+        self.vence = timezone.now() + timedelta(minutes=15)
+
+    def reservadas(self, usuario):
+        return ReservaStock.objects.filter(usuario=usuario, producto=self.producto).values_list('cantidad', flat=True).first()
+
+    def test_reservas_de_otros_bloquean(self):
+        reservas.reservar(self.otro, {self.producto.pk: 8}, self.vence)
+        with self.assertRaises(stock.StockInsuficiente):
+            reservas.reservar(self.cliente, {self.producto.pk: 3}, self.vence)
+        self.assertIsNone(self.reservadas(self.cliente))
+        reservas.reservar(self.cliente, {self.producto.pk: 2}, self.vence)
+        self.assertEqual(self.reservadas(self.cliente), 2)
+
+    def test_las_propias_no_restan(self):
+        reservas.reservar(self.cliente, {self.producto.pk: 6}, self.vence)
+        self.assertEqual(reservas.disponible(self.producto, self.cliente), 10)
+        self.assertEqual(reservas.disponible(self.producto, self.otro), 4)
+        reservas.reservar(self.cliente, {self.producto.pk: 10}, self.vence)
+        self.assertEqual(self.reservadas(self.cliente), 10)
+
+    def test_reserva_vencida_deja_de_contar(self):
+        reservas.reservar(self.otro, {self.producto.pk: 10}, timezone.now() - timedelta(seconds=1))
+        self.assertEqual(reservas.disponible(self.producto, self.cliente), 10)
+        reservas.reservar(self.cliente, {self.producto.pk: 10}, self.vence)
+        reservas.barrer_vencidas()
+        self.assertIsNone(self.reservadas(self.otro))
+        self.assertEqual(self.reservadas(self.cliente), 10)
+
+    def test_achicar_nunca_falla(self):
+        reservas.reservar(self.cliente, {self.producto.pk: 5}, self.vence)
+        Producto.objects.filter(pk=self.producto.pk).update(stock=0)
+        reservas.achicar(self.cliente, self.producto.pk, 2)
+        self.assertEqual(self.reservadas(self.cliente), 2)
+        # Achicar a más de lo reservado no agranda nada
+        reservas.achicar(self.cliente, self.producto.pk, 4)
+        self.assertEqual(self.reservadas(self.cliente), 2)
+
+    def test_liberar(self):
+        otro_producto = crear_productos(1)[0]
+        reservas.reservar(self.cliente, {self.producto.pk: 1, otro_producto.pk: 1}, self.vence)
+        reservas.liberar(self.cliente, [otro_producto.pk])
+        self.assertEqual(
+            list(ReservaStock.objects.filter(usuario=self.cliente).values_list('producto_id', flat=True)),
+            [self.producto.pk],
+        )
+        reservas.liberar(self.cliente)
+        self.assertFalse(ReservaStock.objects.filter(usuario=self.cliente).exists())
+
+    def test_producto_borrado_es_stock_insuficiente(self):
+        borrado = crear_productos(1)[0]
+        pk = borrado.pk
+        borrado.delete()
+        with self.assertRaises(stock.StockInsuficiente):
+            reservas.reservar(self.cliente, {self.producto.pk: 1, pk: 1}, self.vence)
+        self.assertFalse(ReservaStock.objects.exists())
+
+    def test_agregar_al_carrito_respeta_reservas(self):
+        reservas.reservar(self.otro, {self.producto.pk: 10}, self.vence)
+        self.client.force_login(self.cliente)
+        self.client.post(reverse('carrito:carrito_add', args=[self.producto.pk]))
+        self.assertFalse(ItemCarrito.objects.filter(carrito__usuario=self.cliente).exists())
+
+    def test_venta_de_mostrador_respeta_reservas(self):
+        reservas.reservar(self.otro, {self.producto.pk: 8}, self.vence)
+        cajero = User.objects.create_user('cajero', password='x', is_staff=True)
+        self.client.force_login(cajero)
+
+        def vender(cantidad):
+            return self.client.post(
+                reverse('panel:venta_mostrador'),
+                json.dumps({'items': [{'id': self.producto.pk, 'cantidad': cantidad}]}),
+                content_type='application/json',
+            )
+
+        self.assertEqual(vender(3).status_code, 400)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 10)
+        self.assertFalse(Pedido.objects.exists())
+
+        self.assertEqual(vender(2).status_code, 200)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 8)
+
+
+# ──────────────────────────────────────────────
+# 🃏 Las tarjetas descuentan lo reservado por otros carritos
+# ──────────────────────────────────────────────
+@override_settings(CACHES=CACHES_EN_MEMORIA)
+class ReservasEnTarjetasTests(TestCase):
+    def setUp(self):
+        self.producto = crear_productos(1, stock=2)[0]
+        self.otro = User.objects.create_user('otro', password='x')
+
+    def tarjeta(self):
+        respuesta = self.client.get(reverse('productos:producto_list'))
+        return respuesta, respuesta.context['productos'][0]
+
+    def test_todo_reservado_se_muestra_sin_stock(self):
+        respuesta, card = self.tarjeta()  # deja la tarjeta en el caché de fragmentos
+        self.assertTrue(card.hay_stock)
+        self.assertContains(respuesta, "¡Últimos 2!")
+
+        reservas.reservar(self.otro, {self.producto.pk: 2}, timezone.now() + timedelta(minutes=15))
+        respuesta, card = self.tarjeta()
+        self.assertFalse(card.hay_stock)
+        self.assertEqual(card.stock, 0)
+        self.assertContains(respuesta, "Sin Stock")
+        self.assertNotContains(respuesta, "¡Últimos 2!")
+
+    def test_reserva_vencida_no_cuenta(self):
+        reservas.reservar(self.otro, {self.producto.pk: 2}, timezone.now() - timedelta(minutes=1))
+        _, card = self.tarjeta()
+        self.assertTrue(card.hay_stock)
+        self.assertEqual(card.stock, 2)
+
+
+# ──────────────────────────────────────────────
+# 🔥 Estrés del descuento de stock (solo PostgreSQL)
+# ──────────────────────────────────────────────
+@unittest.skipUnless(connection.vendor == 'postgresql', "En SQLite las escrituras ya se serializan: no es concluyente")
+class DescuentoConcurrenteTests(TransactionTestCase):
+    """
+    Muchos hilos compran a la vez los mismos productos con `stock.descontar`:
+    al final no se vendió ni una unidad de más y el stock cuadra con lo vendido.
+    """
+    HILOS = 16
+    COMPRAS = 50
+    PRODUCTOS = 3
+    STOCK = 40
+
+    def setUp(self):
+        self.ids = [
+            Producto.objects.create(nombre=f"Estrés stock {i}", precio=1000, stock=self.STOCK).pk
+            for i in range(self.PRODUCTOS)
+        ]
+
+    def test_sin_sobreventa(self):
+        vendidas, errores = Counter(), []
+        lock = threading.Lock()
+        largada = threading.Barrier(self.HILOS)
+
+        def comprador(numero):
+            rng = random.Random(42 + numero)
+            mias = Counter()
+            try:
+                largada.wait()
+                for _ in range(self.COMPRAS):
+                    elegidos = rng.sample(self.ids, rng.randint(1, len(self.ids)))
+                    cantidades = {pk: rng.randint(1, 3) for pk in elegidos}
+                    try:
+                        stock.descontar(cantidades)
+                    except stock.StockInsuficiente:
+                        continue
+                    mias.update(cantidades)
+            except Exception as e:  # deadlock, constraint, etc.
+                with lock:
+                    errores.append(f"hilo {numero}: {e}")
+            finally:
+                connection.close()
+                with lock:
+                    vendidas.update(mias)
+
+        hilos = [threading.Thread(target=comprador, args=(n,)) for n in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        for pk, stock_final in Producto.objects.filter(pk__in=self.ids).values_list('pk', 'stock'):
+            with self.subTest(producto=pk):
+                self.assertGreaterEqual(stock_final, 0)
+                self.assertLessEqual(vendidas[pk], self.STOCK)
+                # Si una escritura pisara a otra, lo descontado no cuadraría con lo vendido
+                self.assertEqual(self.STOCK - stock_final, vendidas[pk])
@@ -2,41 +2,46 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib import messages
 from django.db import transaction
-from django.core.cache import cache
 
+from ventas import reservas
 from ventas.models import Carrito, ItemCarrito, Pedido, DetallePedido
+from ventas.stock import StockInsuficiente
+from ventas.recomendaciones import recomendar
+from ventas.resumen_carrito import ENVIO_GRATIS_NOMBRE, invalidar_resumen, obtener_resumen
 from productos.models import Producto, CodigoDescuento
-from ventas.views.helpers import descontar_stock, registrar_historial, registrar_log
 
 
 def _invalidar_cache_carrito(user_id):
-    """Borra el caché del contador del carrito para forzar una recarga inmediata."""
-    cache.delete(f"carrito_count_user_{user_id}")
+    """Mueve el sello del resumen del carrito y borra el contador del navbar."""
+    invalidar_resumen(user_id)
 
-@login_required
+
+@login_required
 def ver_carrito(request):
     """
     Vista principal del carrito.
     Muestra los productos agregados por el usuario autenticado.
-    Inyecta datos de la barra de envío gratis desde ConfiguracionTienda.
+    Subtotal, cupón y barra de envío gratis salen del resumen compartido del
+    checkout (`ventas/resumen_carrito.py`), sin recalcularlos acá.
     """
-    from ventas.models import ConfiguracionTienda
     import time
 
-    carrito, _ = Carrito.objects.get_or_create(usuario=request.user)
+    resumen = obtener_resumen(request)
 
     # ⏱️ Temporizador Backend Real (15 min)
     ahora_ts = time.time()
     cart_expiry = request.session.get('cart_expiry')
     segundos_restantes = 15 * 60
     
-    if carrito.items.exists():
+    if not resumen.vacio:
         if not cart_expiry:
             cart_expiry = ahora_ts + (15 * 60)
             request.session['cart_expiry'] = cart_expiry
         elif ahora_ts > cart_expiry:
-            # Expiró: vaciar carrito y limpiar cupón
-            carrito.items.all().delete()
+            # Expiró: vaciar carrito, soltar sus reservas y limpiar cupón
+            ItemCarrito.objects.filter(carrito__usuario=request.user).delete()
+            reservas.liberar(request.user)
+            _invalidar_cache_carrito(request.user.id)
             request.session.pop('cupon_codigo', None)
             request.session.pop('cart_expiry', None)
             messages.warning(request, "⏱️ Tu carrito expiró por inactividad. Volvé a agregar los productos.")
@@ -46,45 +51,14 @@ def ver_carrito(request):
         # Si está vacío, limpiamos el timer
         request.session.pop('cart_expiry', None)
 
-    # Datos de envío gratis (singleton del staff)
-    config = ConfiguracionTienda.get()
-    total_carrito = float(carrito.total)
-
-    # ── PASO B: Cupón de descuento (guardado en sesión) ─────────────
-    # Calculamos el descuento PRIMERO para ver si afecta al envío gratis
-    cupon_codigo = request.session.get('cupon_codigo')
-    cupon_aplicado = None
-    descuento_cupon = 0
-
-    if cupon_codigo:
-        try:
-            cupon = CodigoDescuento.objects.get(codigo__iexact=cupon_codigo)
-            if cupon.es_valido:
-                cupon_aplicado = cupon
-                descuento_cupon = float(cupon.calcular_descuento(total_carrito))
-            else:
-                del request.session['cupon_codigo']
-                messages.warning(request, "🎟️ El cupón ya no es válido y fue eliminado.")
-        except CodigoDescuento.DoesNotExist:
-            del request.session['cupon_codigo']
-
-    total_con_descuento = max(total_carrito - descuento_cupon, 0)
-
-    # ── PASO C: Envío Gratis ─────────────────────────────────────────
-    # Evaluamos el umbral sobre el total_con_descuento
-    umbral = float(config.envio_gratis_umbral)
-
-    if umbral > 0:
-        porcentaje = min(round((total_con_descuento / umbral) * 100, 1), 100)
-        falta = max(umbral - total_con_descuento, 0)
-    else:
-        porcentaje = 100
-        falta = 0
+    # ── Cupón de descuento (guardado en sesión) ─────────────
+    if resumen.cupon_invalido:
+        del request.session['cupon_codigo']
+        messages.warning(request, "🎟️ El cupón ya no es válido y fue eliminado.")
 
-    alcanzado = total_con_descuento >= umbral
-    
-    if cupon_aplicado and getattr(cupon_aplicado, 'envio_gratis', False):
-        alcanzado = True
+    # ── Envío Gratis: se evalúa sobre el total con descuento ──
+    falta = resumen.falta
+    alcanzado = resumen.umbral_alcanzado
 
     # ════════════════════════════════════════════════════════════════
     # MOTOR DE RECOMENDACIONES V2 — Psicología de Bajo Roce
@@ -92,46 +66,14 @@ def ver_carrito(request):
     rec_cierre = None    # Slot 1: cierra el gap al envío gratis
     rec_impulso = None   # Slot 2: compra por impulso, lo más barato
 
-    if not alcanzado and config.envio_gratis_activo:
-        ids_en_carrito = set(
-            carrito.items.values_list("producto_id", flat=True)
-        )
-
-        hay_kit_en_carrito = carrito.items.filter(producto__es_combo=True).exists()
+    if not alcanzado and resumen.envio_gratis_activo:
+        ids_en_carrito = {linea.producto_id for linea in resumen.lineas}
 
-        candidatos = list(
-            Producto.objects
-            .filter(stock__gt=0)
-            .exclude(id__in=ids_en_carrito)
-            .exclude(es_combo=True)
-            .select_related("categoria")
-            .prefetch_related("portadas")
-            .order_by("precio")
-        )
+        hay_kit_en_carrito = any(linea.es_combo for linea in resumen.lineas)
 
-        if not candidatos and not hay_kit_en_carrito:
-            candidatos = list(
-                Producto.objects
-                .filter(stock__gt=0, es_combo=True)
-                .exclude(id__in=ids_en_carrito)
-                .select_related("categoria")
-                .prefetch_related("portadas")
-                .order_by("precio")
-            )
-
-        # ── SLOT 1 — El Cierre ─────────────────────────────────────────────
-        cierre_pool = [
-            p for p in candidatos
-            if float(p.precio_display) >= falta
-        ]
-        if cierre_pool:
-            rec_cierre = cierre_pool[0]
-
-        # ── SLOT 2 — El Impulso ────────────────────────────────────────────
-        id_cierre = rec_cierre.id if rec_cierre else None
-        impulso_pool = [p for p in candidatos if p.id != id_cierre]
-        if impulso_pool:
-            rec_impulso = impulso_pool[0]
+        # SLOT 1 — El Cierre: el más barato que alcanza lo que falta
+        # SLOT 2 — El Impulso: el más barato de todos (índice ordenado en memoria)
+        rec_cierre, rec_impulso = recomendar(falta, ids_en_carrito, hay_kit_en_carrito)
 
     # ── Cuánto pasa del umbral si agrega el producto de cierre ─────────────
     overshoot_cierre = 0
@@ -139,25 +81,25 @@ def ver_carrito(request):
         overshoot_cierre = max(0, float(rec_cierre.precio_display) - falta)
 
     context = {
-        "carrito": carrito,
+        "resumen": resumen,
         "segundos_restantes": segundos_restantes,
         # Barra de envío gratis
-        "eg_activo": config.envio_gratis_activo or (cupon_aplicado and getattr(cupon_aplicado, 'envio_gratis', False)),
-        "eg_umbral": umbral,
-        "eg_porcentaje": porcentaje,
+        "eg_activo": resumen.barra_envio_visible,
+        "eg_umbral": resumen.umbral,
+        "eg_porcentaje": resumen.porcentaje,
         "eg_falta": falta,
         "eg_alcanzado": alcanzado,
-        "eg_mensaje": config.envio_gratis_mensaje.replace("{umbral}", f"{umbral:,.0f}"),
-        "eg_mensaje_logrado": config.envio_gratis_mensaje_logrado,
+        "eg_mensaje": resumen.mensaje,
+        "eg_mensaje_logrado": resumen.mensaje_logrado,
         # Recomendaciones V2
         "rec_cierre": rec_cierre,
         "rec_impulso": rec_impulso,
         "rec_overshoot": int(overshoot_cierre),
         "eg_falta_int": int(falta),
         # Cupón de descuento
-        "cupon_aplicado": cupon_aplicado,
-        "descuento_cupon": descuento_cupon,
-        "total_con_descuento": total_con_descuento,
+        "cupon_aplicado": resumen.cupon,
+        "descuento_cupon": resumen.descuento,
+        "total_con_descuento": resumen.total_con_descuento,
     }
     return render(request, "ventas/carrito.html", context)
 
@@ -167,7 +109,9 @@ def agregar_al_carrito(request, producto_id):
     """
     Agrega un producto al carrito del usuario.
     - Solo acepta método POST.
-    - Valida stock disponible.
+    - Reserva la unidad hasta que vence el temporizador del carrito
+      (`ventas/reservas.py`): si los demás carritos ya apartaron todo el
+      stock, no se agrega.
     - Si el producto ya existe en el carrito, incrementa la cantidad.
     """
     if request.method != "POST":
@@ -177,15 +121,20 @@ def agregar_al_carrito(request, producto_id):
     carrito, _ = Carrito.objects.get_or_create(usuario=request.user)
     producto = get_object_or_404(Producto, id=producto_id)
 
-    if producto.stock < 1:
+    item = ItemCarrito.objects.filter(carrito=carrito, producto=producto).first()
+    cantidad = item.cantidad + 1 if item else 1
+    try:
+        with transaction.atomic():
+            reservas.reservar(request.user, {producto.id: cantidad}, reservas.vence_del_carrito(request.session))
+            if item:
+                item.cantidad = cantidad
+                item.save(update_fields=["cantidad"])
+            else:
+                ItemCarrito.objects.get_or_create(carrito=carrito, producto=producto)
+    except StockInsuficiente:
         messages.error(request, f"❌ No hay stock disponible para {producto.nombre}.")
         return redirect("productos:producto_list")
 
-    item, creado = ItemCarrito.objects.get_or_create(carrito=carrito, producto=producto)
-    if not creado:
-        item.cantidad += 1
-        item.save()
-
     _invalidar_cache_carrito(request.user.id)
     messages.success(request, f"✅ {producto.nombre} agregado al carrito.")
     next_url = request.META.get('HTTP_REFERER', 'productos:producto_detail')
@@ -205,6 +154,7 @@ def eliminar_item(request, item_id):
 
     item = get_object_or_404(ItemCarrito, id=item_id, carrito__usuario=request.user)
     item.delete()
+    reservas.liberar(request.user, [item.producto_id])
     _invalidar_cache_carrito(request.user.id)
 
     messages.success(request, "🗑️ Producto eliminado del carrito.")
@@ -222,54 +172,29 @@ def finalizar_compra(request):
     - NO crea el Pedido aún (se crea al confirmar método de pago).
     - Redirige a seleccionar método de pago.
     """
-    from ventas.models import ConfiguracionTienda
-
     if request.method != "POST":
         messages.warning(request, "⚠️ Usá el botón para finalizar la compra.")
         return redirect("carrito:carrito_detail")
 
-    carrito = get_object_or_404(Carrito, usuario=request.user)
+    resumen = obtener_resumen(request)
 
-    if not carrito.items.exists():
+    if resumen.vacio:
         messages.warning(request, "🛒 Tu carrito está vacío.")
         return redirect("carrito:carrito_detail")
 
     # ✅ Validar stock ANTES de pasar a métodos de pago
-    for item in carrito.items.select_related("producto"):
-        if item.producto.stock < item.cantidad:
-            messages.error(request, f"❌ Stock insuficiente para {item.producto.nombre}.")
+    for linea in resumen.lineas:
+        if linea.sin_stock:
+            messages.error(request, f"❌ Stock insuficiente para {linea.nombre}.")
             return redirect("carrito:carrito_detail")
 
-    # ── Cupones (Cascada Estricta) ──
-    cupon_codigo = request.session.get('cupon_codigo')
-    descuento_cupon = 0
-    cupon_aplicado = None
-    total_carrito = float(carrito.total)
-
-    if cupon_codigo:
-        try:
-            cupon = CodigoDescuento.objects.get(codigo__iexact=cupon_codigo)
-            if cupon.es_valido:
-                cupon_aplicado = cupon
-                descuento_cupon = float(cupon.calcular_descuento(total_carrito))
-        except CodigoDescuento.DoesNotExist:
-            pass
-
-    total_con_descuento = max(total_carrito - descuento_cupon, 0)
-
-    # ✅ Verificar si aplica envío gratis (SOBRE EL TOTAL DESCONTADO)
-    config = ConfiguracionTienda.get()
-    tiene_envio_gratis = (
-        (config.envio_gratis_activo and total_con_descuento >= float(config.envio_gratis_umbral))
-    )
-    
-    if cupon_aplicado and getattr(cupon_aplicado, 'envio_gratis', False):
-        tiene_envio_gratis = True
+    # ✅ Envío gratis: promo de la tienda sobre el total descontado, o cupón
+    tiene_envio_gratis = resumen.envio_gratis
 
     if tiene_envio_gratis:
         # Envío gratis → forzar precio $0
         envio_precio = 0.0
-        envio_nombre = "Envío Gratis (Promo Tienda Plus)"
+        envio_nombre = ENVIO_GRATIS_NOMBRE
     else:
         # Sin envío gratis → exigir que haya cotizado
         envio_precio = request.POST.get("envio_precio", 0)
@@ -313,18 +238,24 @@ def modificar_cantidad(request, item_id, accion):
     item = get_object_or_404(ItemCarrito, id=item_id, carrito__usuario=request.user)
     
     if accion == 'sumar':
-        if item.producto.stock > item.cantidad:
-            item.cantidad += 1
-            item.save()
+        try:
+            with transaction.atomic():
+                reservas.reservar(
+                    request.user, {item.producto_id: item.cantidad + 1}, reservas.vence_del_carrito(request.session)
+                )
+                item.cantidad += 1
+                item.save()
+        except StockInsuficiente:
+            messages.warning(request, "No hay más stock disponible.")
+        else:
             _invalidar_cache_carrito(request.user.id)
             messages.success(request, f"Se agregó una unidad de {item.producto.nombre}.")
-        else:
-            messages.warning(request, "No hay más stock disponible.")
             
     elif accion == 'restar':
         if item.cantidad > 1:
             item.cantidad -= 1
             item.save()
+            reservas.achicar(request.user, item.producto_id, item.cantidad)
             _invalidar_cache_carrito(request.user.id)
             messages.info(request, f"Se quitó una unidad de {item.producto.nombre}.")
         else:
@@ -357,27 +288,23 @@ def api_cotizar_envio(request):
         if not cp or len(cp) < 4:
             return JsonResponse({"ok": False, "error": "Ingresá un código postal válido (mínimo 4 dígitos)."})
 
-        carrito = Carrito.objects.filter(usuario=request.user).first()
+        resumen = obtener_resumen(request)
 
-        if not carrito or not carrito.items.exists():
-            _cotizar_logger.warning(
-                f"[cotizar_envio] Carrito vacío para usuario={request.user} "
-                f"(carrito={'None' if not carrito else carrito.id})"
-            )
+        if resumen.vacio:
+            _cotizar_logger.warning(f"[cotizar_envio] Carrito vacío para usuario={request.user}")
             return JsonResponse({"ok": False, "error": "Tu carrito está vacío."})
 
-        items = carrito.items.select_related("producto")
+        # Zipnova solo necesita medidas, peso y precio de lista: 1 query
+        items = list(ItemCarrito.objects.filter(carrito__usuario=request.user).select_related("producto"))
 
         _cotizar_logger.info(
-            f"[cotizar_envio] usuario={request.user} | cp={cp} | "
-            f"items={items.count()} | carrito_id={carrito.id}"
+            f"[cotizar_envio] usuario={request.user} | cp={cp} | items={len(items)}"
         )
 
         resultado = cotizar_envio(cp, items)
 
         # Agregar subtotal para que el frontend pueda calcular el total con envío
-        subtotal = float(sum(item.subtotal for item in items))
-        resultado["subtotal_carrito"] = subtotal
+        resultado["subtotal_carrito"] = float(resumen.subtotal)
 
         _cotizar_logger.info(
             f"[cotizar_envio] OK | opciones={len(resultado.get('opciones', []))} | error={resultado.get('error')}"
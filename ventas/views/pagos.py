@@ -8,16 +8,18 @@ from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 from django.db import transaction
+from collections import Counter
 from datetime import timedelta
 import traceback
 import mercadopago
 import json
 import logging
 
-from ventas.models import Carrito, Pedido, DetallePedido
-from ventas.views.helpers import descontar_stock, registrar_historial, registrar_log
+from ventas import reservas, stock
+from ventas.models import Carrito, ItemCarrito, Pedido, DetallePedido
+from ventas.resumen_carrito import CuponNoValido, calcular_resumen, canjear_cupon, invalidar_resumen, obtener_resumen
+from ventas.views.helpers import registrar_historial, registrar_log
 from ventas.forms import DatosEnvioForm
-from productos.models import CodigoDescuento
 
 logger = logging.getLogger(__name__)
 
@@ -121,11 +123,11 @@ class CheckCartExpiryMixin:
         import time
         ahora_ts = time.time()
         cart_expiry = request.session.get('cart_expiry')
-        carrito = Carrito.objects.filter(usuario=request.user).first()
         
         if cart_expiry and ahora_ts > cart_expiry:
-            if carrito:
-                carrito.items.all().delete()
+            ItemCarrito.objects.filter(carrito__usuario=request.user).delete()
+            reservas.liberar(request.user)
+            invalidar_resumen(request.user.id)
             request.session.pop('cupon_codigo', None)
             request.session.pop('cart_expiry', None)
             messages.warning(request, "⏱️ Tu carrito expiró por inactividad. Volvé a agregar los productos.")
@@ -133,7 +135,7 @@ class CheckCartExpiryMixin:
             
         # NUEVO BLOQUEO (Vulnerabilidad del botón atrás)
         # Si entra a las páginas de pago pero el carrito ya se vació (por ej, porque ya completó el pedido)
-        if not carrito or not carrito.items.exists():
+        if obtener_resumen(request).vacio:
             messages.warning(request, "⚠️ Tu carrito está vacío o tu pedido ya fue procesado.")
             return redirect("carrito:carrito_detail")
             
@@ -149,9 +151,9 @@ class DatosEnvioView(CheckCartExpiryMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        carrito = Carrito.objects.filter(usuario=self.request.user).first()
+        resumen = obtener_resumen(self.request)
 
-        if not carrito or not carrito.items.exists():
+        if resumen.vacio:
             return context
 
         # Pre-rellenar con datos de sesión si el usuario vuelve atrás
@@ -160,40 +162,22 @@ class DatosEnvioView(CheckCartExpiryMixin, TemplateView):
 
         envio_cotizado = self.request.session.get('envio_cotizado', {})
         costo_envio = envio_cotizado.get('precio', 0.0)
-        subtotal = sum(item.subtotal for item in carrito.items.all())
 
         # ── Cupón de descuento (Fantasma B resuelto) ──
-        cupon_codigo = self.request.session.get('cupon_codigo')
-        descuento_cupon = 0
-        cupon_aplicado = None
-
-        if cupon_codigo:
-            try:
-                from productos.models import CodigoDescuento
-                cupon_obj = CodigoDescuento.objects.get(codigo__iexact=cupon_codigo)
-                if cupon_obj.es_valido:
-                    descuento_cupon = float(cupon_obj.calcular_descuento(subtotal))
-                    cupon_aplicado = cupon_obj
-                else:
-                    del self.request.session['cupon_codigo']
-            except CodigoDescuento.DoesNotExist:
-                del self.request.session['cupon_codigo']
-
-        total_base = float(subtotal) - descuento_cupon + float(costo_envio)
+        if resumen.cupon_invalido:
+            del self.request.session['cupon_codigo']
 
         context['form'] = form
-        context['carrito'] = carrito
-        context['subtotal'] = subtotal
+        context['resumen'] = resumen
+        context['subtotal'] = resumen.subtotal
         context['costo_envio'] = costo_envio
-        context['descuento_cupon'] = descuento_cupon
-        context['cupon_aplicado'] = cupon_aplicado
-        context['total_a_pagar'] = max(total_base, 0)
+        context['descuento_cupon'] = resumen.descuento
+        context['cupon_aplicado'] = resumen.cupon
+        context['total_a_pagar'] = resumen.total_a_pagar(costo_envio)
         return context
 
     def post(self, request, *args, **kwargs):
-        carrito = Carrito.objects.filter(usuario=request.user).first()
-
-        if not carrito or not carrito.items.exists():
+        if obtener_resumen(request).vacio:
             messages.warning(request, "🛒 Tu carrito está vacío.")
             return redirect("carrito:carrito_detail")
 
@@ -223,38 +207,22 @@ class MetodoPagoView(CheckCartExpiryMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Obtener total del carrito
-        carrito = Carrito.objects.filter(usuario=self.request.user).first()
-        subtotal = sum(item.subtotal for item in carrito.items.all()) if carrito else 0
+        resumen = obtener_resumen(self.request)
         
         # Obtener datos de envío cotizados en la sesión
         envio_cotizado = self.request.session.get("envio_cotizado", {})
         costo_envio = envio_cotizado.get("precio", 0.0)
         
         # ── Cupón de descuento (Fantasma B resuelto) ──
-        cupon_codigo = self.request.session.get('cupon_codigo')
-        descuento_cupon = 0
-        cupon_aplicado = None
+        if resumen.cupon_invalido:
+            del self.request.session['cupon_codigo']
 
-        if cupon_codigo:
-            try:
-                from productos.models import CodigoDescuento
-                cupon_obj = CodigoDescuento.objects.get(codigo__iexact=cupon_codigo)
-                if cupon_obj.es_valido:
-                    descuento_cupon = float(cupon_obj.calcular_descuento(subtotal))
-                    cupon_aplicado = cupon_obj
-                else:
-                    del self.request.session['cupon_codigo']
-            except CodigoDescuento.DoesNotExist:
-                del self.request.session['cupon_codigo']
+        total_a_pagar = resumen.total_a_pagar(costo_envio)
 
-        total_base = float(subtotal) - descuento_cupon + float(costo_envio)
-        total_a_pagar = max(total_base, 0)
-
-        context["subtotal"] = subtotal
+        context["subtotal"] = resumen.subtotal
         context["costo_envio"] = costo_envio
-        context['descuento_cupon'] = descuento_cupon
-        context['cupon_aplicado'] = cupon_aplicado
+        context['descuento_cupon'] = resumen.descuento
+        context['cupon_aplicado'] = resumen.cupon
         context["total_a_pagar"] = total_a_pagar
         context["total_con_descuento"] = round(total_a_pagar * 0.90, 2)
         return context
@@ -265,34 +233,38 @@ class MetodoPagoView(CheckCartExpiryMixin, TemplateView):
             messages.warning(request, "⚠️ Debés elegir un método de pago.")
             return self.get(request, *args, **kwargs)
 
-        # Obtener carrito
         carrito = get_object_or_404(Carrito, usuario=request.user)
+        cupon_codigo = request.session.get('cupon_codigo') or ''
 
-        if not carrito.items.exists():
+        if obtener_resumen(request).vacio:
             messages.warning(request, "🛒 Tu carrito está vacío.")
             return redirect("carrito:carrito_detail")
 
         try:
             with transaction.atomic():
-                # ── PASO A: Subtotal ────────────────────────────────
-                subtotal = float(sum(item.subtotal for item in carrito.items.all()))
-                
-                # ── PASO B: Cupón de descuento ──────────────────────
-                cupon_codigo = request.session.get('cupon_codigo')
-                cupon_obj = None
-                descuento_cupon = 0
-
-                if cupon_codigo:
-                    try:
-                        cupon_obj = CodigoDescuento.objects.get(codigo__iexact=cupon_codigo)
-                        if cupon_obj.es_valido:
-                            descuento_cupon = float(cupon_obj.calcular_descuento(subtotal))
-                        else:
-                            cupon_obj = None
-                    except CodigoDescuento.DoesNotExist:
-                        cupon_obj = None
-
-                total_con_descuento = max(subtotal - descuento_cupon, 0)
+                # El resumen en caché puede tener hasta TIEMPO_RESUMEN segundos: el
+                # pedido se cobra con precios, campañas y cupón leídos recién
+                resumen = calcular_resumen(request.user, cupon_codigo)
+                if resumen.vacio:
+                    raise ValueError("Tu carrito está vacío.")
+                if resumen.cupon_invalido:
+                    raise CuponNoValido()
+
+                # Confirmar la reserva del carrito (si venció, se vuelve a pedir y
+                # respeta lo que apartaron los demás) y descontar el stock de todas
+                # las líneas en un solo UPDATE condicional: si a alguna no le
+                # alcanza, no se crea nada
+                cantidades = Counter()
+                for linea in resumen.lineas:
+                    cantidades[linea.producto_id] += linea.cantidad
+                reservas.reservar(request.user, cantidades, reservas.vence_del_carrito(request.session))
+                stock.descontar(cantidades)
+                reservas.liberar(request.user)
+
+                # ── PASO A + B: Subtotal y cupón de descuento ───────
+                cupon_obj = resumen.cupon
+                descuento_cupon = resumen.descuento
+                total_con_descuento = resumen.total_con_descuento
                 
                 # ── PASO C: Envío ───────────────────────────────────
                 datos_envio = request.session.get('datos_envio', {})
@@ -314,7 +286,7 @@ class MetodoPagoView(CheckCartExpiryMixin, TemplateView):
                     estado="pendiente",
                     metodo_pago=None,
                     total=total_final,
-                    cupon_aplicado=cupon_obj,
+                    cupon_aplicado_id=cupon_obj.id if cupon_obj else None,
                     descuento_aplicado=descuento_cupon,
                     costo_envio=costo_envio,
                     metodo_envio=metodo_envio,
@@ -331,28 +303,31 @@ class MetodoPagoView(CheckCartExpiryMixin, TemplateView):
                     notas_envio=datos_envio.get('notas_envio', ''),
                 )
                 
-                # Crear detalles + descontar stock
-                for item in carrito.items.select_related("producto"):
-                    DetallePedido.objects.create(
+                # Crear detalles (el stock ya se descontó arriba)
+                DetallePedido.objects.bulk_create([
+                    DetallePedido(
                         pedido=pedido,
-                        producto=item.producto,
-                        cantidad=item.cantidad,
-                        precio_unitario=item.producto.precio_display
+                        producto_id=linea.producto_id,
+                        cantidad=linea.cantidad,
+                        precio_unitario=linea.precio_unitario
                     )
-                    # Descontar stock
-                    descontar_stock(item.producto, item.cantidad)
+                    for linea in resumen.lineas
+                ])
 
                 # ── Incrementar usos del cupón (dentro del atomic para rollback si algo falla) ──
+                # Solo si sigue vigente y con usos libres: si no, se deshace todo
                 if cupon_obj:
-                    from django.db.models import F
-                    CodigoDescuento.objects.filter(pk=cupon_obj.pk).update(
-                        usos_actuales=F('usos_actuales') + 1
-                    )
+                    canjear_cupon(cupon_obj.id)
                 
                 # Registrar en historial
                 registrar_historial(pedido, "", "pendiente", request.user)
                 registrar_log(pedido, request.user, "Carrito convertido a Pedido")
                 
+        except CuponNoValido:
+            request.session.pop('cupon_codigo', None)
+            invalidar_resumen(request.user.id)
+            messages.warning(request, "🎟️ El cupón ya no es válido (venció o se agotó). Revisá el total antes de confirmar.")
+            return redirect("carrito:carrito_detail")
         except Exception as e:
             messages.error(request, f"❌ Error al crear el pedido: {str(e)}")
             print(f"🔴 ERROR creando Pedido en post(): {str(e)}")
@@ -415,6 +390,7 @@ class MetodoPagoView(CheckCartExpiryMixin, TemplateView):
                 
                 # Vaciar carrito y limpiar cupón de la sesión
                 carrito.items.all().delete()
+                invalidar_resumen(request.user.id)
                 request.session.pop('cupon_codigo', None)
                 
                 # Enviar correo de rescate (Pago Pendiente)
@@ -454,6 +430,7 @@ class MetodoPagoView(CheckCartExpiryMixin, TemplateView):
             
             # Vaciar carrito y limpiar cupón de la sesión
             carrito.items.all().delete()
+            invalidar_resumen(request.user.id)
             request.session.pop('cupon_codigo', None)
             
             # Enviar correo de confirmación de compra
@@ -650,10 +627,7 @@ def mercado_pago_webhook(request):
                         if estado_nuevo == "cancelado" and estado_anterior != "cancelado":
                             from django.db import transaction
                             with transaction.atomic():
-                                for detalle in pedido.detalles.select_related("producto"):
-                                    producto = detalle.producto
-                                    producto.stock += detalle.cantidad
-                                    producto.save()
+                                stock.reponer(pedido.detalles.values_list("producto_id", "cantidad"))
                                 
                                 # Devolver el uso del cupón
                                 if pedido.cupon_aplicado:
@@ -4,7 +4,7 @@ from django.contrib.admin.views.decorators import staff_member_required
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, DetailView
 from ventas.models import Pedido
-from ..views.helpers import descontar_stock
+from ventas import reservas
 from django.contrib import messages
 from django.db.models import Sum, Count, F, DecimalField, ExpressionWrapper, Q
 from django.views.generic import TemplateView
@@ -13,9 +13,16 @@ from datetime import timedelta
 import json
 from django.http import JsonResponse
 from django.db import transaction
+from django.core.exceptions import ValidationError
 from productos.models import Producto
+from productos.precios import precargar_precios, recalcular_precios_efectivos
+from productos.catalogo import invalidar_catalogo
+from productos.fragmentos import invalidar_tarjetas
+from biblioteca_plus.inicio import invalidar_home
 from ventas.models import Pedido, DetallePedido
 from ventas.views.helpers import registrar_historial, registrar_log
+from biblioteca_plus.normalizacion import normalizar
+from biblioteca_plus.paginacion import KeysetPaginationMixin
 @method_decorator(staff_member_required, name='dispatch')
 class ReportesVentasView(TemplateView):
     template_name = 'ventas/reportes.html'
@@ -73,8 +80,8 @@ class VentaMostradorView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Obtenemos productos con stock
-        productos = Producto.objects.filter(stock__gt=0)
+        # Obtenemos productos con stock y resolvemos todas las campañas en 1 query
+        productos = precargar_precios(Producto.objects.filter(stock__gt=0))
         
         # Formateamos el catálogo en una lista de diccionarios (Data pura)
         catalogo = [
@@ -115,32 +122,30 @@ class VentaMostradorView(TemplateView):
                     total=0
                 )
                 
-                total_calculado = 0
-
-                # 2. Iteramos los renglones del ticket
-                for item in items:
-                    # select_for_update() bloquea la fila en la DB temporalmente para evitar 
-                    # que otra persona compre el mismo producto en el mismo milisegundo
-                    producto = Producto.objects.select_for_update().get(id=item['id'])
-                    cantidad = int(item['cantidad'])
-
-                    if producto.stock < cantidad:
-                        raise ValueError(f"Stock insuficiente para {producto.nombre}")
-
-                    # Descontamos el stock de la base de datos
-                    producto.stock -= cantidad
-                    producto.save()
-
-                    # Guardamos el renglón
-                    DetallePedido.objects.create(
+                renglones = [(int(item['id']), int(item['cantidad'])) for item in items]
+
+                # 2. Descontamos el stock de todos los renglones sin llevarnos lo
+                # que tienen apartado los carritos de los clientes (ver
+                # ventas/reservas.py): si a alguno no le alcanza, no se
+                # descuenta nada y el atomic deshace la cabecera
+                reservas.descontar_respetando_reservas(renglones, request.user)
+
+                # 3. Guardamos los renglones (precio final de todos en lote)
+                productos = Producto.objects.in_bulk([pk for pk, _ in renglones])
+                precargar_precios(productos.values())
+                detalles = [
+                    DetallePedido(
                         pedido=pedido,
-                        producto=producto,
+                        producto=productos[pk],
                         cantidad=cantidad,
-                        precio_unitario=producto.precio_display
+                        precio_unitario=productos[pk].precio_display
                     )
-                    total_calculado += (producto.precio_display * cantidad)
+                    for pk, cantidad in renglones
+                ]
+                DetallePedido.objects.bulk_create(detalles)
+                total_calculado = sum(d.precio_unitario * d.cantidad for d in detalles)
 
-                # 3. Cerramos el total de la cabecera
+                # 4. Cerramos el total de la cabecera
                 pedido.total = total_calculado
                 pedido.save()
 
@@ -157,11 +162,14 @@ class VentaMostradorView(TemplateView):
             return JsonResponse({'error': 'Error interno al procesar la venta'}, status=500)
     
 @method_decorator(staff_member_required, name='dispatch')
-class PanelPedidosView(ListView):
+class PanelPedidosView(KeysetPaginationMixin, ListView):
     model = Pedido
     template_name = 'ventas/panel_pedidos.html'
     context_object_name = 'pedidos'
     paginate_by = 10
+    # Paginación por cursor sobre (fecha_pedido, id): páginas profundas sin OFFSET
+    orden_keyset = ('-fecha_pedido', '-id')
+    conteo_keyset = 'estimado'
 
     def get_queryset(self):
         # CAMBIO CLAVE: Cambiamos select_related por prefetch_related para traer los detalles sin ahorcar la base de datos
@@ -174,18 +182,24 @@ class PanelPedidosView(ListView):
         fecha = self.request.GET.get('fecha')
 
         if query:
-            clean_query = query.replace('#', '')
-            # Buscamos el nombre del producto DENTRO de los detalles. Usamos distinct() para no duplicar el pedido si tiene varios productos con "cepillo".
-            qs = qs.filter(
-                Q(detalles__producto__nombre__icontains=query) | 
-                Q(id__icontains=clean_query)
-            ).distinct()
+            clean_query = query.replace('#', '').strip()
+            clave = normalizar(clean_query)
+            # Claves normalizadas con prefijo (indexadas): producto, nombre o email de envío.
+            # Usamos distinct() para no duplicar el pedido si tiene varios productos que coinciden.
+            filtro = (
+                Q(detalles__producto__nombre_normalizado__startswith=clave) |
+                Q(nombre_envio_normalizado__startswith=clave) |
+                Q(email_envio_normalizado__startswith=clave)
+            )
+            if clean_query.isdigit():
+                filtro |= Q(id=int(clean_query))
+            qs = qs.filter(filtro).distinct()
 
         # Mantenemos los filtros
         if estado:
             qs = qs.filter(estado=estado)
         if producto:
-            qs = qs.filter(detalles__producto__nombre__icontains=producto).distinct()
+            qs = qs.filter(detalles__producto__nombre_normalizado__startswith=normalizar(producto)).distinct()
         if usuario:
             qs = qs.filter(usuario__username__icontains=usuario)
         if fecha:
@@ -199,15 +213,16 @@ class PanelPedidosView(ListView):
         # Definición de estados para el negocio
         estados_lista = ['pendiente', 'pagado', 'enviado', 'entregado', 'cancelado']
 
-        # Estadísticas globales (usando la lista para consistencia)
-        # Optimizamos contando sobre el modelo directamente
-        estadisticas = {
-            est: Pedido.objects.filter(estado=est).count()
-            for est in estados_lista
-        }
+        # Estadísticas globales: un solo recorrido con conteos condicionales
+        # (antes eran 6 COUNT(*) separados)
+        conteos = Pedido.objects.aggregate(
+            total=Count('id'),
+            **{est: Count('id', filter=Q(estado=est)) for est in estados_lista}
+        )
+        estadisticas = {est: conteos[est] for est in estados_lista}
 
         context.update({
-            'total_pedidos': Pedido.objects.count(),
+            'total_pedidos': conteos['total'],
             'estadisticas': estadisticas,
             'estados': estados_lista,
             
@@ -258,6 +273,103 @@ class TicketVentaDetailView(DetailView):
         context['total'] = self.object.total
         return context
 
+# ──────────────────────────────────────────────
+# 🏷️ Gestor de ofertas: guardado masivo
+# ──────────────────────────────────────────────
+CAMPOS_OFERTA = ('en_oferta', 'destacado', 'en_carrusel', 'etiqueta_oferta', 'precio_oferta', 'fecha_fin_oferta')
+
+
+def _valores_oferta(producto, fila):
+    """Valores nuevos de la fila ya validados con los campos del modelo. Devuelve (valores, errores)."""
+    valores, errores = {}, {}
+    for nombre in CAMPOS_OFERTA:
+        if nombre not in fila:
+            continue
+        campo = Producto._meta.get_field(nombre)
+        valor = fila[nombre]
+        if nombre in ('en_oferta', 'destacado', 'en_carrusel'):
+            valores[nombre] = bool(valor)
+            continue
+        valor = (str(valor) if valor is not None else '').strip()
+        if nombre == 'precio_oferta':
+            valor = valor.replace(',', '.') or None
+        elif nombre == 'fecha_fin_oferta':
+            valor = valor or None
+        try:
+            valor = campo.clean(valor, producto)
+        except ValidationError as e:
+            errores[nombre] = ' '.join(e.messages)
+            continue
+        if nombre == 'fecha_fin_oferta' and valor:
+            if timezone.is_naive(valor):
+                valor = timezone.make_aware(valor)
+            actual = producto.fecha_fin_oferta
+            # El input datetime-local no tiene segundos: mismo minuto = sin cambios
+            if actual and actual.replace(second=0, microsecond=0) == valor:
+                valor = actual
+        valores[nombre] = valor
+
+    precio_oferta = valores.get('precio_oferta')
+    if precio_oferta is not None and precio_oferta != producto.precio_oferta and precio_oferta >= producto.precio:
+        errores['precio_oferta'] = f"Tiene que ser menor al precio de lista (${producto.precio})."
+    return valores, errores
+
+
+def guardar_ofertas(filas):
+    """
+    Guardado masivo del gestor: un `in_bulk` para traer todos los productos,
+    solo los campos que cambiaron, un `bulk_update` y una sola invalidación de
+    caché. Si alguna fila no valida no se guarda nada y se informa fila por fila.
+    """
+    errores, validas = [], []
+    for fila in filas:
+        try:
+            validas.append((fila, int(fila['id'])))
+        except (KeyError, TypeError, ValueError):
+            errores.append({'id': None, 'errores': {'id': 'ID inválido.'}})
+    productos = Producto.objects.in_bulk([pk for _, pk in validas])
+
+    cambiados, campos = [], set()
+    for fila, pk in validas:
+        producto = productos.get(pk)
+        if producto is None:
+            errores.append({'id': pk, 'errores': {'id': 'El producto ya no existe.'}})
+            continue
+        valores, errores_fila = _valores_oferta(producto, fila)
+        if errores_fila:
+            errores.append({'id': producto.pk, 'nombre': producto.nombre, 'errores': errores_fila})
+            continue
+        distintos = {k: v for k, v in valores.items() if getattr(producto, k) != v}
+        if distintos:
+            for nombre, valor in distintos.items():
+                setattr(producto, nombre, valor)
+            campos |= distintos.keys()
+            cambiados.append(producto)
+
+    if errores:
+        return {'success': False, 'error': f"{len(errores)} filas con errores: no se guardó nada.", 'errores': errores}
+
+    if cambiados:
+        ahora = timezone.now()
+        for producto in cambiados:
+            producto.actualizado = ahora  # bulk_update no aplica auto_now
+        with transaction.atomic():
+            Producto.objects.bulk_update(cambiados, sorted(campos | {'actualizado'}))
+            if campos & set(Producto.CAMPOS_PRECIO):
+                recalcular_precios_efectivos([p.pk for p in cambiados], ahora=ahora)
+        # bulk_update no dispara señales: una sola invalidación por guardado
+        invalidar_tarjetas(p.pk for p in cambiados)
+        invalidar_catalogo()
+        invalidar_home()
+
+    return {
+        'success': True,
+        'actualizados': len(cambiados),
+        'sin_cambios': len(filas) - len(cambiados),
+        'errores': [],
+    }
+
+
 @method_decorator(staff_member_required, name='dispatch')
 class GestorOfertasView(TemplateView):
     template_name = 'ventas/gestor_ofertas.html'
@@ -265,8 +377,8 @@ class GestorOfertasView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Separamos los productos para la vista
-        context['kits_carrusel'] = Producto.objects.filter(en_carrusel=True).order_by('-en_oferta', 'nombre')
-        context['productos_individuales'] = Producto.objects.filter(en_carrusel=False).order_by('-en_oferta', 'nombre')
+        context['kits_carrusel'] = Producto.objects.filter(en_carrusel=True).prefetch_related('portadas').order_by('-en_oferta', 'nombre')
+        context['productos_individuales'] = Producto.objects.filter(en_carrusel=False).prefetch_related('portadas').order_by('-en_oferta', 'nombre')
         return context
 
     def post(self, request, *args, **kwargs):
@@ -274,34 +386,17 @@ class GestorOfertasView(TemplateView):
         if request.headers.get('Content-Type') == 'application/json':
             try:
                 data = json.loads(request.body)
-                if data.get('action') == 'update_all':
-                    productos_data = data.get('productos', [])
-                    with transaction.atomic():
-                        for p_data in productos_data:
-                            producto = Producto.objects.get(id=p_data['id'])
-                            producto.en_oferta = p_data.get('en_oferta', False)
-                            producto.destacado = p_data.get('destacado', False)
-                            producto.en_carrusel = p_data.get('en_carrusel', False)
-                            producto.etiqueta_oferta = p_data.get('etiqueta_oferta', '')
-                            
-                            precio_str = p_data.get('precio_oferta', '')
-                            if precio_str:
-                                producto.precio_oferta = precio_str.replace(',', '.')
-                            else:
-                                producto.precio_oferta = None
-                                
-                            fecha_str = p_data.get('fecha_fin_oferta', '')
-                            if fecha_str:
-                                producto.fecha_fin_oferta = fecha_str
-                            else:
-                                producto.fecha_fin_oferta = None
-                                
-                            producto.save()
-                    
-                    messages.success(request, "¡Todas las ofertas actualizadas con éxito! 🚀 (Guardado Masivo)")
-                    return JsonResponse({'success': True})
-            except Exception as e:
-                return JsonResponse({'success': False, 'error': str(e)})
+            except ValueError:
+                return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+            if data.get('action') == 'update_all':
+                reporte = guardar_ofertas(data.get('productos', []))
+                if reporte['success']:
+                    messages.success(
+                        request,
+                        f"¡Ofertas actualizadas! 🚀 {reporte['actualizados']} productos guardados "
+                        f"({reporte['sin_cambios']} sin cambios)."
+                    )
+                return JsonResponse(reporte, status=200 if reporte['success'] else 400)
 
         # Si la petición no es JSON (no debería pasar ahora que quitamos los forms), devolvemos error
         messages.error(request, "Método de guardado obsoleto. Por favor, usa el botón 'Guardar Todo'.")
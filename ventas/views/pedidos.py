@@ -9,15 +9,22 @@ from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.utils.decorators import method_decorator
 from django.views.generic import ListView, CreateView, UpdateView, DetailView
+from ventas import reservas, stock
 from ventas.models import Pedido, HistorialPedido
 from ventas.views.helpers import registrar_historial, registrar_log
+from biblioteca_plus.normalizacion import normalizar
+from biblioteca_plus.paginacion import KeysetPaginationMixin
+from django.db.models import Count, Q
 
 
-class PedidoHistorialView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class PedidoHistorialView(LoginRequiredMixin, UserPassesTestMixin, KeysetPaginationMixin, ListView):
     """Historial completo de un pedido (solo staff o dueño del pedido)."""
     model = HistorialPedido
-    template_name = "pedidos/historial.html"
+    template_name = "ventas/historial_pedido.html"
     context_object_name = "historial"
+    paginate_by = 20
+    orden_keyset = ("-fecha_cambio", "-id")
+    conteo_keyset = None
 
     def get_queryset(self):
         return (
@@ -39,7 +46,7 @@ class PedidoDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
 
     def get_queryset(self):
         # CAMBIO CLAVE: select_related para el usuario (1a1), prefetch_related para detalles (1 a Muchos)
-        return Pedido.objects.select_related("usuario").prefetch_related("detalles__producto")
+        return Pedido.objects.select_related("usuario").prefetch_related("detalles__producto__portadas")
 
     def test_func(self):
         pedido = self.get_object()
@@ -53,15 +60,17 @@ class PedidoDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
         return context
 
 
-class PedidoListView(LoginRequiredMixin, ListView):
+class PedidoListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Pedido
     template_name = 'pedidos/pedido_list.html'
     context_object_name = 'pedidos'
     paginate_by = 10
+    orden_keyset = ('-fecha_pedido', '-id')
+    conteo_keyset = 'exacto'
 
     def get_queryset(self):
         # CAMBIO CLAVE: prefetch_related
-        qs = Pedido.objects.filter(usuario=self.request.user).prefetch_related('detalles__producto')
+        qs = Pedido.objects.filter(usuario=self.request.user).prefetch_related('detalles__producto__portadas')
         estado = self.request.GET.get('estado')
         producto = self.request.GET.get('producto')
 
@@ -69,7 +78,7 @@ class PedidoListView(LoginRequiredMixin, ListView):
             qs = qs.filter(estado=estado)
         if producto:
             # CAMBIO CLAVE: Filtramos buscando DENTRO de los detalles. Usamos distinct() para que el pedido no aparezca repetido si tiene varios productos con ese nombre.
-            qs = qs.filter(detalles__producto__nombre__icontains=producto).distinct()
+            qs = qs.filter(detalles__producto__nombre_normalizado__startswith=normalizar(producto)).distinct()
 
         return qs.order_by('-fecha_pedido')
 
@@ -77,13 +86,14 @@ class PedidoListView(LoginRequiredMixin, ListView):
         context = super().get_context_data(**kwargs)
         usuario = self.request.user
         estados = ['pendiente', 'pagado', 'enviado', 'entregado', 'cancelado']
-        estadisticas = {
-            estado: Pedido.objects.filter(usuario=usuario, estado=estado).count()
-            for estado in estados
-        }
+        conteos = Pedido.objects.filter(usuario=usuario).aggregate(
+            total=Count('id'),
+            **{estado: Count('id', filter=Q(estado=estado)) for estado in estados}
+        )
+        estadisticas = {estado: conteos[estado] for estado in estados}
 
         context.update({
-            'total_pedidos': Pedido.objects.filter(usuario=usuario).count(),
+            'total_pedidos': conteos['total'],
             'estadisticas': estadisticas,
             'estados': estados,
             'f_estado': self.request.GET.get('estado', ''),
@@ -166,28 +176,37 @@ def marcar_como_entregado(request, pk):
         messages.info(request, f"ℹ️ El pedido #{pedido.id} ya estaba entregado.")
         return redirect("panel:panel_pedidos")
 
-    # Validar stock de todos los productos del pedido
+    # Validar stock de todos los productos del pedido (sin contar lo que
+    # apartaron los carritos de otros clientes, ver ventas/reservas.py)
+    detalles = list(pedido.detalles.select_related("producto"))
+    libres = reservas.disponibles({d.producto for d in detalles}, pedido.usuario)
     sin_stock = []
-    for detalle in pedido.detalles.select_related("producto").all():
-        if detalle.producto.stock < detalle.cantidad:
-            sin_stock.append(f"{detalle.producto.nombre} (disponible: {detalle.producto.stock}, pedido: {detalle.cantidad})")
+    for detalle in detalles:
+        if libres[detalle.producto_id] < detalle.cantidad:
+            sin_stock.append(f"{detalle.producto.nombre} (disponible: {libres[detalle.producto_id]}, pedido: {detalle.cantidad})")
     if sin_stock:
         messages.error(request, f"❌ Stock insuficiente para: {', '.join(sin_stock)}")
         return redirect("panel:panel_pedidos")
 
-    with transaction.atomic():
-        # CAMBIO CLAVE: Bucle para descontar stock de todos los productos del pedido
-        for detalle in pedido.detalles.all():
-            detalle.producto.stock -= detalle.cantidad
-            detalle.producto.save()
-
-        # Registrar historial y log
-        registrar_historial(pedido, pedido.estado, "entregado", request.user)
-        registrar_log(pedido, request.user, "entregado")
-
-        # Actualizar estado
-        pedido.estado = "entregado"
-        pedido.save()
+    try:
+        with transaction.atomic():
+            # Un solo descuento para todos los productos del pedido: si otra
+            # venta o una reserva se llevó el stock después de la validación,
+            # no se entrega
+            reservas.descontar_respetando_reservas(
+                [(d.producto_id, d.cantidad) for d in detalles], pedido.usuario
+            )
+
+            # Registrar historial y log
+            registrar_historial(pedido, pedido.estado, "entregado", request.user)
+            registrar_log(pedido, request.user, "entregado")
+
+            # Actualizar estado
+            pedido.estado = "entregado"
+            pedido.save()
+    except stock.StockInsuficiente as e:
+        messages.error(request, f"❌ {e}")
+        return redirect("panel:panel_pedidos")
 
     messages.success(request, f"✅ Pedido #{pedido.id} marcado como entregado correctamente.")
     return redirect("panel:panel_pedidos")